@@ -0,0 +1,74 @@
+"""
+Общая обвязка бэкендов состояния и объектов «один на процесс».
+Назначение файла:
+- backend_redis — клиент Redis для бэкенда по настройкам <PREFIX>_BACKEND
+  ("redis" по умолчанию или "memory") и <PREFIX>_REDIS_URL;
+- ProcessSingleton — объект, общий для процесса: создаётся лениво
+  и один раз (потокобезопасно), reset() сбрасывает его;
+- reset_singletons — сброс всех таких объектов (тесты: после смены настроек).
+"""
+
+import threading
+from collections.abc import Callable
+from typing import Generic, TypeVar, cast
+
+from django.conf import settings
+from redis import Redis
+
+T = TypeVar("T")
+
+MEMORY_BACKEND = "memory"
+
+_singletons: list["ProcessSingleton"] = []
+
+
+def backend_redis(prefix: str) -> Redis | None:
+    """
+    Клиент Redis для бэкенда по настройке {prefix}_BACKEND.
+    :return: клиент по {prefix}_REDIS_URL; None — бэкенд "memory"
+             (в памяти процесса: тесты, запуск с одним воркером)
+    """
+    if getattr(settings, f"{prefix}_BACKEND") == MEMORY_BACKEND:
+        return None
+    return Redis.from_url(getattr(settings, f"{prefix}_REDIS_URL"))
+
+
+class ProcessSingleton(Generic[T]):
+    """
+    Общий для процесса объект: создаётся лениво, один раз, по текущим настройкам.
+    close вызывается для созданного объекта при сбросе.
+    """
+
+    def __init__(
+        self, build: Callable[[], T], close: Callable[[T], None] | None = None
+    ) -> None:
+        self._build = build
+        self._close = close
+        self._lock = threading.Lock()
+        self._built = False
+        self._value: T | None = None
+        _singletons.append(self)
+
+    def get(self) -> T:
+        if not self._built:
+            with self._lock:
+                if not self._built:
+                    self._value = self._build()
+                    self._built = True
+        return cast(T, self._value)
+
+    def reset(self) -> None:
+        with self._lock:
+            if self._built and self._close is not None:
+                self._close(cast(T, self._value))
+            self._value = None
+            self._built = False
+
+
+def reset_singletons() -> None:
+    """
+    Сбрасывает все объекты ProcessSingleton (например, после смены настроек
+    в тестах): следующий get() создаст их заново.
+    """
+    for singleton in list(_singletons):
+        singleton.reset()
@@ -116,6 +116,9 @@ DATABASES = {
         "PASSWORD": os.getenv("POSTGRES_PASSWORD", "postgres"),
         "HOST": os.getenv("POSTGRES_HOST", "127.0.0.1"),
         "PORT": os.getenv("POSTGRES_PORT", "5432"),
+        # jsonb (NotificationOutbox.payload) хранит не-ASCII только в UTF8-базе:
+        # тестовая база создаётся в UTF8 независимо от кодировки кластера
+        "TEST": {"CHARSET": "UTF8", "TEMPLATE": "template0"},
     }
 }
 
@@ -189,6 +192,33 @@ TELEGRAM_BOT_TOKEN = os.getenv("TELEGRAM_BOT_TOKEN", "")
 TELEGRAM_BOT_USERNAME = os.getenv("TELEGRAM_BOT_USERNAME", "")
 TELEGRAM_API_URL = os.getenv("TELEGRAM_API_URL", "https://api.telegram.org")
 
+# Webhook бота: публичный адрес POST /api/telegram/webhook/ и секрет, который
+# Telegram присылает в заголовке X-Telegram-Bot-Api-Secret-Token.
+# Пустой секрет — webhook выключен (бот работает через polling, telegram_bot.py)
+TELEGRAM_WEBHOOK_URL = os.getenv("TELEGRAM_WEBHOOK_URL", "")
+TELEGRAM_WEBHOOK_SECRET = os.getenv("TELEGRAM_WEBHOOK_SECRET", "")
+
+# Polling-бот (telegram_bot.py): сколько обновлений обрабатывать одновременно
+TELEGRAM_BOT_CONCURRENCY = int(os.getenv("TELEGRAM_BOT_CONCURRENCY", "8"))
+# Сколько часов хранить журнал обработанных update_id (Telegram хранит
+# неполученные обновления до 24 часов)
+TELEGRAM_PROCESSED_UPDATES_RETENTION_HOURS = int(
+    os.getenv("TELEGRAM_PROCESSED_UPDATES_RETENTION_HOURS", "48")
+)
+
+# Число параллельных запросов (и размер пула соединений) при массовой рассылке
+TELEGRAM_SEND_CONCURRENCY = int(os.getenv("TELEGRAM_SEND_CONCURRENCY", "16"))
+
+# HTTP-клиент Bot API (общий для процесса): размер keep-alive пула соединений
+# и таймауты (секунды) — установка соединения, ответ на sendMessage и
+# long polling getUpdates (сколько сервер Telegram держит запрос)
+TELEGRAM_HTTP_POOL_SIZE = int(
+    os.getenv("TELEGRAM_HTTP_POOL_SIZE", str(TELEGRAM_SEND_CONCURRENCY))
+)
+TELEGRAM_CONNECT_TIMEOUT = float(os.getenv("TELEGRAM_CONNECT_TIMEOUT", "3.05"))
+TELEGRAM_SEND_TIMEOUT = float(os.getenv("TELEGRAM_SEND_TIMEOUT", "10"))
+TELEGRAM_POLL_TIMEOUT = int(os.getenv("TELEGRAM_POLL_TIMEOUT", "30"))
+
 
 # ============================================================
 # CELERY
@@ -200,14 +230,167 @@ CELERY_BROKER_URL = f"redis://{REDIS_HOST}:{REDIS_PORT}/0"
 CELERY_RESULT_BACKEND = f"redis://{REDIS_HOST}:{REDIS_PORT}/1"
 CELERY_ENABLE_UTC = False
 
+# Ограничение частоты отправки в Telegram (общее для всех воркеров через Redis).
+# TELEGRAM_RATE_LIMIT_BACKEND: "redis" (по умолчанию) или "memory" (один процесс)
+TELEGRAM_RATE_LIMIT_BACKEND = os.getenv("TELEGRAM_RATE_LIMIT_BACKEND", "redis")
+TELEGRAM_RATE_LIMIT_REDIS_URL = f"redis://{REDIS_HOST}:{REDIS_PORT}/2"
+TELEGRAM_RATE_LIMIT_GLOBAL_PER_SECOND = float(
+    os.getenv("TELEGRAM_RATE_LIMIT_GLOBAL_PER_SECOND", "30")
+)
+TELEGRAM_RATE_LIMIT_CHAT_PER_SECOND = float(
+    os.getenv("TELEGRAM_RATE_LIMIT_CHAT_PER_SECOND", "1")
+)
+
+# Очередь исходящих уведомлений (NotificationOutbox): сколько строк забирает
+# отправитель за раз, сколько отправителей запускается на одну рассылку и
+# через сколько секунд строка упавшего отправителя снова станет доступна
+NOTIFICATION_OUTBOX_BATCH_SIZE = int(os.getenv("NOTIFICATION_OUTBOX_BATCH_SIZE", "100"))
+NOTIFICATION_OUTBOX_DRAINERS = int(os.getenv("NOTIFICATION_OUTBOX_DRAINERS", "4"))
+NOTIFICATION_OUTBOX_VISIBILITY_SECONDS = int(
+    os.getenv("NOTIFICATION_OUTBOX_VISIBILITY_SECONDS", "300")
+)
+
+# Размыкатель цепи для Bot API (общий для всех процессов через Redis):
+# размыкается, когда доля ошибок (сеть, таймаут, 5xx) в окне WINDOW_SECONDS
+# достигла FAILURE_RATE при минимум MIN_REQUESTS запросах; через OPEN_SECONDS
+# пропускает HALF_OPEN_PROBES пробных запросов.
+# TELEGRAM_BREAKER_BACKEND: "redis" (по умолчанию) или "memory" (один процесс)
+TELEGRAM_BREAKER_BACKEND = os.getenv("TELEGRAM_BREAKER_BACKEND", "redis")
+TELEGRAM_BREAKER_REDIS_URL = f"redis://{REDIS_HOST}:{REDIS_PORT}/2"
+TELEGRAM_BREAKER_FAILURE_RATE = float(os.getenv("TELEGRAM_BREAKER_FAILURE_RATE", "0.5"))
+TELEGRAM_BREAKER_MIN_REQUESTS = int(os.getenv("TELEGRAM_BREAKER_MIN_REQUESTS", "20"))
+TELEGRAM_BREAKER_WINDOW_SECONDS = float(
+    os.getenv("TELEGRAM_BREAKER_WINDOW_SECONDS", "30")
+)
+TELEGRAM_BREAKER_OPEN_SECONDS = float(os.getenv("TELEGRAM_BREAKER_OPEN_SECONDS", "30"))
+TELEGRAM_BREAKER_HALF_OPEN_PROBES = int(
+    os.getenv("TELEGRAM_BREAKER_HALF_OPEN_PROBES", "1")
+)
+
+# Повторы временных ошибок Telegram (сеть, 429, 5xx): экспоненциальная задержка
+# BASE_DELAY * 2^n секунд (не больше MAX_DELAY), затем — в dead-letter
+TELEGRAM_RETRY_MAX_RETRIES = int(os.getenv("TELEGRAM_RETRY_MAX_RETRIES", "5"))
+TELEGRAM_RETRY_BASE_DELAY = int(os.getenv("TELEGRAM_RETRY_BASE_DELAY", "5"))
+TELEGRAM_RETRY_MAX_DELAY = int(os.getenv("TELEGRAM_RETRY_MAX_DELAY", "600"))
+
+# Как часто запускать рассылку напоминаний (в минутах). Рассылка обрабатывает
+# всё, что наступило с прошлого запуска, поэтому на небольших инсталляциях
+# можно запускать её реже (ценой задержки напоминаний до N минут).
+HABIT_REMINDERS_DISPATCH_INTERVAL_MINUTES = int(
+    os.getenv("HABIT_REMINDERS_DISPATCH_INTERVAL_MINUTES", "1")
+)
+
+# Аренды в Redis (habits.lease): одна рассылка напоминаний за раз
+# и выбор лидера среди нескольких процессов Celery Beat.
+# HABIT_LEASE_BACKEND: "redis" (по умолчанию) или "memory" (один процесс)
+HABIT_LEASE_BACKEND = os.getenv("HABIT_LEASE_BACKEND", "redis")
+HABIT_LEASE_REDIS_URL = f"redis://{REDIS_HOST}:{REDIS_PORT}/4"
+# TTL аренды рассылки: за столько секунд после падения тика аренда освобождается
+HABIT_REMINDERS_DISPATCH_LEASE_SECONDS = float(
+    os.getenv("HABIT_REMINDERS_DISPATCH_LEASE_SECONDS", "30")
+)
+# TTL аренды лидера beat: резервный beat берёт расписание на себя
+# не позже чем через столько секунд после падения лидера
+HABIT_BEAT_LEADER_TTL_SECONDS = float(os.getenv("HABIT_BEAT_LEADER_TTL_SECONDS", "10"))
+CELERY_BEAT_SCHEDULER = "habits.beat:LeaderElectedScheduler"
+
 # Периодические задачи
 CELERY_BEAT_SCHEDULE = {
     "send-habit-reminders-every-minute": {
         "task": "habits.tasks.send_habit_reminders",
-        "schedule": crontab(),  # каждую минуту
+        # по умолчанию — каждую минуту
+        "schedule": crontab(minute=f"*/{HABIT_REMINDERS_DISPATCH_INTERVAL_MINUTES}"),
+    },
+    "stage-habit-reminders": {
+        "task": "habits.tasks.stage_habit_reminders",
+        "schedule": crontab(minute=f"*/{HABIT_REMINDERS_DISPATCH_INTERVAL_MINUTES}"),
+    },
+    "send-habit-digests": {
+        "task": "habits.tasks.send_habit_digests",
+        "schedule": crontab(minute=f"*/{HABIT_REMINDERS_DISPATCH_INTERVAL_MINUTES}"),
+    },
+    "drain-notification-outbox-every-minute": {
+        "task": "notifications.tasks.drain_notification_outbox",
+        "schedule": crontab(),
+    },
+    "realign-reminder-schedule-daily": {
+        "task": "habits.tasks.realign_reminder_schedule",
+        "schedule": crontab(hour=2, minute=45),  # раз в сутки
+    },
+    "prune-reminder-deliveries-daily": {
+        "task": "habits.tasks.prune_reminder_deliveries",
+        "schedule": crontab(hour=3, minute=15),  # раз в сутки
+    },
+    "prune-schedule-changes-hourly": {
+        "task": "habits.tasks.prune_schedule_changes",
+        "schedule": crontab(minute=35),  # раз в час
+    },
+    "prune-processed-telegram-updates-daily": {
+        "task": "notifications.tasks.prune_processed_updates",
+        "schedule": crontab(hour=3, minute=30),  # раз в сутки
     },
 }
 
+# ============================================================
+# НАПОМИНАНИЯ О ПРИВЫЧКАХ
+# ============================================================
+
+# Максимальный размер шарда (привычек на одну задачу send_habit_reminders_shard)
+HABIT_REMINDERS_SHARD_SIZE = int(os.getenv("HABIT_REMINDERS_SHARD_SIZE", "500"))
+
+# На сколько секунд растягивать отправку шардов одного запуска рассылки
+# (not_before их строк NotificationOutbox). Напоминания приходят с опозданием
+# не больше этого значения, зато пик :00/:30 превращается в ровный поток.
+# 0 — без растяжки.
+HABIT_REMINDERS_MAX_SKEW_SECONDS = float(
+    os.getenv("HABIT_REMINDERS_MAX_SKEW_SECONDS", "45")
+)
+
+# Предзагрузка напоминаний следующих минут (habits.staging).
+# HABIT_REMINDERS_STAGE_BACKEND: "redis" (по умолчанию), "memory" (один процесс)
+# или "off" — шард всегда читает привычки из БД.
+HABIT_REMINDERS_STAGE_BACKEND = os.getenv("HABIT_REMINDERS_STAGE_BACKEND", "redis")
+HABIT_REMINDERS_STAGE_REDIS_URL = f"redis://{REDIS_HOST}:{REDIS_PORT}/3"
+# Сколько секунд хранить подготовленные корзины (и пометки об их устаревании)
+HABIT_REMINDERS_STAGE_TTL_SECONDS = int(
+    os.getenv("HABIT_REMINDERS_STAGE_TTL_SECONDS", "600")
+)
+
+# Планировщик на иерархическом колесе таймеров (reminder_scheduler.py) —
+# альтернатива поминутному опросу: держит вхождения ближайших суток в памяти
+# процесса и отдаёт их шардам точно в срок. При включении пишется лента
+# изменений HabitScheduleChange; поминутную рассылку beat стоит оставить
+# страховкой с большим интервалом (HABIT_REMINDERS_DISPATCH_INTERVAL_MINUTES=15).
+HABIT_REMINDER_SCHEDULER_ENABLED = (
+    os.getenv("HABIT_REMINDER_SCHEDULER_ENABLED", "False") == "True"
+)
+# Файл снимка для «тёплого» перезапуска планировщика
+HABIT_REMINDER_SCHEDULER_SNAPSHOT = os.getenv(
+    "HABIT_REMINDER_SCHEDULER_SNAPSHOT",
+    str(BASE_DIR / "reminder_scheduler.snapshot.json"),
+)
+# Как часто (в секундах) читать ленту изменений и расширять горизонт
+HABIT_REMINDER_SCHEDULER_POLL_SECONDS = float(
+    os.getenv("HABIT_REMINDER_SCHEDULER_POLL_SECONDS", "2")
+)
+# Сколько часов хранить ленту изменений (снимок старше — «холодный» старт)
+HABIT_SCHEDULE_CHANGE_RETENTION_HOURS = int(
+    os.getenv("HABIT_SCHEDULE_CHANGE_RETENTION_HOURS", "48")
+)
+
+# Сколько пользователей обрабатывается одной пачкой ежедневных сводок
+HABIT_DIGEST_BATCH_SIZE = int(os.getenv("HABIT_DIGEST_BATCH_SIZE", "500"))
+
+# Размер порции серверного курсора при чтении привычек шарда
+HABIT_REMINDERS_FETCH_CHUNK_SIZE = int(
+    os.getenv("HABIT_REMINDERS_FETCH_CHUNK_SIZE", "2000")
+)
+
+# Сколько дней хранить журнал доставки напоминаний (ReminderDelivery)
+REMINDER_DELIVERY_RETENTION_DAYS = int(
+    os.getenv("REMINDER_DELIVERY_RETENTION_DAYS", "30")
+)
+
 
 # ============================================================
 # CORS / CSRF
@@ -10,6 +10,45 @@
 import pytest
 
 
+@pytest.fixture(autouse=True)
+def celery_eager():
+    """
+    Выполнять Celery-задачи синхронно (без брокера и воркеров).
+    Нужно, чтобы планировщик напоминаний, ставящий шарды через `.delay()`,
+    в тестах сразу выполнял их в текущем процессе.
+    """
+    from config import celery_app
+
+    previous = celery_app.conf.task_always_eager
+    celery_app.conf.task_always_eager = True
+    yield
+    celery_app.conf.task_always_eager = previous
+
+
+# Бэкенды состояния, которые в тестах работают в памяти (без Redis)
+MEMORY_BACKEND_PREFIXES = (
+    "TELEGRAM_RATE_LIMIT",
+    "TELEGRAM_BREAKER",
+    "HABIT_REMINDERS_STAGE",
+    "HABIT_LEASE",
+)
+
+
+@pytest.fixture(autouse=True)
+def backends_in_memory(settings):
+    """
+    Бэкенды состояния (config.backends) в тестах — в памяти (без Redis),
+    а общие для процесса объекты — свежие для каждого теста.
+    """
+    from config.backends import MEMORY_BACKEND, reset_singletons
+
+    for prefix in MEMORY_BACKEND_PREFIXES:
+        setattr(settings, f"{prefix}_BACKEND", MEMORY_BACKEND)
+    reset_singletons()
+    yield
+    reset_singletons()
+
+
 @pytest.fixture
 def api_client():
     """
@@ -52,4 +91,4 @@ def auth_client(api_client, user):
 
     token, _ = Token.objects.get_or_create(user=user)
     api_client.credentials(HTTP_AUTHORIZATION=f"Token {token.key}")
-    return api_client
\ No newline at end of file
+    return api_client
@@ -1,6 +1,6 @@
 """
 Админ-конфигурация приложения habits.
-Содержит настройки отображения моделей Place и Habit
+Содержит настройки отображения моделей Place, Habit и ReminderDelivery
 в административной панели Django:
 - списки полей
 - фильтры
@@ -10,7 +10,7 @@
 
 from django.contrib import admin
 
-from .models import Place, Habit
+from .models import Place, Habit, ReminderDelivery
 
 
 @admin.register(Place)
@@ -51,3 +51,31 @@ class HabitAdmin(admin.ModelAdmin):
     list_filter = ("is_pleasant", "is_public", "periodicity", "place")
     search_fields = ("action", "reward", "user__username")
     autocomplete_fields = ("user", "place", "related_habit")
+
+
+@admin.register(ReminderDelivery)
+class ReminderDeliveryAdmin(admin.ModelAdmin):
+    """
+    Админ-настройки для журнала доставки напоминаний (только просмотр).
+    Позволяет:
+    - видеть статус, задержку и message_id каждой доставки
+    - фильтровать по статусу и дате вхождения
+    """
+
+    list_display = (
+        "habit",
+        "scheduled_for",
+        "status",
+        "latency_ms",
+        "message_id",
+        "sent_at",
+    )
+    list_filter = ("status", "scheduled_for")
+    list_select_related = ("habit",)
+    raw_id_fields = ("habit",)
+
+    def has_add_permission(self, request) -> bool:
+        return False
+
+    def has_change_permission(self, request, obj=None) -> bool:
+        return False
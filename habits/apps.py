@@ -17,3 +17,9 @@ class HabitsConfig(AppConfig):
     default_auto_field = "django.db.models.BigAutoField"
     name = "habits"
     verbose_name = "Привычки"
+
+    def ready(self) -> None:
+        """
+        Подключает сигналы синхронизации индекса расписания напоминаний.
+        """
+        from habits import signals  # noqa: F401
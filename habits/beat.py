@@ -0,0 +1,52 @@
+"""
+Celery Beat с выбором лидера.
+Можно запускать несколько процессов beat (горячий резерв): расписание
+отправляет только тот, кто держит аренду BEAT_LEADER_LEASE (habits.lease).
+Лидер продлевает аренду на каждом шаге не реже раза в треть TTL;
+резервный раз в секунду пытается её захватить и становится лидером
+не позже чем через HABIT_BEAT_LEADER_TTL_SECONDS после падения прежнего.
+Подключается настройкой CELERY_BEAT_SCHEDULER.
+"""
+
+from celery.beat import PersistentScheduler
+from django.conf import settings
+
+from habits.lease import Lease, get_lease_backend
+
+BEAT_LEADER_LEASE = "celery_beat_leader"
+
+# Как часто резервный beat пытается стать лидером (секунды)
+STANDBY_INTERVAL = 1.0
+
+
+class LeaderElectedScheduler(PersistentScheduler):
+    """
+    PersistentScheduler, который выполняет шаг расписания только у лидера.
+    """
+
+    def __init__(self, *args, **kwargs) -> None:
+        self.leader_lease = Lease(
+            get_lease_backend(),
+            BEAT_LEADER_LEASE,
+            settings.HABIT_BEAT_LEADER_TTL_SECONDS,
+        )
+        super().__init__(*args, **kwargs)
+
+    def is_leader(self) -> bool:
+        """
+        Продлевает аренду лидера или пытается её захватить.
+        """
+        if self.leader_lease.held and self.leader_lease.renew():
+            return True
+        return self.leader_lease.acquire() is not None
+
+    def tick(self, *args, **kwargs) -> float:
+        if not self.is_leader():
+            return STANDBY_INTERVAL
+        interval = super().tick(*args, **kwargs)
+        return min(interval, settings.HABIT_BEAT_LEADER_TTL_SECONDS / 3)
+
+    def close(self) -> None:
+        super().close()
+        # Штатная остановка: резервному не нужно ждать истечения TTL
+        self.leader_lease.release(merge=False)
@@ -0,0 +1,254 @@
+"""
+Аренда (lease) в Redis с fencing-токенами.
+Используется, чтобы:
+- рассылку напоминаний (send_habit_reminders) одновременно выполнял только
+  один тик, даже при нескольких beat или затянувшемся тике;
+- из нескольких процессов Celery Beat расписание отправлял только лидер
+  (habits.beat.LeaderElectedScheduler), а резервный подхватывал его
+  за несколько секунд после падения.
+Аренда — ключ с TTL, в котором лежит идентификатор владельца; продлить
+и снять её может только владелец. При каждом захвате выдаётся fencing-токен —
+монотонно растущее число: хранилище, куда пишет владелец (например,
+ReminderDispatchState), отклоняет записи с токеном меньше уже виденного,
+поэтому владелец, потерявший аренду из-за паузы, ничего не испортит.
+Слияние тиков: тик, не получивший аренду, оставляет отметку «нужно ещё
+раз», и владелец перед снятием аренды атомарно её забирает и обрабатывает
+окно до текущего момента ещё раз — вместо второго параллельного прохода.
+Бэкенды:
+- RedisLeaseBackend — общее состояние для всех процессов (Lua-скрипты);
+- InMemoryLeaseBackend — в памяти процесса (тесты, локальный запуск).
+"""
+
+import threading
+import time
+import uuid
+from collections.abc import Callable
+from typing import Protocol
+
+from redis.exceptions import RedisError
+
+from config.backends import ProcessSingleton, backend_redis
+
+# Захват: SET NX PX и выдача следующего fencing-токена
+_ACQUIRE_SCRIPT = """
+if redis.call('SET', KEYS[1], ARGV[1], 'NX', 'PX', ARGV[2]) then
+  return redis.call('INCR', KEYS[2])
+end
+return 0
+"""
+
+# Продление: только своей аренды
+_RENEW_SCRIPT = """
+if redis.call('GET', KEYS[1]) == ARGV[1] then
+  return redis.call('PEXPIRE', KEYS[1], ARGV[2])
+end
+return 0
+"""
+
+# Снятие: если есть отметка слияния — забрать её и оставить аренду за собой (2),
+# иначе удалить ключ (1); чужая или истёкшая аренда — 0
+_RELEASE_SCRIPT = """
+if redis.call('GET', KEYS[1]) ~= ARGV[1] then
+  return 0
+end
+if ARGV[2] == '1' and redis.call('DEL', KEYS[2]) == 1 then
+  redis.call('PEXPIRE', KEYS[1], ARGV[3])
+  return 2
+end
+redis.call('DEL', KEYS[1])
+return 1
+"""
+
+RELEASED, MERGE_PENDING, LOST = 1, 2, 0
+
+
+class LeaseBackend(Protocol):
+    """
+    Хранилище аренды.
+    acquire() — fencing-токен или 0, если аренда занята;
+    renew() — удалось ли продлить свою аренду;
+    release() — RELEASED, MERGE_PENDING (аренда оставлена за владельцем)
+    или LOST (аренда уже не наша);
+    request_merge() — оставить отметку «нужно ещё раз».
+    """
+
+    def acquire(self, name: str, owner: str, ttl_ms: int) -> int: ...
+
+    def renew(self, name: str, owner: str, ttl_ms: int) -> bool: ...
+
+    def release(self, name: str, owner: str, ttl_ms: int, merge: bool) -> int: ...
+
+    def request_merge(self, name: str, ttl_ms: int) -> None: ...
+
+
+class InMemoryLeaseBackend:
+    """
+    Аренда в памяти процесса (потокобезопасно).
+    Подходит для тестов и запуска с одним процессом.
+    """
+
+    def __init__(self, clock: Callable[[], float] = time.monotonic) -> None:
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._owners: dict[str, tuple[str, float]] = {}
+        self._tokens: dict[str, int] = {}
+        self._merges: dict[str, float] = {}
+
+    def _owner(self, name: str) -> str | None:
+        owner, expires = self._owners.get(name, (None, 0.0))
+        return owner if expires > self._clock() else None
+
+    def acquire(self, name: str, owner: str, ttl_ms: int) -> int:
+        with self._lock:
+            if self._owner(name) is not None:
+                return 0
+            self._owners[name] = (owner, self._clock() + ttl_ms / 1000)
+            self._tokens[name] = self._tokens.get(name, 0) + 1
+            return self._tokens[name]
+
+    def renew(self, name: str, owner: str, ttl_ms: int) -> bool:
+        with self._lock:
+            if self._owner(name) != owner:
+                return False
+            self._owners[name] = (owner, self._clock() + ttl_ms / 1000)
+            return True
+
+    def release(self, name: str, owner: str, ttl_ms: int, merge: bool) -> int:
+        with self._lock:
+            if self._owner(name) != owner:
+                return LOST
+            if merge and self._merges.pop(name, 0.0) > self._clock():
+                self._owners[name] = (owner, self._clock() + ttl_ms / 1000)
+                return MERGE_PENDING
+            del self._owners[name]
+            return RELEASED
+
+    def request_merge(self, name: str, ttl_ms: int) -> None:
+        with self._lock:
+            self._merges[name] = self._clock() + ttl_ms / 1000
+
+
+class RedisLeaseBackend:
+    """
+    Аренда в Redis — одна на все процессы и хосты.
+    Ключи: <prefix><name> (владелец, TTL), <prefix><name>:fence (счётчик
+    токенов), <prefix><name>:merge (отметка слияния).
+    Ошибки Redis считаются «аренду получить/продлить не удалось».
+    """
+
+    def __init__(self, client, prefix: str = "habits:lease:") -> None:
+        self._client = client
+        self._prefix = prefix
+        self._acquire = client.register_script(_ACQUIRE_SCRIPT)
+        self._renew = client.register_script(_RENEW_SCRIPT)
+        self._release = client.register_script(_RELEASE_SCRIPT)
+
+    def _key(self, name: str, suffix: str = "") -> str:
+        return f"{self._prefix}{name}{suffix}"
+
+    def acquire(self, name: str, owner: str, ttl_ms: int) -> int:
+        try:
+            return int(
+                self._acquire(
+                    keys=[self._key(name), self._key(name, ":fence")],
+                    args=[owner, ttl_ms],
+                )
+            )
+        except RedisError:
+            return 0
+
+    def renew(self, name: str, owner: str, ttl_ms: int) -> bool:
+        try:
+            return bool(self._renew(keys=[self._key(name)], args=[owner, ttl_ms]))
+        except RedisError:
+            return False
+
+    def release(self, name: str, owner: str, ttl_ms: int, merge: bool) -> int:
+        try:
+            return int(
+                self._release(
+                    keys=[self._key(name), self._key(name, ":merge")],
+                    args=[owner, "1" if merge else "0", ttl_ms],
+                )
+            )
+        except RedisError:
+            return LOST
+
+    def request_merge(self, name: str, ttl_ms: int) -> None:
+        try:
+            self._client.set(self._key(name, ":merge"), "1", px=ttl_ms)
+        except RedisError:
+            pass
+
+
+class Lease:
+    """
+    Аренда name на ttl секунд для одного владельца (экземпляр = владелец).
+    """
+
+    def __init__(self, backend: LeaseBackend, name: str, ttl: float) -> None:
+        self._backend = backend
+        self._name = name
+        self._ttl_ms = int(ttl * 1000)
+        self._owner = uuid.uuid4().hex
+        self.fencing_token: int | None = None
+
+    @property
+    def held(self) -> bool:
+        return self.fencing_token is not None
+
+    def acquire(self) -> int | None:
+        """
+        Пытается захватить аренду.
+        :return: fencing-токен или None, если аренда у другого владельца
+        """
+        token = self._backend.acquire(self._name, self._owner, self._ttl_ms)
+        self.fencing_token = token or None
+        return self.fencing_token
+
+    def renew(self) -> bool:
+        """
+        Продлевает свою аренду; False — аренда потеряна.
+        """
+        if not self.held:
+            return False
+        if not self._backend.renew(self._name, self._owner, self._ttl_ms):
+            self.fencing_token = None
+        return self.held
+
+    def release(self, merge: bool = True) -> bool:
+        """
+        Снимает аренду.
+        :param merge: учитывать отметку слияния
+        :return: False — был запрошен ещё один проход: аренда продлена
+                 и остаётся за владельцем; True — аренда снята (или потеряна)
+        """
+        if not self.held:
+            return True
+        result = self._backend.release(self._name, self._owner, self._ttl_ms, merge)
+        if result == MERGE_PENDING:
+            return False
+        self.fencing_token = None
+        return True
+
+    def request_merge(self) -> None:
+        """
+        Просит текущего владельца сделать ещё один проход перед снятием аренды.
+        """
+        self._backend.request_merge(self._name, self._ttl_ms)
+
+
+def build_lease_backend() -> LeaseBackend:
+    """
+    Создаёт хранилище аренды по настройкам HABIT_LEASE_*.
+    """
+    redis = backend_redis("HABIT_LEASE")
+    if redis is None:
+        return InMemoryLeaseBackend()
+    return RedisLeaseBackend(redis)
+
+
+# Общее для процесса хранилище аренды (создаётся лениво, один раз)
+lease_backend = ProcessSingleton(build_lease_backend)
+get_lease_backend = lease_backend.get
+reset_lease_backend = lease_backend.reset
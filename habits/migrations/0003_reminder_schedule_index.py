@@ -0,0 +1,61 @@
+# Generated by Django 5.2.8 on 2026-10-17 07:15
+
+from django.db import migrations, models
+from django.db.models.functions import ExtractHour, ExtractMinute
+
+
+def backfill_reminder_schedule(apps, schema_editor):
+    """
+    Заполняет minute_of_day и reminders_enabled для существующих привычек
+    двумя set-based UPDATE (без загрузки строк в Python).
+    """
+    Habit = apps.get_model("habits", "Habit")
+    TelegramProfile = apps.get_model("notifications", "TelegramProfile")
+
+    Habit.objects.update(minute_of_day=ExtractHour("time") * 60 + ExtractMinute("time"))
+    Habit.objects.filter(
+        user_id__in=TelegramProfile.objects.filter(is_active=True).values("user_id")
+    ).update(reminders_enabled=True)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("habits", "0002_alter_habit_duration"),
+        ("notifications", "0003_alter_telegramlinktoken_options_and_more"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="habit",
+            name="minute_of_day",
+            field=models.PositiveSmallIntegerField(
+                default=0,
+                editable=False,
+                help_text="Поле time в минутах от полуночи (заполняется автоматически).",
+                verbose_name="минута суток",
+            ),
+        ),
+        migrations.AddField(
+            model_name="habit",
+            name="reminders_enabled",
+            field=models.BooleanField(
+                default=False,
+                editable=False,
+                help_text="Есть ли у владельца активный Telegram-профиль (поддерживается автоматически).",
+                verbose_name="напоминания включены",
+            ),
+        ),
+        migrations.RunPython(
+            backfill_reminder_schedule,
+            reverse_code=migrations.RunPython.noop,
+        ),
+        migrations.AddIndex(
+            model_name="habit",
+            index=models.Index(
+                condition=models.Q(("reminders_enabled", True)),
+                fields=["minute_of_day"],
+                name="habit_reminder_minute_idx",
+            ),
+        ),
+    ]
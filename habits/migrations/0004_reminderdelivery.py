@@ -0,0 +1,106 @@
+# Generated by Django 5.2.8 on 2026-10-17 07:26
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("habits", "0003_reminder_schedule_index"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="ReminderDelivery",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "scheduled_for",
+                    models.DateTimeField(
+                        help_text="Минута, за которую отправляется напоминание.",
+                        verbose_name="запланировано на",
+                    ),
+                ),
+                (
+                    "status",
+                    models.CharField(
+                        choices=[
+                            ("pending", "ожидает отправки"),
+                            ("skipped", "пропущено"),
+                            ("ok", "отправлено"),
+                            ("disabled", "бот не настроен"),
+                            ("network_error", "сетевая ошибка"),
+                            ("rate_limited", "превышен лимит (429)"),
+                            ("server_error", "ошибка сервера (5xx)"),
+                            ("permanent", "постоянная ошибка (4xx)"),
+                        ],
+                        default="pending",
+                        max_length=32,
+                        verbose_name="статус",
+                    ),
+                ),
+                (
+                    "claimed_at",
+                    models.DateTimeField(
+                        default=django.utils.timezone.now, verbose_name="захвачено"
+                    ),
+                ),
+                (
+                    "sent_at",
+                    models.DateTimeField(
+                        blank=True, null=True, verbose_name="отправлено"
+                    ),
+                ),
+                (
+                    "latency_ms",
+                    models.PositiveIntegerField(
+                        blank=True,
+                        help_text="Время от запланированной минуты до ответа Telegram.",
+                        null=True,
+                        verbose_name="задержка доставки (мс)",
+                    ),
+                ),
+                (
+                    "message_id",
+                    models.BigIntegerField(
+                        blank=True, null=True, verbose_name="Telegram message_id"
+                    ),
+                ),
+                (
+                    "habit",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="deliveries",
+                        to="habits.habit",
+                        verbose_name="привычка",
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "доставка напоминания",
+                "verbose_name_plural": "журнал доставки напоминаний",
+                "ordering": ("-scheduled_for",),
+                "indexes": [
+                    models.Index(
+                        fields=["scheduled_for"], name="reminder_delivery_sched_idx"
+                    )
+                ],
+                "constraints": [
+                    models.UniqueConstraint(
+                        fields=("habit", "scheduled_for"),
+                        name="uniq_reminder_delivery_occurrence",
+                    )
+                ],
+            },
+        ),
+    ]
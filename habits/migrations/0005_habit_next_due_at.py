@@ -0,0 +1,73 @@
+# Generated by Django 5.2.8 on 2026-10-17 07:35
+
+import datetime
+
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models.expressions import RawSQL
+from django.utils import timezone
+
+
+def backfill_next_due_at(apps, schema_editor):
+    """
+    Заполняет next_due_at одним set-based UPDATE: ближайшее вхождение `time`
+    начиная с текущей минуты (та же формула, что HabitQuerySet.recompute_next_due_at).
+    """
+    Habit = apps.get_model("habits", "Habit")
+
+    now = timezone.localtime().replace(second=0, microsecond=0)
+    today = now.date()
+    Habit.objects.update(
+        next_due_at=RawSQL(
+            '((CASE WHEN "time" >= %s THEN %s::date ELSE %s::date END)'
+            ' + "time") AT TIME ZONE %s',
+            (
+                now.time(),
+                today,
+                today + datetime.timedelta(days=1),
+                timezone.get_current_timezone_name(),
+            ),
+        )
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("habits", "0004_reminderdelivery"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name="habit",
+            name="habit_reminder_minute_idx",
+        ),
+        migrations.RemoveField(
+            model_name="habit",
+            name="minute_of_day",
+        ),
+        migrations.AddField(
+            model_name="habit",
+            name="next_due_at",
+            field=models.DateTimeField(
+                blank=True,
+                editable=False,
+                help_text="Ближайшее вхождение с учётом периодичности (поддерживается автоматически).",
+                null=True,
+                verbose_name="следующее напоминание",
+            ),
+        ),
+        migrations.RunPython(
+            backfill_next_due_at,
+            reverse_code=migrations.RunPython.noop,
+        ),
+        migrations.AddIndex(
+            model_name="habit",
+            index=models.Index(
+                condition=models.Q(("reminders_enabled", True)),
+                fields=["next_due_at"],
+                name="habit_reminder_due_idx",
+            ),
+        ),
+    ]
@@ -0,0 +1,48 @@
+# Generated by Django 5.2.8 on 2026-10-17 07:38
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("habits", "0005_habit_next_due_at"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="ReminderDispatchState",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "key",
+                    models.CharField(
+                        max_length=64, unique=True, verbose_name="рассылка"
+                    ),
+                ),
+                (
+                    "processed_until",
+                    models.DateTimeField(
+                        help_text="Конец последнего обработанного окна (включительно).",
+                        verbose_name="обработано до",
+                    ),
+                ),
+                (
+                    "updated_at",
+                    models.DateTimeField(auto_now=True, verbose_name="обновлено"),
+                ),
+            ],
+            options={
+                "verbose_name": "состояние рассылки",
+                "verbose_name_plural": "состояния рассылок",
+            },
+        ),
+    ]
@@ -0,0 +1,90 @@
+# Generated by Django 5.2.8 on 2026-10-17 07:47
+
+from django.db import migrations, models
+
+
+# Копия логики habits.models на момент миграции: миграция не должна
+# меняться вместе с живыми функциями рендеринга.
+def render_habit_title(action, periodicity, time, place_name):
+    if periodicity == 1:
+        freq = "ежедневно"
+    elif periodicity == 7:
+        freq = "еженедельно"
+    else:
+        freq = f"каждые {periodicity} дней"
+
+    time_str = time.strftime("%H:%M")
+
+    place_str = f"в {place_name}" if place_name is not None else "где бы то ни было"
+
+    return f"Я буду {action.lower()} {freq} в {time_str} {place_str}"
+
+
+def render_reminder_text(title):
+    return (
+        "⏰ <b>Напоминание о привычке</b>\n\n"
+        f"{title}\n\n"
+        "Не забудь выполнить привычку и отметить прогресс! 💪"
+    )
+
+
+def backfill_rendered_texts(apps, schema_editor):
+    """
+    Заполняет rendered_title и reminder_text существующих привычек
+    порциями через bulk_update (строки читаются проекцией).
+    """
+    Habit = apps.get_model("habits", "Habit")
+
+    rows = Habit.objects.values_list(
+        "id", "action", "periodicity", "time", "place__name"
+    ).iterator(chunk_size=500)
+    batch = []
+    for habit_id, action, periodicity, time, place_name in rows:
+        title = render_habit_title(action, periodicity, time, place_name)
+        batch.append(
+            Habit(
+                id=habit_id,
+                rendered_title=title,
+                reminder_text=render_reminder_text(title),
+            )
+        )
+        if len(batch) >= 500:
+            Habit.objects.bulk_update(batch, ["rendered_title", "reminder_text"])
+            batch = []
+    if batch:
+        Habit.objects.bulk_update(batch, ["rendered_title", "reminder_text"])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("habits", "0006_reminderdispatchstate"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="habit",
+            name="reminder_text",
+            field=models.TextField(
+                blank=True,
+                editable=False,
+                help_text="Готовый текст Telegram-напоминания (поддерживается автоматически).",
+                verbose_name="текст напоминания",
+            ),
+        ),
+        migrations.AddField(
+            model_name="habit",
+            name="rendered_title",
+            field=models.CharField(
+                blank=True,
+                editable=False,
+                help_text="Готовое название привычки (поддерживается автоматически).",
+                max_length=512,
+                verbose_name="название",
+            ),
+        ),
+        migrations.RunPython(
+            backfill_rendered_texts,
+            reverse_code=migrations.RunPython.noop,
+        ),
+    ]
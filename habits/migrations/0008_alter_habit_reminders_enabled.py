@@ -0,0 +1,23 @@
+# Generated by Django 5.2.8 on 2026-10-17 07:51
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("habits", "0007_habit_rendered_texts"),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name="habit",
+            name="reminders_enabled",
+            field=models.BooleanField(
+                default=False,
+                editable=False,
+                help_text="Есть ли у владельца активный Telegram-профиль в режиме «по каждой привычке» (поддерживается автоматически).",
+                verbose_name="напоминания включены",
+            ),
+        ),
+    ]
@@ -0,0 +1,38 @@
+# Generated by Django 5.2.8 on 2026-10-17 08:03
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("habits", "0008_alter_habit_reminders_enabled"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="HabitScheduleChange",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("user_id", models.IntegerField(verbose_name="пользователь")),
+                (
+                    "created_at",
+                    models.DateTimeField(
+                        auto_now_add=True, db_index=True, verbose_name="создано"
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "изменение расписания",
+                "verbose_name_plural": "изменения расписания",
+            },
+        ),
+    ]
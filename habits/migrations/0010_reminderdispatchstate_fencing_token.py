@@ -0,0 +1,22 @@
+# Generated by Django 5.2.8 on 2026-10-17 08:06
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("habits", "0009_habitschedulechange"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="reminderdispatchstate",
+            name="fencing_token",
+            field=models.BigIntegerField(
+                default=0,
+                help_text="Наибольший токен аренды, с которым сдвигался водяной знак.",
+                verbose_name="fencing-токен",
+            ),
+        ),
+    ]
@@ -0,0 +1,33 @@
+# Generated by Django 5.2.8 on 2026-10-17 08:17
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("habits", "0010_reminderdispatchstate_fencing_token"),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name="reminderdelivery",
+            name="status",
+            field=models.CharField(
+                choices=[
+                    ("pending", "ожидает отправки"),
+                    ("skipped", "пропущено"),
+                    ("ok", "отправлено"),
+                    ("disabled", "бот не настроен"),
+                    ("network_error", "сетевая ошибка"),
+                    ("rate_limited", "превышен лимит (429)"),
+                    ("server_error", "ошибка сервера (5xx)"),
+                    ("permanent", "постоянная ошибка (4xx)"),
+                    ("circuit_open", "Bot API недоступен (размыкатель)"),
+                ],
+                default="pending",
+                max_length=32,
+                verbose_name="статус",
+            ),
+        ),
+    ]
@@ -0,0 +1,47 @@
+# Generated by Django 5.2.8 on 2026-10-17 08:39
+
+import html
+
+from django.db import migrations
+
+
+# Копия логики habits.models на момент миграции: миграция не должна
+# меняться вместе с живыми функциями рендеринга.
+def render_reminder_text(title):
+    return (
+        "⏰ <b>Напоминание о привычке</b>\n\n"
+        f"{html.escape(title)}\n\n"
+        "Не забудь выполнить привычку и отметить прогресс! 💪"
+    )
+
+
+def escape_reminder_texts(apps, schema_editor):
+    """
+    Перегенерирует reminder_text существующих привычек с экранированным
+    названием (порциями через bulk_update).
+    """
+    Habit = apps.get_model("habits", "Habit")
+
+    rows = Habit.objects.values_list("id", "rendered_title").iterator(chunk_size=500)
+    batch = []
+    for habit_id, title in rows:
+        batch.append(Habit(id=habit_id, reminder_text=render_reminder_text(title)))
+        if len(batch) >= 500:
+            Habit.objects.bulk_update(batch, ["reminder_text"])
+            batch = []
+    if batch:
+        Habit.objects.bulk_update(batch, ["reminder_text"])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("habits", "0011_alter_reminderdelivery_status"),
+    ]
+
+    operations = [
+        migrations.RunPython(
+            escape_reminder_texts,
+            reverse_code=migrations.RunPython.noop,
+        ),
+    ]
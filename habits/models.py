@@ -3,19 +3,51 @@
 Содержит:
 - Place: справочник мест выполнения привычек.
 - Habit: привычка пользователя по ТЗ проекта AtomicHabits.
+- ReminderDelivery: журнал доставки напоминаний (одна запись на вхождение).
+- ReminderDispatchState: «водяной знак» рассылки — до какого момента она
+  уже обработана.
+- HabitScheduleChange: лента изменений расписания для планировщика
+  напоминаний (habits.scheduler).
 Важные бизнес-правила (по ТЗ) реализованы в Habit.clean():
 1) Нельзя одновременно указывать reward и related_habit.
 2) Время выполнения должно быть > 0 и <= 120 секунд (если задано).
 3) Связанная привычка (related_habit) может быть только pleasant (is_pleasant=True).
 4) У pleasant-привычки не может быть reward или related_habit.
 5) Periodicity (периодичность) — от 1 до 7 дней включительно.
+Готовые тексты:
+- rendered_title и reminder_text хранят название привычки (Habit.title) и
+  текст Telegram-напоминания; перегенерируются в save() только при смене
+  action, time, periodicity или place, а при переименовании/удалении места —
+  пакетно для всех его привычек (HabitQuerySet.rerender_texts).
+  API и рассылка читают их без join к Place.
+Расписание напоминаний:
+- next_due_at — ближайшее вхождение привычки с учётом time и periodicity;
+  пересчитывается set-based UPDATE при смене time/periodicity
+  (HabitQuerySet.recompute_next_due_at) и сдвигается на periodicity дней
+  после каждой доставки (ReminderDelivery.claim);
+- `time` — местное время владельца (TelegramProfile.time_zone),
+  next_due_at — момент в UTC; задача realign_reminder_schedule
+  поправляет его при смене смещения пояса (летнее время, tzdata);
+- reminders_enabled — есть ли у владельца активный TelegramProfile;
+- частичный индекс по next_due_at (только reminders_enabled=True)
+  превращает поиск привычек к отправке в один range scan `next_due_at <= now`.
 """
 
 import datetime
+import html
+from typing import Any
 
 from django.conf import settings
 from django.core.exceptions import ValidationError
-from django.db import models
+from django.db import connection, models, transaction
+from django.db.models.expressions import RawSQL
+from django.utils import timezone
+
+from notifications.models import (
+    TelegramDeliveryMode,
+    TelegramProfile,
+    TelegramSendStatus,
+)
 
 from .validators import (
     validate_duration_max_120_seconds,
@@ -53,6 +85,240 @@ class Place(models.Model):
     def __str__(self) -> str:
         return self.name
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance._loaded_name = instance.__dict__.get("name")
+        return instance
+
+    def save(self, *args, **kwargs):
+        """
+        При переименовании места пакетно обновляет готовые тексты его привычек.
+        """
+        renamed = (
+            not self._state.adding
+            and getattr(self, "_loaded_name", self.name) != self.name
+        )
+        result = super().save(*args, **kwargs)
+        if renamed:
+            self.habits.all().rerender_texts(self.name)
+        self._loaded_name = self.name
+        return result
+
+
+def habit_time_zone_sql(habit_alias: str, default_param: str = "%s") -> str:
+    """
+    SQL-выражение часового пояса владельца привычки
+    (TelegramProfile.time_zone, иначе — параметр с TIME_ZONE сервера).
+    :param habit_alias: имя/алиас таблицы привычек во внешнем запросе
+    :param default_param: плейсхолдер параметра с часовым поясом по умолчанию
+    """
+    return (
+        "COALESCE((SELECT NULLIF(p.time_zone, '') "
+        f"FROM {TelegramProfile._meta.db_table} p "
+        f'WHERE p.user_id = {habit_alias}."user_id"), {default_param})'
+    )
+
+
+def render_habit_title(
+    action: str,
+    periodicity: int,
+    time: datetime.time,
+    place_name: str | None,
+) -> str:
+    """
+    Текст «названия» привычки из значений полей (см. Habit.title).
+    Не требует экземпляра модели — используется и в лёгком пути рассылки,
+    где строки читаются проекцией values_list().
+    """
+    if periodicity == 1:
+        freq = "ежедневно"
+    elif periodicity == 7:
+        freq = "еженедельно"
+    else:
+        freq = f"каждые {periodicity} дней"
+
+    time_str = time.strftime("%H:%M")
+
+    place_str = f"в {place_name}" if place_name is not None else "где бы то ни было"
+
+    return f"Я буду {action.lower()} {freq} в {time_str} {place_str}"
+
+
+def render_reminder_text(title: str) -> str:
+    """
+    Текст Telegram-напоминания о привычке (HTML).
+    Название экранируется: в action и названии места могут быть <, > и &.
+    """
+    return (
+        "⏰ <b>Напоминание о привычке</b>\n\n"
+        f"{html.escape(title)}\n\n"
+        "Не забудь выполнить привычку и отметить прогресс! 💪"
+    )
+
+
+# Рамка (заголовок, подпись) сообщений со списком привычек
+COMBINED_REMINDER_FRAME = (
+    "⏰ <b>Напоминания о привычках</b>\n\n",
+    "\n\nНе забудь выполнить привычки и отметить прогресс! 💪",
+)
+DIGEST_FRAME = (
+    "🗓 <b>Привычки на сегодня</b>\n\n",
+    "\n\nХорошего дня! Не забудь отметить прогресс 💪",
+)
+TITLE_LIST_LINE = "• {title}"
+
+
+def render_title_list_line(title: str) -> str:
+    """
+    Строка списка привычек (HTML) с экранированным названием.
+    """
+    return TITLE_LIST_LINE.format(title=html.escape(title))
+
+
+def render_title_list_text(titles: list[str], frame: tuple[str, str]) -> str:
+    """
+    Сообщение (HTML) со списком привычек в рамке frame = (заголовок, подпись).
+    """
+    header, footer = frame
+    lines = "\n".join(render_title_list_line(title) for title in titles)
+    return f"{header}{lines}{footer}"
+
+
+def render_combined_reminder_text(titles: list[str]) -> str:
+    """
+    Одно Telegram-напоминание (HTML) сразу о нескольких привычках пользователя.
+    """
+    return render_title_list_text(titles, COMBINED_REMINDER_FRAME)
+
+
+class HabitQuerySet(models.QuerySet["Habit"]):
+    """
+    QuerySet привычек с операциями над расписанием напоминаний.
+    Все вычисления next_due_at — set-based SQL в часовом поясе владельца:
+    `time` — местное время пользователя, next_due_at — момент в UTC.
+    """
+
+    def due(self, now: datetime.datetime) -> "HabitQuerySet":
+        """
+        Привычки, чьё ближайшее вхождение уже наступило (next_due_at <= now).
+        Условие reminders_enabled=True совпадает с условием частичного индекса.
+        """
+        return self.filter(reminders_enabled=True, next_due_at__lte=now)
+
+    def recompute_next_due_at(self, now: datetime.datetime | None = None) -> int:
+        """
+        Пересчитывает next_due_at одним UPDATE: ближайшее вхождение `time`
+        начиная с текущей минуты по местному времени владельца
+        (сегодня, если время ещё не прошло, иначе завтра).
+        :return: количество обновлённых привычек
+        """
+        table = self.model._meta.db_table
+        return self.update(
+            next_due_at=RawSQL(
+                f"""
+                SELECT (
+                    CASE WHEN {table}."time" >= l.now::time
+                    THEN l.now::date ELSE l.now::date + 1 END
+                    + {table}."time"
+                ) AT TIME ZONE z.tz
+                FROM (SELECT {habit_time_zone_sql(table)} AS tz) z,
+                LATERAL (
+                    SELECT date_trunc('minute', %s::timestamptz AT TIME ZONE z.tz) AS now
+                ) l
+                """,
+                (settings.TIME_ZONE, now or timezone.now()),
+            )
+        )
+
+    def realign_next_due_at(self) -> int:
+        """
+        Приводит next_due_at к местному `time` владельца, сохраняя местную дату
+        вхождения (и тем самым фазу периодичности).
+        Нужен, когда смещение часового пояса на дату вхождения изменилось после
+        расчёта: переход на летнее/зимнее время, обновление базы tzdata.
+        Обновляются только строки, где значение действительно изменилось;
+        их владельцы попадают в ленту HabitScheduleChange.
+        :return: количество исправленных привычек
+        """
+        table = self.model._meta.db_table
+        realigned = RawSQL(
+            f"""
+            SELECT (({table}.next_due_at AT TIME ZONE z.tz)::date + {table}."time")
+                AT TIME ZONE z.tz
+            FROM (SELECT {habit_time_zone_sql(table)} AS tz) z
+            """,
+            (settings.TIME_ZONE,),
+        )
+        stale = (
+            self.filter(next_due_at__isnull=False)
+            .alias(realigned=realigned)
+            .exclude(next_due_at=models.F("realigned"))
+        )
+        with transaction.atomic():
+            user_ids = list(
+                stale.order_by().values_list("user_id", flat=True).distinct()
+            )
+            realigned_count = stale.update(next_due_at=realigned)
+            HabitScheduleChange.record(user_ids)
+        return realigned_count
+
+    def rerender_texts(self, place_name: str | None, batch_size: int = 500) -> int:
+        """
+        Пакетно перегенерирует rendered_title и reminder_text привычек
+        одного места под новое название места (None — место удаляется).
+        Строки читаются проекцией и сохраняются bulk_update порциями.
+        :return: количество обновлённых привычек
+        """
+        rows = (
+            self.order_by()
+            .values_list("id", "action", "periodicity", "time")
+            .iterator(chunk_size=batch_size)
+        )
+        updated = 0
+        batch: list[Habit] = []
+        for habit_id, action, periodicity, time in rows:
+            title = render_habit_title(action, periodicity, time, place_name)
+            batch.append(
+                Habit(
+                    id=habit_id,
+                    rendered_title=title,
+                    reminder_text=render_reminder_text(title),
+                )
+            )
+            if len(batch) >= batch_size:
+                updated += self.model.objects.bulk_update(
+                    batch, ["rendered_title", "reminder_text"]
+                )
+                batch = []
+        if batch:
+            updated += self.model.objects.bulk_update(
+                batch, ["rendered_title", "reminder_text"]
+            )
+        return updated
+
+
+class HabitManager(models.Manager["Habit"]):
+    """
+    Менеджер привычек: возвращает HabitQuerySet и явно объявляет его операции
+    над расписанием, чтобы вызовы через Habit.objects проходили проверку типов.
+    """
+
+    def get_queryset(self) -> HabitQuerySet:
+        return HabitQuerySet(self.model, using=self._db)
+
+    def filter(self, *args: Any, **kwargs: Any) -> HabitQuerySet:
+        return self.get_queryset().filter(*args, **kwargs)
+
+    def due(self, now: datetime.datetime) -> HabitQuerySet:
+        return self.get_queryset().due(now)
+
+    def recompute_next_due_at(self, now: datetime.datetime | None = None) -> int:
+        return self.get_queryset().recompute_next_due_at(now)
+
+    def realign_next_due_at(self) -> int:
+        return self.get_queryset().realign_next_due_at()
+
 
 class Habit(models.Model):
     """
@@ -145,13 +411,58 @@ class Habit(models.Model):
         help_text="Показывать ли привычку другим пользователям.",
     )
 
+    next_due_at = models.DateTimeField(
+        null=True,
+        blank=True,
+        editable=False,
+        verbose_name="следующее напоминание",
+        help_text="Ближайшее вхождение с учётом периодичности (поддерживается автоматически).",
+    )
+
+    rendered_title = models.CharField(
+        max_length=512,
+        blank=True,
+        editable=False,
+        verbose_name="название",
+        help_text="Готовое название привычки (поддерживается автоматически).",
+    )
+
+    reminder_text = models.TextField(
+        blank=True,
+        editable=False,
+        verbose_name="текст напоминания",
+        help_text="Готовый текст Telegram-напоминания (поддерживается автоматически).",
+    )
+
+    reminders_enabled = models.BooleanField(
+        default=False,
+        editable=False,
+        verbose_name="напоминания включены",
+        help_text=(
+            "Есть ли у владельца активный Telegram-профиль в режиме "
+            "«по каждой привычке» (поддерживается автоматически)."
+        ),
+    )
+
     created_at = models.DateTimeField(auto_now_add=True, verbose_name="создана")
     updated_at = models.DateTimeField(auto_now=True, verbose_name="обновлена")
 
+    objects = HabitManager()
+
     class Meta:
         verbose_name = "привычка"
         verbose_name_plural = "привычки"
         ordering = ("-created_at",)
+        indexes = [
+            # Частичный индекс расписания: в него попадают только привычки
+            # пользователей с активным Telegram, поэтому ежеминутный поиск
+            # стоит O(привычек к отправке), а не O(таблицы).
+            models.Index(
+                fields=("next_due_at",),
+                condition=models.Q(reminders_enabled=True),
+                name="habit_reminder_due_idx",
+            ),
+        ]
 
     def clean(self) -> None:
         """
@@ -204,35 +515,380 @@ class Habit(models.Model):
 
         super().clean()
 
+    # Поля, от которых зависят next_due_at и готовые тексты
+    SCHEDULE_FIELDS = ("time", "periodicity")
+    TEXT_FIELDS = ("action", "time", "periodicity", "place_id")
+
     @property
     def title(self) -> str:
         """
-        Динамическое «название» привычки.
+        «Название» привычки.
         Пример:
         «Я буду пить воду ежедневно в 12:00 в офисе»
+        Читается из rendered_title (без обращения к Place); для ещё
+        не сохранённой привычки собирается на лету.
         """
-        if self.periodicity == 1:
-            freq = "ежедневно"
-        elif self.periodicity == 7:
-            freq = "еженедельно"
-        else:
-            freq = f"каждые {self.periodicity} дней"
-
-        time_str = self.time.strftime("%H:%M")
+        return self.rendered_title or self.render_title()
 
-        place_str = f"в {self.place.name}" if self.place else "где бы то ни было"
-
-        return f"Я буду {self.action.lower()} {freq} в {time_str} {place_str}"
+    def render_title(self) -> str:
+        """
+        Собирает название из текущих значений полей.
+        """
+        return render_habit_title(
+            self.action,
+            self.periodicity,
+            self.time,
+            self.place.name if self.place else None,
+        )
 
     def __str__(self) -> str:
         return self.title
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Исходные значения отслеживаемых полей — без обращения
+        # к отложенным полям (иначе лишний запрос/рекурсия)
+        instance._loaded_values = {
+            name: instance.__dict__[name]
+            for name in {*cls.SCHEDULE_FIELDS, *cls.TEXT_FIELDS}
+            if name in instance.__dict__
+        }
+        return instance
+
+    def _changed(self, names: tuple[str, ...]) -> bool:
+        """
+        Изменилось ли хоть одно из полей с момента загрузки (для новой — True).
+        """
+        loaded = getattr(self, "_loaded_values", {})
+        return any(
+            name not in loaded or loaded[name] != getattr(self, name) for name in names
+        )
+
     def save(self, *args, **kwargs):
         """
         Сохраняет модель с обязательной проверкой бизнес-правил.
         full_clean() гарантирует вызов:
         - field validators (validators=...)
         - clean()
+        Дополнительно синхронизирует служебные поля:
+        - reminders_enabled — всегда;
+        - rendered_title и reminder_text — при создании и при смене
+          action, time, periodicity или place;
+        - next_due_at — при создании и при смене time или periodicity.
         """
         self.full_clean()
-        return super().save(*args, **kwargs)
+
+        self.reminders_enabled = TelegramProfile.objects.filter(
+            user_id=self.user_id,
+            is_active=True,
+            delivery_mode=TelegramDeliveryMode.PER_HABIT,
+        ).exists()
+        extra_fields = {"reminders_enabled"}
+
+        if self._changed(self.TEXT_FIELDS):
+            self.rendered_title = self.render_title()
+            self.reminder_text = render_reminder_text(self.rendered_title)
+            extra_fields |= {"rendered_title", "reminder_text"}
+
+        update_fields = kwargs.get("update_fields")
+        if update_fields is not None:
+            kwargs["update_fields"] = {*update_fields, *extra_fields}
+
+        schedule_changed = self._changed(self.SCHEDULE_FIELDS)
+
+        result = super().save(*args, **kwargs)
+
+        if schedule_changed:
+            Habit.objects.filter(pk=self.pk).recompute_next_due_at()
+            self.refresh_from_db(fields=["next_due_at"])
+        self._loaded_values = {
+            name: getattr(self, name)
+            for name in {*self.SCHEDULE_FIELDS, *self.TEXT_FIELDS}
+        }
+
+        return result
+
+
+class ReminderDelivery(models.Model):
+    """
+    Журнал доставки напоминаний: одна запись на пару
+    (привычка, запланированное вхождение).
+    Запись «захватывается» до отправки через
+    INSERT ... ON CONFLICT DO NOTHING (см. claim()), поэтому повторный запуск
+    рассылки за ту же минуту (двойной beat, ретрай воркера с acks_late,
+    два экземпляра beat) не отправит напоминание второй раз.
+    После отправки в записи сохраняются статус, задержка доставки
+    и message_id Telegram — для аналитики. Старые записи удаляются
+    периодической задачей prune_reminder_deliveries.
+    """
+
+    STATUS_PENDING = "pending"
+    STATUS_SKIPPED = "skipped"
+    STATUS_CHOICES = [
+        (STATUS_PENDING, "ожидает отправки"),
+        (STATUS_SKIPPED, "пропущено"),
+        *TelegramSendStatus.choices,
+    ]
+
+    habit = models.ForeignKey(
+        Habit,
+        on_delete=models.CASCADE,
+        related_name="deliveries",
+        verbose_name="привычка",
+    )
+    habit_id: int
+    scheduled_for = models.DateTimeField(
+        verbose_name="запланировано на",
+        help_text="Минута, за которую отправляется напоминание.",
+    )
+    status = models.CharField(
+        max_length=32,
+        choices=STATUS_CHOICES,
+        default=STATUS_PENDING,
+        verbose_name="статус",
+    )
+    claimed_at = models.DateTimeField(
+        default=timezone.now,
+        verbose_name="захвачено",
+    )
+    sent_at = models.DateTimeField(
+        null=True,
+        blank=True,
+        verbose_name="отправлено",
+    )
+    latency_ms = models.PositiveIntegerField(
+        null=True,
+        blank=True,
+        verbose_name="задержка доставки (мс)",
+        help_text="Время от запланированной минуты до ответа Telegram.",
+    )
+    message_id = models.BigIntegerField(
+        null=True,
+        blank=True,
+        verbose_name="Telegram message_id",
+    )
+
+    class Meta:
+        verbose_name = "доставка напоминания"
+        verbose_name_plural = "журнал доставки напоминаний"
+        ordering = ("-scheduled_for",)
+        constraints = [
+            models.UniqueConstraint(
+                fields=("habit", "scheduled_for"),
+                name="uniq_reminder_delivery_occurrence",
+            ),
+        ]
+        indexes = [
+            # Для удаления старых записей по сроку хранения
+            models.Index(fields=("scheduled_for",), name="reminder_delivery_sched_idx"),
+        ]
+
+    def __str__(self) -> str:
+        return f"{self.habit_id} @ {self.scheduled_for:%Y-%m-%d %H:%M} ({self.status})"
+
+    @classmethod
+    def claim(cls, habit_ids: list[int], now: datetime.datetime) -> dict:
+        """
+        Атомарно захватывает вхождения привычек habit_ids, наступившие к now
+        (см. claim_until).
+        """
+        return cls.claim_until({habit_id: now for habit_id in habit_ids})
+
+    @classmethod
+    def claim_until(cls, horizons: dict[int, datetime.datetime]) -> dict:
+        """
+        Атомарно захватывает наступившие вхождения привычек одним запросом.
+        horizons — для каждой привычки момент, до которого (включительно)
+        вхождение считается наступившим. Для привычки с next_due_at <= horizon:
+        - в журнал вставляется запись (habit, next_due_at)
+          через INSERT ... ON CONFLICT DO NOTHING;
+        - next_due_at сдвигается на periodicity дней вперёд по местному
+          времени владельца (переход на летнее время не сдвигает `time`) — на первое
+          вхождение строго после horizon (пропущенные вхождения не догоняются).
+        Строки привычек блокируются (FOR UPDATE), поэтому параллельный claim
+        той же привычки дождётся сдвига и ничего не захватит.
+        Уже захваченные ранее, ещё не наступившие и удалённые привычки пропускаются.
+        :return: словарь habit_id → (id записи журнала, вхождение)
+                 (только то, что захватил именно этот вызов)
+        """
+        if not horizons:
+            return {}
+
+        table = cls._meta.db_table
+        habit_table = Habit._meta.db_table
+
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f"""
+                WITH horizon AS (
+                    SELECT * FROM unnest(%(ids)s::bigint[], %(untils)s::timestamptz[])
+                        AS t(id, until)
+                ),
+                due AS (
+                    SELECT h.id, h.next_due_at, h.periodicity, horizon.until,
+                           {habit_time_zone_sql('h', '%(default_tz)s')} AS tz
+                    FROM {habit_table} h
+                    JOIN horizon ON horizon.id = h.id
+                    WHERE h.next_due_at <= horizon.until
+                    FOR UPDATE OF h
+                ),
+                advanced AS (
+                    UPDATE {habit_table} h
+                    SET next_due_at = (
+                        (due.next_due_at AT TIME ZONE due.tz) + make_interval(
+                            days => due.periodicity * (1 + floor(
+                                extract(epoch FROM due.until - due.next_due_at)
+                                / (due.periodicity * 86400)
+                            )::int)
+                        )
+                    ) AT TIME ZONE due.tz
+                    FROM due
+                    WHERE h.id = due.id
+                ),
+                claimed AS (
+                    INSERT INTO {table} (habit_id, scheduled_for, status, claimed_at)
+                    SELECT id, next_due_at, %(status)s, %(claimed_at)s FROM due
+                    ON CONFLICT (habit_id, scheduled_for) DO NOTHING
+                    RETURNING habit_id, id, scheduled_for
+                )
+                SELECT habit_id, id, scheduled_for FROM claimed
+                """,
+                {
+                    "ids": list(horizons),
+                    "untils": list(horizons.values()),
+                    "status": cls.STATUS_PENDING,
+                    "claimed_at": timezone.now(),
+                    "default_tz": settings.TIME_ZONE,
+                },
+            )
+            return {
+                habit_id: (delivery_id, scheduled_for)
+                for habit_id, delivery_id, scheduled_for in cursor.fetchall()
+            }
+
+
+class StaleFencingTokenError(Exception):
+    """
+    Рассылка с устаревшим fencing-токеном: аренду уже получил другой тик.
+    """
+
+
+class ReminderDispatchState(models.Model):
+    """
+    Состояние периодической рассылки напоминаний (одна строка на рассылку).
+    processed_until — «водяной знак»: всё, что наступило до этого момента
+    включительно, уже передано в шарды. Очередной запуск обрабатывает окно
+    (processed_until, now], поэтому пропущенный или опоздавший тик beat
+    не теряет напоминаний, а рассылку можно запускать раз в N минут.
+    fencing_token — наибольший fencing-токен аренды рассылки (habits.lease),
+    с которым сдвигался водяной знак: тик с меньшим токеном отклоняется.
+    """
+
+    key = models.CharField(
+        max_length=64,
+        unique=True,
+        verbose_name="рассылка",
+    )
+    processed_until = models.DateTimeField(
+        verbose_name="обработано до",
+        help_text="Конец последнего обработанного окна (включительно).",
+    )
+    fencing_token = models.BigIntegerField(
+        default=0,
+        verbose_name="fencing-токен",
+        help_text="Наибольший токен аренды, с которым сдвигался водяной знак.",
+    )
+    updated_at = models.DateTimeField(auto_now=True, verbose_name="обновлено")
+
+    class Meta:
+        verbose_name = "состояние рассылки"
+        verbose_name_plural = "состояния рассылок"
+
+    def __str__(self) -> str:
+        return f"{self.key}: до {self.processed_until:%Y-%m-%d %H:%M:%S}"
+
+    @classmethod
+    def advance(
+        cls,
+        key: str,
+        now: datetime.datetime,
+        fencing_token: int | None = None,
+    ) -> tuple[datetime.datetime | None, datetime.datetime]:
+        """
+        Сдвигает водяной знак рассылки до now и возвращает окно (start, end].
+        Строка блокируется (SELECT ... FOR UPDATE) до конца транзакции,
+        поэтому параллельные запуски получают непересекающиеся окна.
+        Водяной знак не откатывается назад (например, при сдвиге часов):
+        тогда end == start и окно пустое.
+        Вызывать внутри transaction.atomic().
+        :param fencing_token: токен аренды рассылки; None — без проверки
+        :raises StaleFencingTokenError: токен меньше уже виденного
+        :return: (start, end); start=None при самом первом запуске
+        """
+        state, created = cls.objects.select_for_update().get_or_create(
+            key=key,
+            defaults={"processed_until": now, "fencing_token": fencing_token or 0},
+        )
+        if created:
+            return None, now
+
+        update_fields = ["updated_at"]
+        if fencing_token is not None:
+            if fencing_token < state.fencing_token:
+                raise StaleFencingTokenError(
+                    f"{key}: токен {fencing_token} < {state.fencing_token}"
+                )
+            state.fencing_token = fencing_token
+            update_fields.append("fencing_token")
+
+        start = state.processed_until
+        end = max(start, now)
+        if end != start:
+            state.processed_until = end
+            update_fields.append("processed_until")
+        if len(update_fields) > 1:
+            state.save(update_fields=update_fields)
+        return start, end
+
+
+class HabitScheduleChange(models.Model):
+    """
+    Лента изменений расписания напоминаний для планировщика habits.scheduler:
+    «у пользователя изменились привычки или Telegram-профиль».
+    Планировщик по ней перечитывает привычки пользователя, не сканируя таблицу.
+    Пишется сигналами после коммита и только при
+    HABIT_REMINDER_SCHEDULER_ENABLED; старые записи удаляет
+    задача prune_schedule_changes.
+    """
+
+    # Без внешнего ключа: запись о пользователе, удалённом вместе с привычками,
+    # тоже нужна планировщику
+    user_id = models.IntegerField(verbose_name="пользователь")
+    created_at = models.DateTimeField(
+        auto_now_add=True, db_index=True, verbose_name="создано"
+    )
+
+    class Meta:
+        verbose_name = "изменение расписания"
+        verbose_name_plural = "изменения расписания"
+
+    def __str__(self) -> str:
+        return f"user {self.user_id} @ {self.created_at:%Y-%m-%d %H:%M:%S}"
+
+    @classmethod
+    def record(cls, user_ids) -> None:
+        """
+        После коммита текущей транзакции добавляет в ленту пользователей
+        user_ids (одним bulk_create). Без включённого планировщика — ничего.
+        """
+        if not settings.HABIT_REMINDER_SCHEDULER_ENABLED:
+            return
+        user_ids = sorted(set(user_ids))
+        if not user_ids:
+            return
+        transaction.on_commit(
+            lambda: cls.objects.bulk_create(
+                [cls(user_id=user_id) for user_id in user_ids]
+            )
+        )
@@ -0,0 +1,388 @@
+"""
+Планировщик напоминаний на иерархическом колесе таймеров.
+Альтернатива поминутному опросу send_habit_reminders из Celery Beat:
+долгоживущий процесс (reminder_scheduler.py) держит в памяти вхождения
+ближайших суток и отдаёт их шардам send_habit_reminders_shard точно в срок,
+с точностью до секунды, не обращаясь к БД, пока ничего не наступило.
+Как это устроено:
+- TimingWheel — колесо из трёх уровней: 60 секунд, 60 минут, 24 часа
+  (дальше — список переполнения); добавление и удаление — O(1),
+  продвижение — O(1) на секунду плюс перенос записей при смене минуты/часа;
+- при «холодном» старте из БД загружаются вхождения с next_due_at ближе суток
+  (по частичному индексу расписания), дальше горизонт расширяется узкими
+  диапазонами [старый горизонт, now + 24 ч);
+- изменения привычек и профилей приходят из ленты HabitScheduleChange:
+  планировщик перечитывает привычки только затронутых пользователей;
+- после передачи вхождения в шард следующее вхождение вычисляется в памяти
+  (местное время + periodicity дней — так же, как ReminderDelivery.claim),
+  без ожидания, пока шард сдвинет next_due_at в БД;
+- снимок (вхождения, горизонт, позиция в ленте) регулярно пишется в файл:
+  перезапуск восстанавливает колесо из снимка и догоняет ленту, не сканируя
+  таблицу привычек.
+Доставка остаётся идемпотентной: шард захватывает вхождения в журнале
+ReminderDelivery, поэтому повторная передача или параллельная работа
+страховочной рассылки beat не приводят к дублям.
+"""
+
+import datetime
+import json
+import os
+import time
+import zoneinfo
+from collections import defaultdict
+from collections.abc import Callable, Iterable
+from pathlib import Path
+from typing import NamedTuple, Optional
+
+from django.conf import settings
+from django.db.models.expressions import RawSQL
+
+from habits.models import Habit, HabitScheduleChange, habit_time_zone_sql
+from habits.tasks import partition_by_user, send_habit_reminders_shard
+
+# Уровни колеса: (число слотов, длительность слота в секундах)
+WHEEL_LEVELS = ((60, 1), (60, 60), (24, 3600))
+
+# Горизонт загрузки вхождений
+HORIZON = datetime.timedelta(hours=24)
+
+# Запас чтения ленты изменений: запись с меньшим id может закоммититься позже
+# соседней, поэтому последние FEED_LAG читаются повторно (перечитывание
+# привычек пользователя идемпотентно)
+FEED_LAG = datetime.timedelta(seconds=60)
+
+# Как часто сохранять снимок
+SNAPSHOT_INTERVAL = 60.0
+
+SNAPSHOT_VERSION = 1
+
+
+class TimingWheel:
+    """
+    Иерархическое колесо таймеров с шагом в одну секунду.
+    Запись — ключ (id привычки) и момент срабатывания (целые секунды эпохи). Повторное
+    добавление ключа переносит запись; старые копии в слотах удаляются лениво.
+    """
+
+    def __init__(self, now: int) -> None:
+        self._now = now
+        self._slots: list[list[list[tuple[int, int]]]] = [
+            [[] for _ in range(size)] for size, _ in WHEEL_LEVELS
+        ]
+        self._overflow: list[tuple[int, int]] = []
+        self._due: dict[int, int] = {}
+        self._ready: list[tuple[int, int]] = []
+
+    @property
+    def now(self) -> int:
+        return self._now
+
+    def __len__(self) -> int:
+        return len(self._due)
+
+    def __contains__(self, key: int) -> bool:
+        return key in self._due
+
+    def items(self) -> Iterable[tuple[int, int]]:
+        return self._due.items()
+
+    def add(self, key: int, due: int) -> None:
+        """
+        Ставит (или переносит) запись key на момент due.
+        Наступившая запись отдаётся следующим advance().
+        """
+        self._due[key] = due
+        self._place(key, due)
+
+    def get(self, key: int) -> Optional[int]:
+        return self._due.get(key)
+
+    def remove(self, key: int) -> None:
+        self._due.pop(key, None)
+
+    def advance(self, now: int) -> list[tuple[int, int]]:
+        """
+        Продвигает колесо до момента now включительно.
+        :return: сработавшие записи (key, due) в порядке срабатывания
+        """
+        while self._now < now:
+            self._now += 1
+            for level in range(len(WHEEL_LEVELS) - 1, 0, -1):
+                size, span = WHEEL_LEVELS[level]
+                if self._now % span == 0:
+                    self._cascade(self._slots[level][(self._now // span) % size])
+            if self._now % (WHEEL_LEVELS[-1][0] * WHEEL_LEVELS[-1][1]) == 0:
+                overflow, self._overflow = self._overflow, []
+                self._cascade(overflow)
+            slot = self._slots[0][self._now % WHEEL_LEVELS[0][0]]
+            self._ready.extend(slot)
+            slot.clear()
+
+        fired = []
+        for key, due in self._ready:
+            if self._due.get(key) == due:
+                del self._due[key]
+                fired.append((key, due))
+        self._ready = []
+        return fired
+
+    def _place(self, key: int, due: int) -> None:
+        delta = due - self._now
+        if delta <= 0:
+            self._ready.append((key, due))
+            return
+        for level, (size, span) in enumerate(WHEEL_LEVELS):
+            if delta < size * span:
+                # Уровень 0 — точная секунда; выше — слот минуты/часа,
+                # который разбирается в начале этой минуты/часа
+                self._slots[level][(due // span) % size].append((key, due))
+                return
+        self._overflow.append((key, due))
+
+    def _cascade(self, entries: list[tuple[int, int]]) -> None:
+        pending = list(entries)
+        entries.clear()
+        for key, due in pending:
+            if self._due.get(key) == due:
+                self._place(key, due)
+
+
+class Occurrence(NamedTuple):
+    """
+    Вхождение привычки в колесе: всё, что нужно, чтобы передать его шарду
+    и вычислить следующее.
+    """
+
+    user_id: int
+    periodicity: int
+    time_zone: str
+
+
+def next_occurrence(due: int, periodicity: int, time_zone: str) -> int:
+    """
+    Следующее вхождение: то же местное время через periodicity дней
+    (как сдвиг next_due_at в ReminderDelivery.claim).
+    """
+    local = datetime.datetime.fromtimestamp(due, zoneinfo.ZoneInfo(time_zone))
+    return int((local + datetime.timedelta(days=periodicity)).timestamp())
+
+
+class ReminderScheduler:
+    """
+    Планировщик: колесо вхождений, горизонт загрузки, лента изменений и снимок.
+    """
+
+    def __init__(
+        self,
+        snapshot_path: Optional[str] = None,
+        clock: Callable[[], float] = time.time,
+    ) -> None:
+        self._snapshot_path = Path(
+            snapshot_path or settings.HABIT_REMINDER_SCHEDULER_SNAPSHOT
+        )
+        self._clock = clock
+        self._wheel = TimingWheel(int(clock()))
+        self._occurrences: dict[int, Occurrence] = {}
+        self._by_user: dict[int, set[int]] = defaultdict(set)
+        self._horizon_end = self._moment(self._wheel.now)
+        self._feed_since = self._moment(self._wheel.now)
+        self._seen_changes: dict[int, datetime.datetime] = {}
+        self._next_poll = 0.0
+        self._next_snapshot = 0.0
+
+    @staticmethod
+    def _moment(seconds: float) -> datetime.datetime:
+        return datetime.datetime.fromtimestamp(seconds, tz=datetime.timezone.utc)
+
+    def __len__(self) -> int:
+        return len(self._wheel)
+
+    def due_at(self, habit_id: int) -> Optional[int]:
+        """
+        Момент вхождения привычки в колесе (секунды эпохи) или None.
+        """
+        return self._wheel.get(habit_id)
+
+    # ---- загрузка ----
+
+    def start(self) -> bool:
+        """
+        Восстанавливает колесо из снимка, а если его нет или он устарел —
+        загружает вхождения ближайших суток из БД.
+        :return: True — тёплый старт из снимка
+        """
+        now = self._clock()
+        warm = self.load_snapshot(now)
+        if not warm:
+            self._feed_since = self._moment(now)
+            self._horizon_end = self._moment(now) + HORIZON
+            self._load(self._habits().filter(next_due_at__lt=self._horizon_end))
+        self.poll(now)
+        return warm
+
+    def _habits(self):
+        table = Habit._meta.db_table
+        return (
+            Habit.objects.filter(
+                reminders_enabled=True,
+                next_due_at__isnull=False,
+                user__telegram_profile__is_active=True,
+            )
+            .order_by()
+            .annotate(tz=RawSQL(habit_time_zone_sql(table), (settings.TIME_ZONE,)))
+        )
+
+    def _load(self, habits) -> None:
+        rows = habits.values_list(
+            "id", "user_id", "next_due_at", "periodicity", "tz"
+        ).iterator(chunk_size=settings.HABIT_REMINDERS_FETCH_CHUNK_SIZE)
+        for habit_id, user_id, due, periodicity, tz in rows:
+            self._add(habit_id, Occurrence(user_id, periodicity, tz), due.timestamp())
+
+    def _add(self, habit_id: int, occurrence: Occurrence, due: float) -> None:
+        self._occurrences[habit_id] = occurrence
+        self._by_user[occurrence.user_id].add(habit_id)
+        self._wheel.add(habit_id, int(due))
+
+    def _remove_user(self, user_id: int) -> None:
+        for habit_id in self._by_user.pop(user_id, ()):
+            self._occurrences.pop(habit_id, None)
+            self._wheel.remove(habit_id)
+
+    def poll(self, now: float) -> int:
+        """
+        Применяет ленту изменений и расширяет горизонт до now + 24 ч.
+        :return: сколько пользователей перечитано
+        """
+        changes = HabitScheduleChange.objects.filter(
+            created_at__gte=self._feed_since - FEED_LAG
+        ).values_list("id", "user_id", "created_at")
+        user_ids: set[int] = set()
+        for change_id, user_id, created_at in changes:
+            if change_id in self._seen_changes:
+                continue
+            self._seen_changes[change_id] = created_at
+            user_ids.add(user_id)
+            self._feed_since = max(self._feed_since, created_at)
+        self._seen_changes = {
+            change_id: created_at
+            for change_id, created_at in self._seen_changes.items()
+            if created_at >= self._feed_since - FEED_LAG
+        }
+
+        if user_ids:
+            for user_id in user_ids:
+                self._remove_user(user_id)
+            self._load(
+                self._habits().filter(
+                    user_id__in=user_ids, next_due_at__lt=self._horizon_end
+                )
+            )
+
+        horizon_end = self._moment(now) + HORIZON
+        if horizon_end > self._horizon_end:
+            self._load(
+                self._habits().filter(
+                    next_due_at__gte=self._horizon_end, next_due_at__lt=horizon_end
+                )
+            )
+            self._horizon_end = horizon_end
+        return len(user_ids)
+
+    # ---- срабатывание ----
+
+    def tick(self, now: Optional[float] = None) -> list[list[int]]:
+        """
+        Один шаг цикла: ставит в очередь наступившие вхождения, по расписанию
+        читает ленту изменений и сохраняет снимок.
+        :return: шарды, переданные в send_habit_reminders_shard
+        """
+        now = self._clock() if now is None else now
+        shards = self.dispatch(self._wheel.advance(int(now)))
+
+        if now >= self._next_poll:
+            self.poll(now)
+            self._next_poll = now + settings.HABIT_REMINDER_SCHEDULER_POLL_SECONDS
+        if now >= self._next_snapshot:
+            self.save_snapshot(now)
+            self._next_snapshot = now + SNAPSHOT_INTERVAL
+        return shards
+
+    def dispatch(self, fired: list[tuple[int, int]]) -> list[list[int]]:
+        """
+        Передаёт сработавшие вхождения шардам (по моменту вхождения,
+        с разбиением по пользователям) и ставит в колесо следующие вхождения.
+        """
+        by_due: dict[int, list[tuple[int, int]]] = defaultdict(list)
+        for habit_id, due in fired:
+            occurrence = self._occurrences[habit_id]
+            by_due[due].append((habit_id, occurrence.user_id))
+            self._wheel.add(
+                habit_id,
+                next_occurrence(due, occurrence.periodicity, occurrence.time_zone),
+            )
+
+        shards: list[list[int]] = []
+        for due, rows in sorted(by_due.items()):
+            rows.sort(key=lambda row: (row[1], row[0]))
+            for habit_ids in partition_by_user(
+                rows, settings.HABIT_REMINDERS_SHARD_SIZE
+            ):
+                send_habit_reminders_shard.apply_async(
+                    (habit_ids, self._moment(due).isoformat())
+                )
+                shards.append(habit_ids)
+        return shards
+
+    def run_forever(self, sleep: Callable[[float], None] = time.sleep) -> None:
+        """
+        Основной цикл процесса: шаг раз в секунду, на границе секунды.
+        """
+        self.start()
+        while True:
+            self.tick()
+            now = self._clock()
+            sleep(max(0.0, 1 - (now % 1)))
+
+    # ---- снимок ----
+
+    def save_snapshot(self, now: float) -> None:
+        """
+        Атомарно (через временный файл) записывает снимок колеса.
+        """
+        data = {
+            "version": SNAPSHOT_VERSION,
+            "taken_at": now,
+            "horizon_end": self._horizon_end.isoformat(),
+            "feed_since": self._feed_since.isoformat(),
+            "entries": [
+                [habit_id, due, *self._occurrences[habit_id]]
+                for habit_id, due in self._wheel.items()
+            ],
+        }
+        tmp_path = self._snapshot_path.with_name(self._snapshot_path.name + ".tmp")
+        tmp_path.write_text(json.dumps(data), encoding="utf-8")
+        os.replace(tmp_path, self._snapshot_path)
+
+    def load_snapshot(self, now: float) -> bool:
+        """
+        Восстанавливает колесо из снимка, если он есть и лента изменений
+        ещё хранит всё, что произошло после него.
+        """
+        try:
+            data = json.loads(self._snapshot_path.read_text(encoding="utf-8"))
+        except (OSError, ValueError):
+            return False
+
+        retention = settings.HABIT_SCHEDULE_CHANGE_RETENTION_HOURS * 3600
+        if (
+            data.get("version") != SNAPSHOT_VERSION
+            or now - data["taken_at"] >= retention - FEED_LAG.total_seconds()
+        ):
+            return False
+
+        self._horizon_end = datetime.datetime.fromisoformat(data["horizon_end"])
+        self._feed_since = datetime.datetime.fromisoformat(data["feed_since"])
+        for habit_id, due, user_id, periodicity, tz in data["entries"]:
+            self._add(habit_id, Occurrence(user_id, periodicity, tz), due)
+        return True
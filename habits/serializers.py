@@ -28,7 +28,7 @@ class HabitSerializer(serializers.ModelSerializer):
     Сериализатор привычки (Habit).
     Особенности:
     - user задаётся автоматически из request.user (HiddenField).
-    - title — read-only поле (динамическое название привычки из модели).
+    - title — read-only поле (сохранённое название привычки, Habit.rendered_title).
     Бизнес-правила (по ТЗ) валидируются на уровне API:
     - reward и related_habit взаимно исключаются;
     - duration: > 0 и <= 120 секунд;
@@ -0,0 +1,166 @@
+"""
+Сигналы приложения habits.
+Поддерживают денормализованный флаг Habit.reminders_enabled в актуальном
+состоянии при изменении Telegram-профиля пользователя:
+- профиль создан / обновлён → флаг = профиль активен и в режиме
+  «по каждой привычке» (в режиме сводки привычки рассылает send_habit_digests);
+- профиль создан, сменился часовой пояс, режим доставки или профиль снова
+  включён → next_due_at привычек пересчитывается от текущего момента
+  (устаревшие вхождения не отправляются задним числом);
+- профиль удалён → флаг = False.
+- профили массово отключены рассылкой (сигнал telegram_profiles_deactivated) →
+  флаг = False;
+- чат привязан ботом (сигнал telegram_profile_linked) → как при сохранении
+  профиля.
+Также поддерживает готовые тексты привычек (rendered_title, reminder_text)
+при удалении места: on_delete=SET_NULL обнуляет place без вызова save().
+Любое изменение привычки, места или профиля помечает подготовленные
+напоминания владельцев устаревшими (habits.staging) и попадает в ленту
+изменений планировщика (HabitScheduleChange).
+Итоги отправки напоминаний из очереди NotificationOutbox (сигнал
+notification_outbox_attempted) записываются в журнал ReminderDelivery.
+Важно: QuerySet.update() и сырой SQL по TelegramProfile сигналы post_save
+не вызывают — в таких местах нужно отправлять telegram_profiles_deactivated
+или telegram_profile_linked.
+"""
+
+from django.db.models.signals import post_delete, post_save, pre_delete
+from django.dispatch import receiver
+
+from habits.models import Habit, HabitScheduleChange, Place
+from habits.staging import invalidate_staged_reminders
+from notifications.models import NotificationOutbox, TelegramProfile
+from notifications.signals import (
+    notification_outbox_attempted,
+    telegram_profile_linked,
+    telegram_profiles_deactivated,
+)
+
+
+@receiver(post_save, sender=TelegramProfile)
+def sync_reminders_on_profile_save(sender, instance, **kwargs) -> None:
+    """
+    Переносит признак «напоминания по каждой привычке» во все привычки владельца.
+    """
+    enabled = instance.per_habit_reminders
+    Habit.objects.filter(user_id=instance.user_id).exclude(
+        reminders_enabled=enabled
+    ).update(reminders_enabled=enabled)
+
+
+@receiver(post_save, sender=TelegramProfile)
+def reschedule_on_time_zone_change(sender, instance, created, **kwargs) -> None:
+    """
+    Пересчитывает расписание привычек владельца в его (новом) часовом поясе
+    и после смены режима доставки или повторного включения профиля.
+    """
+    reactivated = instance.is_active and instance.schedule_changed("is_active")
+    if (
+        created
+        or reactivated
+        or instance.schedule_changed("time_zone", "delivery_mode")
+    ):
+        Habit.objects.filter(user_id=instance.user_id).recompute_next_due_at()
+
+
+@receiver(post_delete, sender=TelegramProfile)
+def sync_reminders_on_profile_delete(sender, instance, **kwargs) -> None:
+    """
+    Отключает напоминания у привычек пользователя, удалившего профиль.
+    """
+    Habit.objects.filter(user_id=instance.user_id, reminders_enabled=True).update(
+        reminders_enabled=False
+    )
+
+
+@receiver(telegram_profiles_deactivated)
+def sync_reminders_on_profiles_deactivated(sender, user_ids, **kwargs) -> None:
+    """
+    Отключает напоминания у привычек пользователей с отключёнными профилями.
+    """
+    Habit.objects.filter(user_id__in=user_ids, reminders_enabled=True).update(
+        reminders_enabled=False
+    )
+
+
+@receiver(telegram_profile_linked)
+def sync_reminders_on_profile_linked(
+    sender, user_id, per_habit_reminders, reactivated, **kwargs
+) -> None:
+    """
+    То же, что sync_reminders_on_profile_save и reschedule_on_time_zone_change,
+    для профиля, привязанного через TelegramProfile.link().
+    """
+    Habit.objects.filter(user_id=user_id).exclude(
+        reminders_enabled=per_habit_reminders
+    ).update(reminders_enabled=per_habit_reminders)
+    if reactivated:
+        Habit.objects.filter(user_id=user_id).recompute_next_due_at()
+
+
+@receiver(pre_delete, sender=Place)
+def rerender_texts_on_place_delete(sender, instance, **kwargs) -> None:
+    """
+    Перегенерирует тексты привычек удаляемого места как «без места»
+    (сам place обнулится следом в той же транзакции удаления).
+    """
+    instance.habits.all().rerender_texts(None)
+
+
+def reminder_inputs_changed(user_ids) -> None:
+    """
+    Данные напоминаний пользователей изменились: сбрасываем подготовленные
+    корзины и пишем ленту изменений планировщика.
+    """
+    user_ids = list(user_ids)
+    invalidate_staged_reminders(user_ids)
+    HabitScheduleChange.record(user_ids)
+
+
+@receiver(post_save, sender=Habit)
+@receiver(post_delete, sender=Habit)
+@receiver(post_save, sender=TelegramProfile)
+@receiver(post_delete, sender=TelegramProfile)
+def reminder_inputs_changed_on_save(sender, instance, **kwargs) -> None:
+    """
+    Изменилась привычка (текст, время) или профиль (chat_id, включённость,
+    режим доставки, часовой пояс).
+    """
+    reminder_inputs_changed([instance.user_id])
+
+
+@receiver(telegram_profiles_deactivated)
+def reminder_inputs_changed_on_profiles_deactivated(sender, user_ids, **kwargs) -> None:
+    """
+    Профили массово отключены рассылкой.
+    """
+    reminder_inputs_changed(user_ids)
+
+
+@receiver(telegram_profile_linked)
+def reminder_inputs_changed_on_profile_linked(sender, user_id, **kwargs) -> None:
+    """
+    Чат привязан или перепривязан ботом.
+    """
+    reminder_inputs_changed([user_id])
+
+
+@receiver(post_save, sender=Place)
+@receiver(pre_delete, sender=Place)
+def reminder_inputs_changed_on_place_change(sender, instance, **kwargs) -> None:
+    """
+    Переименование или удаление места меняет тексты привычек его владельцев.
+    """
+    reminder_inputs_changed(
+        instance.habits.order_by().values_list("user_id", flat=True).distinct()
+    )
+
+
+@receiver(notification_outbox_attempted, sender=NotificationOutbox)
+def record_reminder_outcomes_on_outbox_attempt(sender, results, **kwargs) -> None:
+    """
+    Записывает итог отправки напоминаний и сводок в журнал доставки.
+    """
+    from habits.tasks import record_reminder_outcomes
+
+    record_reminder_outcomes(results)
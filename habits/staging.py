@@ -0,0 +1,281 @@
+"""
+Предварительная подготовка (pre-staging) напоминаний ближайших минут.
+Задача `stage_habit_reminders` заранее (за минуту и больше) выбирает
+привычки, наступающие в следующих минутах, вместе с получателем и готовым
+текстом и складывает их в «корзины» по минуте вхождения. В минуту вхождения
+шард только захватывает вхождения в журнале и берёт данные из корзины —
+без чтения привычек и профилей из БД в самый нагруженный момент.
+Инвалидация: любое изменение привычки, места или Telegram-профиля
+помечает пользователя «грязным» во всех корзинах, которые ещё могут быть
+прочитаны (от now - TTL до конца окна предзагрузки). Пометка пишется после
+коммита и не зависит от того, успела ли подготовка записать корзину,
+поэтому гонка «прочитали старое → записали после инвалидации» тоже
+закрыта. Для грязных пользователей, отсутствующих в корзине привычек
+и несовпавших вхождений шард читает данные из БД, как раньше.
+Время вхождения при этом сверяется с захваченным в журнале,
+так что перенос привычки не приводит к отправке по устаревшему расписанию.
+Бэкенды:
+- RedisStageBackend — общее хранилище для планировщика и всех воркеров;
+- InMemoryStageBackend — в памяти процесса (тесты, локальный запуск).
+"""
+
+import datetime
+import json
+import threading
+import time
+from collections import defaultdict
+from collections.abc import Callable, Iterable
+from typing import Protocol
+
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+from redis.exceptions import RedisError
+
+from config.backends import ProcessSingleton, backend_redis
+
+# Строка корзины: (habit_id, user_id, chat_id, rendered_title, reminder_text, next_due_at)
+StagedRow = tuple[int, int, str, str, str, datetime.datetime]
+
+
+def bucket_of(moment: datetime.datetime) -> int:
+    """
+    Номер корзины — минута вхождения (минуты от начала эпохи).
+    """
+    return int(moment.timestamp() // 60)
+
+
+def bucket_start(bucket: int) -> datetime.datetime:
+    """
+    Начало минуты корзины (UTC).
+    """
+    return datetime.datetime.fromtimestamp(bucket * 60, tz=datetime.timezone.utc)
+
+
+class StageBackend(Protocol):
+    """
+    Хранилище корзин.
+    put() записывает строки корзины (habit_id → JSON),
+    get() возвращает строки по id и множество грязных user_id корзины,
+    mark_dirty() помечает пользователей грязными в указанных корзинах.
+    """
+
+    def put(self, bucket: int, entries: dict[int, str], ttl: int) -> None: ...
+
+    def get(
+        self, bucket: int, habit_ids: list[int]
+    ) -> tuple[list[str | None], set[int]]: ...
+
+    def mark_dirty(self, buckets: list[int], user_ids: list[int], ttl: int) -> None: ...
+
+
+class InMemoryStageBackend:
+    """
+    Корзины в памяти процесса (потокобезопасно).
+    Подходит для тестов и запуска с одним воркером.
+    """
+
+    def __init__(self, clock: Callable[[], float] = time.monotonic) -> None:
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._entries: dict[int, tuple[float, dict[int, str]]] = {}
+        self._dirty: dict[int, tuple[float, set[int]]] = {}
+
+    def _purge(self, now: float) -> None:
+        for storage in (self._entries, self._dirty):
+            for bucket in [b for b, (expires, _) in storage.items() if expires <= now]:
+                del storage[bucket]
+
+    def put(self, bucket: int, entries: dict[int, str], ttl: int) -> None:
+        with self._lock:
+            now = self._clock()
+            self._purge(now)
+            _, current = self._entries.get(bucket, (0.0, {}))
+            self._entries[bucket] = (now + ttl, {**current, **entries})
+
+    def get(
+        self, bucket: int, habit_ids: list[int]
+    ) -> tuple[list[str | None], set[int]]:
+        with self._lock:
+            self._purge(self._clock())
+            _, entries = self._entries.get(bucket, (0.0, {}))
+            _, dirty = self._dirty.get(bucket, (0.0, set()))
+            return [entries.get(habit_id) for habit_id in habit_ids], set(dirty)
+
+    def mark_dirty(self, buckets: list[int], user_ids: list[int], ttl: int) -> None:
+        with self._lock:
+            now = self._clock()
+            for bucket in buckets:
+                _, dirty = self._dirty.get(bucket, (0.0, set()))
+                self._dirty[bucket] = (now + ttl, dirty | set(user_ids))
+
+
+class RedisStageBackend:
+    """
+    Корзины в Redis: хэш habit_id → строка и множество грязных user_id
+    на минуту. Ключи живут ttl секунд.
+    Если Redis недоступен, корзины считаются пустыми (fail-open):
+    шард прочитает данные из БД.
+    """
+
+    def __init__(self, client, prefix: str = "habits:stage:") -> None:
+        self._client = client
+        self._prefix = prefix
+
+    def _keys(self, bucket: int) -> tuple[str, str]:
+        key = f"{self._prefix}{bucket}"
+        return key, f"{key}:dirty"
+
+    def put(self, bucket: int, entries: dict[int, str], ttl: int) -> None:
+        if not entries:
+            return
+        key, _ = self._keys(bucket)
+        try:
+            pipe = self._client.pipeline()
+            pipe.hset(key, mapping=entries)
+            pipe.expire(key, ttl)
+            pipe.execute()
+        except RedisError:
+            pass
+
+    def get(
+        self, bucket: int, habit_ids: list[int]
+    ) -> tuple[list[str | None], set[int]]:
+        key, dirty_key = self._keys(bucket)
+        try:
+            pipe = self._client.pipeline()
+            pipe.hmget(key, habit_ids)
+            pipe.smembers(dirty_key)
+            raw, dirty = pipe.execute()
+        except RedisError:
+            return [None] * len(habit_ids), set()
+        return raw, {int(user_id) for user_id in dirty}
+
+    def mark_dirty(self, buckets: list[int], user_ids: list[int], ttl: int) -> None:
+        if not user_ids:
+            return
+        try:
+            pipe = self._client.pipeline()
+            for bucket in buckets:
+                _, dirty_key = self._keys(bucket)
+                pipe.sadd(dirty_key, *user_ids)
+                pipe.expire(dirty_key, ttl)
+            pipe.execute()
+        except RedisError:
+            pass
+
+
+class ReminderStage:
+    """
+    Корзины напоминаний на lookahead_minutes минут вперёд.
+    """
+
+    def __init__(
+        self, backend: StageBackend, ttl_seconds: int, lookahead_minutes: int
+    ) -> None:
+        self._backend = backend
+        self._ttl = ttl_seconds
+        self._lookahead = lookahead_minutes
+
+    def lookahead_range(
+        self, now: datetime.datetime
+    ) -> tuple[datetime.datetime, datetime.datetime]:
+        """
+        Полуинтервал [start, end) вхождений, которые готовит запуск в момент now:
+        от следующей минуты на lookahead_minutes минут вперёд.
+        """
+        first = bucket_of(now) + 1
+        return bucket_start(first), bucket_start(first + self._lookahead)
+
+    def stage(self, rows: Iterable[StagedRow]) -> int:
+        """
+        Раскладывает строки по корзинам минуты вхождения.
+        :return: количество подготовленных привычек
+        """
+        buckets: dict[int, dict[int, str]] = defaultdict(dict)
+        for habit_id, user_id, chat_id, title, text, due in rows:
+            buckets[bucket_of(due)][habit_id] = json.dumps(
+                [user_id, chat_id, title, text, due.isoformat()]
+            )
+        for bucket, entries in buckets.items():
+            self._backend.put(bucket, entries, self._ttl)
+        return sum(len(entries) for entries in buckets.values())
+
+    def fetch(
+        self, occurrences: dict[int, datetime.datetime]
+    ) -> dict[int, tuple[int, str, str, str]]:
+        """
+        Достаёт подготовленные строки захваченных вхождений.
+        Пропускаются строки грязных пользователей и строки другого вхождения.
+        :param occurrences: habit_id → захваченное время вхождения
+        :return: habit_id → (habit_id, chat_id, rendered_title, reminder_text)
+        """
+        by_bucket: dict[int, list[int]] = defaultdict(list)
+        for habit_id, due in occurrences.items():
+            by_bucket[bucket_of(due)].append(habit_id)
+
+        staged: dict[int, tuple[int, str, str, str]] = {}
+        for bucket, habit_ids in by_bucket.items():
+            raw_rows, dirty = self._backend.get(bucket, habit_ids)
+            for habit_id, raw in zip(habit_ids, raw_rows):
+                if raw is None:
+                    continue
+                user_id, chat_id, title, text, due = json.loads(raw)
+                if user_id in dirty:
+                    continue
+                if datetime.datetime.fromisoformat(due) != occurrences[habit_id]:
+                    continue
+                staged[habit_id] = (habit_id, chat_id, title, text)
+        return staged
+
+    def invalidate(
+        self, user_ids: Iterable[int], now: datetime.datetime | None = None
+    ) -> None:
+        """
+        Помечает пользователей грязными во всех корзинах, которые ещё
+        могут быть прочитаны: от now - TTL до конца окна предзагрузки.
+        """
+        user_ids = sorted(set(user_ids))
+        if not user_ids:
+            return
+        current = bucket_of(now or timezone.now())
+        buckets = list(
+            range(current - self._ttl // 60 - 1, current + self._lookahead + 2)
+        )
+        self._backend.mark_dirty(buckets, user_ids, self._ttl)
+
+
+def build_reminder_stage() -> ReminderStage | None:
+    """
+    Создаёт хранилище корзин по настройкам HABIT_REMINDERS_STAGE_*.
+    :return: None, если предзагрузка выключена (HABIT_REMINDERS_STAGE_BACKEND="off")
+    """
+    if settings.HABIT_REMINDERS_STAGE_BACKEND == "off":
+        return None
+    redis = backend_redis("HABIT_REMINDERS_STAGE")
+    backend: StageBackend = (
+        InMemoryStageBackend() if redis is None else RedisStageBackend(redis)
+    )
+    return ReminderStage(
+        backend,
+        ttl_seconds=settings.HABIT_REMINDERS_STAGE_TTL_SECONDS,
+        lookahead_minutes=settings.HABIT_REMINDERS_DISPATCH_INTERVAL_MINUTES,
+    )
+
+
+# Общее для процесса хранилище корзин (создаётся лениво, один раз)
+reminder_stage = ProcessSingleton(build_reminder_stage)
+get_reminder_stage = reminder_stage.get
+reset_reminder_stage = reminder_stage.reset
+
+
+def invalidate_staged_reminders(user_ids: Iterable[int]) -> None:
+    """
+    После коммита текущей транзакции помечает подготовленные напоминания
+    пользователей устаревшими.
+    """
+    stage = get_reminder_stage()
+    if stage is None:
+        return
+    user_ids = list(user_ids)
+    transaction.on_commit(lambda: stage.invalidate(user_ids))
@@ -2,63 +2,692 @@
 Celery-задачи приложения habits.
 Содержит периодические задачи (Celery Beat), которые отправляют напоминания
 о привычках в Telegram.
-Задача `send_habit_reminders` предполагается к запуску раз в минуту.
-Она выбирает привычки, у которых `time` совпадает с текущим временем
-(точность до минуты), и отправляет сообщение в Telegram пользователю,
+Задача `send_habit_reminders` запускается раз в
+HABIT_REMINDERS_DISPATCH_INTERVAL_MINUTES минут (по умолчанию — каждую минуту).
+Она выбирает привычки, чьё ближайшее вхождение (Habit.next_due_at) уже
+наступило, и отправляет сообщение в Telegram пользователю,
 если у него подключён TelegramProfile (is_active=True).
+Периодичность учитывается через next_due_at: после доставки он сдвигается
+на periodicity дней, поэтому еженедельная привычка напоминается раз в неделю.
+Поиск идёт по частичному индексу расписания (Habit.next_due_at при
+reminders_enabled=True) — один range scan, а не сканирование таблицы привычек.
+Каждый запуск сдвигает «водяной знак» ReminderDispatchState и обрабатывает
+окно (processed_until, now]: опоздавший или пропущенный тик beat
+не теряет напоминаний — их подберёт следующий запуск. Параллельные
+тики исключены арендой в Redis с fencing-токенами (habits.lease).
+Отправка разделена на планировщик и воркеры:
+- `send_habit_reminders` (beat) только вычисляет набор привычек к отправке,
+  режет его по user_id на шарды ограниченного размера и ставит их в очередь;
+- `send_habit_reminders_shard` отправляет один шард; шарды независимы,
+  поэтому их может параллельно обрабатывать любое число воркеров.
+Шард не создаёт экземпляры моделей: (id, chat_id, готовый Habit.reminder_text)
+читаются проекцией values_list() через серверный курсор порциями
+HABIT_REMINDERS_FETCH_CHUNK_SIZE в лёгкий объект ReminderRow, поэтому память
+воркера не растёт с числом привычек, а join к Place не нужен.
+Привычки одного чата, наступившие в одном запуске, объединяются в одно
+сообщение (делится на части, только если превышает лимит Telegram
+в 4096 символов) — один вызов API и один слот ограничителя на пользователя.
+Пользователи в режиме «ежедневная сводка» (TelegramProfile.delivery_mode)
+получают вместо этого одно сообщение в день — задача `send_habit_digests`.
+Шард не отправляет сам: сообщения пишутся пачкой в очередь
+NotificationOutbox в той же транзакции, что и захват вхождений, а отправляют
+их задачи drain_notification_outbox (см. notifications.tasks). Временные
+ошибки повторяются отправителем, постоянные записываются в dead-letter;
+итог отправки попадает в журнал через сигнал notification_outbox_attempted
+(record_reminder_outcomes).
+Доставка идемпотентна: перед отправкой шард захватывает вхождения
+(привычка, next_due_at) в журнале ReminderDelivery и сдвигает next_due_at,
+поэтому повторный запуск ничего не отправит второй раз.
+Задача `stage_habit_reminders` заранее готовит получателей и тексты
+следующих минут (см. habits.staging): в минуту вхождения шард только
+захватывает вхождения, берёт подготовленные строки и отправляет.
 """
 
+import datetime
+import logging
+from collections.abc import Iterable, Iterator
+from dataclasses import dataclass
+from itertools import groupby
+
 from celery import shared_task
+from django.conf import settings
+from django.db import connection, transaction
 from django.db.models import Q
 from django.utils import timezone
 
-from habits.models import Habit
-from notifications.telegram import send_telegram_message
+from habits.models import (
+    COMBINED_REMINDER_FRAME,
+    DIGEST_FRAME,
+    Habit,
+    HabitScheduleChange,
+    ReminderDelivery,
+    ReminderDispatchState,
+    StaleFencingTokenError,
+    render_title_list_line,
+    render_title_list_text,
+)
+from habits.lease import Lease, get_lease_backend
+from habits.staging import get_reminder_stage
+from notifications.models import NotificationOutbox, TelegramProfile
+from notifications.tasks import kick_outbox_drainers
+from notifications.telegram import TELEGRAM_MAX_MESSAGE_LENGTH
+
+logger = logging.getLogger(__name__)
+
+REMINDERS_DISPATCH_KEY = "habit_reminders"
+
+
+def due_habits(now: datetime.datetime):
+    """
+    QuerySet привычек, которые пора напомнить (next_due_at <= now).
+    Условие reminders_enabled=True совпадает с условием частичного индекса,
+    поэтому PostgreSQL читает только наступившие вхождения.
+    Нижней границы окна в запросе нет намеренно: всё, что уже обработано,
+    сдвинуто claim-ом за now, а next_due_at <= processed_until остаётся
+    только у вхождений, которые ещё не удалось захватить (упавший шард,
+    снова включённый профиль) — их нужно подобрать, а не потерять.
+    Фильтр по telegram_profile оставлен как страховка от рассинхронизации флага.
+    """
+    return Habit.objects.due(now).filter(
+        Q(user__telegram_profile__isnull=False)
+        & Q(user__telegram_profile__is_active=True)
+    )
+
+
+def partition_by_user(
+    rows: Iterable[tuple[int, int]], shard_size: int
+) -> list[list[int]]:
+    """
+    Делит пары (habit_id, user_id), отсортированные по user_id, на шарды.
+    Правила:
+    - в шарде не больше shard_size привычек;
+    - привычки одного пользователя не разрываются между шардами
+      (поэтому шард одного «тяжёлого» пользователя может быть больше лимита).
+    :return: список шардов, каждый — список id привычек
+    """
+    shards: list[list[int]] = []
+    current: list[int] = []
+    last_user_id: int | None = None
+
+    for habit_id, user_id in rows:
+        if current and user_id != last_user_id and len(current) >= shard_size:
+            shards.append(current)
+            current = []
+        current.append(habit_id)
+        last_user_id = user_id
+
+    if current:
+        shards.append(current)
+
+    return shards
+
+
+def spread_countdowns(count: int, max_skew: float) -> list[float]:
+    """
+    Задержки (в секундах) для равномерного распределения count задач
+    на интервал [0, max_skew): первая стартует сразу, последняя — не позже
+    max_skew после планирования.
+    :param max_skew: максимальное опоздание доставки; 0 — всё сразу
+    """
+    if count <= 0:
+        return []
+    step = max(max_skew, 0) / count
+    return [round(index * step, 3) for index in range(count)]
 
 
 @shared_task(name="habits.tasks.send_habit_reminders")
-def send_habit_reminders() -> int:
+def send_habit_reminders() -> list[int]:
     """
-    Отправляет Telegram-напоминания о привычках, которые должны выполняться сейчас.
+    Планировщик напоминаний (запускается Celery Beat раз в
+    HABIT_REMINDERS_DISPATCH_INTERVAL_MINUTES минут).
+    Одновременно работает только один тик: он держит аренду
+    REMINDERS_DISPATCH_KEY (habits.lease), а её fencing-токен проверяется
+    при сдвиге водяного знака; перед каждым проходом аренда продлевается,
+    а если продлить не удалось — тик завершается. Тик, заставший
+    предыдущий (второй beat, затянувшийся проход), не дублирует его:
+    оставляет отметку слияния и завершается, а владелец аренды перед её
+    снятием делает ещё один проход до текущего момента
+    (dispatch_reminder_window).
+    Возвращает:
+        list[int]: размер каждого поставленного шарда. Сумма совпадает с
+                   суммой int-результатов шардовых задач (числом захваченных
+                   привычек), если вхождения не захватил другой проход.
+    """
+    lease = Lease(
+        get_lease_backend(),
+        REMINDERS_DISPATCH_KEY,
+        settings.HABIT_REMINDERS_DISPATCH_LEASE_SECONDS,
+    )
+    if lease.acquire() is None:
+        lease.request_merge()
+        # Владелец мог снять аренду до появления отметки — тогда проход за нами
+        if lease.acquire() is None:
+            return []
+
+    shard_sizes: list[int] = []
+    try:
+        while True:
+            # Каждый проход — со свежим TTL: затянувшийся проход не должен
+            # пересечься со следующим тиком, забравшим истёкшую аренду
+            if not lease.renew():
+                logger.warning(
+                    "Рассылка напоминаний: аренда %s потеряна до прохода — "
+                    "рассылку продолжит другой тик.",
+                    REMINDERS_DISPATCH_KEY,
+                )
+                break
+            shard_sizes += dispatch_reminder_window(lease.fencing_token)
+            if lease.release():
+                break
+    except StaleFencingTokenError as exc:
+        logger.warning(
+            "Рассылка напоминаний: проход отклонён, аренду уже получил "
+            "другой тик (%s).",
+            exc,
+        )
+    finally:
+        lease.release(merge=False)
+    return shard_sizes
+
+
+def dispatch_reminder_window(fencing_token: int | None = None) -> list[int]:
+    """
+    Один проход рассылки.
     Логика:
-    1) Берём текущее локальное время и обнуляем секунды/микросекунды.
-    2) Находим привычки, у которых поле `time` совпадает с текущей минутой.
-    3) Для каждой привычки проверяем наличие у пользователя TelegramProfile:
-       - профиль должен существовать;
-       - профиль должен быть активным (is_active=True).
-    4) Отправляем сообщение через `send_telegram_message`.
+    1) Сдвигаем водяной знак ReminderDispatchState до текущего времени и
+       получаем окно (processed_until, now].
+    2) Одним запросом по индексу расписания читаем (id, user_id) привычек,
+       наступивших к концу окна.
+    3) Делим их по user_id на шарды размером HABIT_REMINDERS_SHARD_SIZE.
+    4) Ставим каждый шард в очередь задачей `send_habit_reminders_shard`.
+       Шарды захватывают вхождения сразу, а отправку их сообщений
+       равномерно растягиваем на HABIT_REMINDERS_MAX_SKEW_SECONDS
+       (send_at → not_before строк очереди), чтобы пик :00/:30 не упирался
+       в лимит Telegram в первые секунды минуты.
+    Окно используется для диагностики догоняющих проходов (log_catch_up):
+    окно длиннее интервала beat — тики были пропущены; вхождения с
+    next_due_at <= start — их не смогли захватить прошлые проходы.
+    :param fencing_token: токен аренды рассылки
+    :raises StaleFencingTokenError: аренду уже получил другой тик
+    :return: размеры поставленных шардов
+    """
+    with transaction.atomic():
+        window_start, window_end = ReminderDispatchState.advance(
+            REMINDERS_DISPATCH_KEY, timezone.localtime(), fencing_token
+        )
+        rows = list(
+            due_habits(window_end)
+            .order_by("user_id", "id")
+            .values_list("id", "user_id", "next_due_at")
+        )
+        shards = partition_by_user(
+            ((habit_id, user_id) for habit_id, user_id, _ in rows),
+            settings.HABIT_REMINDERS_SHARD_SIZE,
+        )
+
+    log_catch_up(window_start, window_end, [due for *_, due in rows])
+
+    countdowns = spread_countdowns(
+        len(shards), settings.HABIT_REMINDERS_MAX_SKEW_SECONDS
+    )
+    dispatched_at = timezone.now()
+    for habit_ids, countdown in zip(shards, countdowns):
+        send_at = dispatched_at + datetime.timedelta(seconds=countdown)
+        send_habit_reminders_shard.delay(
+            habit_ids, window_end.isoformat(), send_at.isoformat()
+        )
+
+    return [len(habit_ids) for habit_ids in shards]
+
+
+def log_catch_up(
+    window_start: datetime.datetime | None,
+    window_end: datetime.datetime,
+    due_times: list[datetime.datetime],
+) -> int:
+    """
+    Пишет в лог, если проход догоняет пропущенное.
+    :param due_times: next_due_at привычек, выбранных проходом
+    :return: число вхождений, наступивших до начала окна
+    """
+    if window_start is None:
+        return 0
+
+    interval = datetime.timedelta(
+        minutes=settings.HABIT_REMINDERS_DISPATCH_INTERVAL_MINUTES
+    )
+    if window_end - window_start > interval:
+        logger.warning(
+            "Рассылка напоминаний: окно (%s, %s] длиннее интервала %s — "
+            "тики beat были пропущены, проход догоняет их.",
+            window_start.isoformat(),
+            window_end.isoformat(),
+            interval,
+        )
+
+    overdue = sum(1 for due in due_times if due <= window_start)
+    if overdue:
+        logger.warning(
+            "Рассылка напоминаний: %d вхождений наступили до начала окна %s "
+            "и не были захвачены прошлыми проходами.",
+            overdue,
+            window_start.isoformat(),
+        )
+    return overdue
+
+
+@dataclass(frozen=True, slots=True)
+class ReminderRow:
+    """
+    Минимум данных привычки для напоминания (строка проекции values_list).
+    """
+
+    habit_id: int
+    chat_id: str
+    title: str
+    text: str
+
+
+# Порядок полей совпадает с порядком атрибутов ReminderRow
+REMINDER_ROW_FIELDS = (
+    "id",
+    "user__telegram_profile__chat_id",
+    "rendered_title",
+    "reminder_text",
+)
+
+# Сообщение шарда: (chat_id, text, ((delivery_id, scheduled_for), ...))
+ReminderMessage = tuple[str, str, tuple[tuple[int, datetime.datetime], ...]]
+
+
+def iter_reminder_rows(habits) -> Iterator[ReminderRow]:
+    """
+    Потоково читает привычки проекцией в ReminderRow, сгруппированными
+    по пользователю (ORDER BY user_id, id).
+    iterator(chunk_size=...) в PostgreSQL использует серверный курсор:
+    в памяти одновременно только одна порция строк.
+    """
+    rows = (
+        habits.order_by("user_id", "id")
+        .values_list(*REMINDER_ROW_FIELDS)
+        .iterator(chunk_size=settings.HABIT_REMINDERS_FETCH_CHUNK_SIZE)
+    )
+    for row in rows:
+        yield ReminderRow(*row)
+
+
+def split_by_message_limit(
+    rows: list[ReminderRow],
+    frame: tuple[str, str] = COMBINED_REMINDER_FRAME,
+    limit: int = TELEGRAM_MAX_MESSAGE_LENGTH,
+    keep_single: bool = True,
+) -> Iterator[tuple[str, list[ReminderRow]]]:
+    """
+    Упаковывает привычки одного чата в минимум сообщений не длиннее limit.
+    Несколько привычек — список в рамке frame (render_title_list_text);
+    одна привычка при keep_single — обычный текст Habit.reminder_text.
+    :return: пары (текст сообщения, привычки в нём)
+    """
+    frame_length = len(frame[0]) + len(frame[1])
+    batch: list[ReminderRow] = []
+    length = frame_length
+
+    def flush() -> tuple[str, list[ReminderRow]]:
+        if keep_single and len(batch) == 1:
+            return batch[0].text, batch
+        return render_title_list_text([row.title for row in batch], frame), batch
+
+    for row in rows:
+        line = len(render_title_list_line(row.title)) + 1
+        if batch and length + line > limit:
+            yield flush()
+            batch, length = [], frame_length
+        batch.append(row)
+        length += line
+
+    if batch:
+        yield flush()
+
+
+def iter_reminder_messages(
+    rows: Iterable[ReminderRow], deliveries: dict[int, tuple[int, datetime.datetime]]
+) -> Iterator[ReminderMessage]:
+    """
+    Лениво превращает строки привычек в сообщения: по одному на чат
+    (или несколько, если текст не помещается в лимит Telegram).
+    Строки должны идти сгруппированными по чату (см. iter_reminder_rows).
+    """
+    for chat_id, chat_rows in groupby(rows, key=lambda row: row.chat_id):
+        for text, batch in split_by_message_limit(list(chat_rows)):
+            yield (
+                chat_id,
+                text,
+                tuple(deliveries[row.habit_id] for row in batch),
+            )
+
+
+def delivery_outcome(
+    delivery_id: int, result, scheduled_for: datetime.datetime
+) -> ReminderDelivery:
+    """
+    Несохранённая запись журнала с итогом отправки (для bulk_update).
+    """
+    sent_at = timezone.now()
+    latency = sent_at - scheduled_for
+    return ReminderDelivery(
+        id=delivery_id,
+        status=result.status,
+        sent_at=sent_at,
+        latency_ms=max(0, int(latency.total_seconds() * 1000)),
+        message_id=result.message_id,
+    )
+
+
+@shared_task(name="habits.tasks.send_habit_reminders_shard")
+def send_habit_reminders_shard(
+    habit_ids: list[int], now: str | None = None, send_at: str | None = None
+) -> int:
+    """
+    Отправляет Telegram-напоминания по одному шарду привычек.
+    Логика:
+    1) Захватываем наступившие вхождения (привычка, next_due_at) в журнале
+       ReminderDelivery и сдвигаем next_due_at на periodicity дней —
+       отправляются только захваченные этим вызовом.
+    2) Берём подготовленные строки (stage_habit_reminders); остальные
+       читаем из БД, перепроверяя профиль: между планированием и выполнением
+       пользователь мог отключить уведомления или перейти на сводку
+       (такие записи → skipped).
+    3) Объединяем привычки каждого чата в одно сообщение и пишем сообщения
+       в очередь NotificationOutbox в той же транзакции, что и захват:
+       при падении воркера захват откатывается вместе с очередью.
+       Итог отправки каждого сообщения запишет в журнал всем его привычкам
+       record_reminder_outcomes.
+    :param habit_ids: id привычек шарда (из `send_habit_reminders`)
+    :param now: момент планирования в ISO-формате (по умолчанию — текущий);
+                вхождения позже него не захватываются
+    :param send_at: не отправлять раньше этого момента (ISO-формат):
+                    растяжка шардов из dispatch_reminder_window;
+                    по умолчанию — сразу
     Возвращает:
-        int: количество попыток отправки (сколько раз вызвали send_telegram_message).
-             Это удобно для тестов/логирования (не равно числу успехов, т.к. telegram
-             может вернуть ok=False).
-    """
-    now = timezone.localtime()
-    current_time = now.time().replace(second=0, microsecond=0)
-
-    # Важно: select_related, чтобы не дёргать БД в цикле.
-    # Фильтрация по telegram_profile делается через join, чтобы сразу отсеять тех,
-    # у кого нет профиля или он выключен.
-    habits = (
-        Habit.objects.filter(time=current_time)
-        .select_related("user", "place", "related_habit", "user__telegram_profile")
-        .filter(
-            Q(user__telegram_profile__isnull=False)
-            & Q(user__telegram_profile__is_active=True)
+        int: количество захваченных привычек (записей журнала); сообщений
+             в очередь может попасть меньше — привычки чата объединяются,
+             пропущенные не отправляются.
+    """
+    as_of = timezone.now() if now is None else datetime.datetime.fromisoformat(now)
+    not_before = None if send_at is None else datetime.datetime.fromisoformat(send_at)
+
+    with transaction.atomic():
+        deliveries = ReminderDelivery.claim(habit_ids, as_of)
+        queued = queue_reminder_messages(
+            iter_reminder_messages(iter_shard_rows(deliveries), deliveries),
+            not_before,
+        )
+        queued_ids = {
+            delivery_id
+            for row in queued
+            for delivery_id, _ in row.payload["reminder_deliveries"]
+        }
+        ReminderDelivery.objects.filter(
+            id__in=[
+                delivery_id
+                for delivery_id, _ in deliveries.values()
+                if delivery_id not in queued_ids
+            ],
+        ).update(status=ReminderDelivery.STATUS_SKIPPED)
+
+    kick_outbox_drainers(len(queued), not_before)
+    logger.info(
+        "Шард напоминаний: захвачено привычек %s, сообщений в очереди %s.",
+        len(deliveries),
+        len(queued),
+    )
+    return len(deliveries)
+
+
+def iter_shard_rows(
+    deliveries: dict[int, tuple[int, datetime.datetime]],
+) -> Iterable[ReminderRow]:
+    """
+    Строки захваченных привычек шарда, сгруппированные по чату.
+    Подготовленные заранее строки берутся из корзин habits.staging,
+    остальные (не подготовленные, устаревшие) читаются из БД.
+    Без предзагрузки — прежнее потоковое чтение iter_reminder_rows.
+    """
+    habits = Habit.objects.filter(
+        reminders_enabled=True, user__telegram_profile__is_active=True
+    )
+    stage = get_reminder_stage()
+    if stage is None:
+        return iter_reminder_rows(habits.filter(id__in=list(deliveries)))
+
+    staged = stage.fetch(
+        {habit_id: scheduled_for for habit_id, (_, scheduled_for) in deliveries.items()}
+    )
+    rows = [ReminderRow(*row) for row in staged.values()]
+    missing = [habit_id for habit_id in deliveries if habit_id not in staged]
+    if missing:
+        rows.extend(iter_reminder_rows(habits.filter(id__in=missing)))
+    rows.sort(key=lambda row: (row.chat_id, row.habit_id))
+    return rows
+
+
+def queue_reminder_messages(
+    messages: Iterable[ReminderMessage],
+    not_before: datetime.datetime | None = None,
+) -> list[NotificationOutbox]:
+    """
+    Пишет сообщения в очередь NotificationOutbox одним bulk_create.
+    Записи журнала сообщения кладутся в payload и вернутся
+    в record_reminder_outcomes вместе с итогом отправки.
+    :param not_before: не отправлять раньше этого момента (по умолчанию — сразу)
+    :return: созданные строки очереди
+    """
+    now = timezone.now() if not_before is None else not_before
+    return NotificationOutbox.objects.bulk_create(
+        [
+            NotificationOutbox(
+                recipient=chat_id,
+                not_before=now,
+                payload={
+                    "text": text,
+                    "reminder_deliveries": [
+                        [delivery_id, scheduled_for.isoformat()]
+                        for delivery_id, scheduled_for in message_deliveries
+                    ],
+                },
+            )
+            for chat_id, text, message_deliveries in messages
+        ],
+        batch_size=500,
+    )
+
+
+def record_reminder_outcomes(results) -> int:
+    """
+    Записывает итог отправки сообщений из очереди всем их записям журнала
+    (bulk_update). Подключена к сигналу notification_outbox_attempted;
+    строки без reminder_deliveries (не напоминания) пропускаются.
+    :param results: (payload, TelegramSendResult)
+    :return: сколько записей журнала обновлено
+    """
+    outcomes = [
+        delivery_outcome(
+            delivery_id, result, datetime.datetime.fromisoformat(scheduled_for)
         )
+        for payload, result in results
+        for delivery_id, scheduled_for in payload.get("reminder_deliveries", ())
+    ]
+    ReminderDelivery.objects.bulk_update(
+        outcomes, ["status", "sent_at", "latency_ms", "message_id"], batch_size=500
     )
+    return len(outcomes)
 
-    sent_count = 0
 
-    for habit in habits:
-        chat_id = habit.user.telegram_profile.chat_id
+def build_digest_messages(
+    digests: list[tuple[int, str, datetime.datetime]],
+) -> list[ReminderMessage]:
+    """
+    Собирает сводки для пачки пользователей.
+    Привычки на сегодня (next_due_at до конца местных суток сводки — так
+    учитывается периодичность) читаются одним агрегирующим запросом на всю
+    пачку, затем захватываются в журнале (claim_until) и сдвигаются
+    на следующее вхождение.
+    :param digests: (user_id, chat_id, конец суток сводки) из claim_due_digests
+    :return: сообщения для queue_reminder_messages
+    """
+    if not digests:
+        return []
 
-        text = (
-            "⏰ <b>Напоминание о привычке</b>\n\n"
-            f"{habit.title}\n\n"
-            "Не забудь выполнить привычку и отметить прогресс! 💪"
+    chat_ids = {user_id: chat_id for user_id, chat_id, _ in digests}
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f"""
+            SELECT h.user_id,
+                   array_agg(h.id ORDER BY h."time", h.id),
+                   array_agg(h.rendered_title ORDER BY h."time", h.id),
+                   min(b.day_end)
+            FROM {Habit._meta.db_table} h
+            JOIN unnest(%s::bigint[], %s::timestamptz[]) AS b(user_id, day_end)
+              ON b.user_id = h.user_id
+            WHERE h.next_due_at < b.day_end
+            GROUP BY h.user_id
+            """,
+            [[d[0] for d in digests], [d[2] for d in digests]],
         )
+        aggregated = cursor.fetchall()
 
-        send_telegram_message(chat_id, text)
-        sent_count += 1
+    last_moment = datetime.timedelta(microseconds=1)
+    deliveries = ReminderDelivery.claim_until(
+        {
+            habit_id: day_end - last_moment
+            for _, habit_ids, _, day_end in aggregated
+            for habit_id in habit_ids
+        }
+    )
 
-    return sent_count
+    messages: list[ReminderMessage] = []
+    for user_id, habit_ids, titles, _ in aggregated:
+        rows = [
+            ReminderRow(habit_id, chat_ids[user_id], title, "")
+            for habit_id, title in zip(habit_ids, titles)
+            if habit_id in deliveries
+        ]
+        for text, batch in split_by_message_limit(
+            rows, frame=DIGEST_FRAME, keep_single=False
+        ):
+            messages.append(
+                (
+                    chat_ids[user_id],
+                    text,
+                    tuple(deliveries[row.habit_id] for row in batch),
+                )
+            )
+    return messages
+
+
+@shared_task(name="habits.tasks.stage_habit_reminders")
+def stage_habit_reminders() -> int:
+    """
+    Готовит напоминания следующих минут (запускается Celery Beat вместе
+    с рассылкой): привычки, наступающие в окне предзагрузки, с chat_id
+    и готовым текстом раскладываются по корзинам habits.staging.
+    Возвращает:
+        int: количество подготовленных привычек.
+    """
+    stage = get_reminder_stage()
+    if stage is None:
+        return 0
+
+    start, end = stage.lookahead_range(timezone.now())
+    rows = (
+        Habit.objects.filter(
+            reminders_enabled=True,
+            next_due_at__gte=start,
+            next_due_at__lt=end,
+            user__telegram_profile__is_active=True,
+        )
+        .order_by()
+        .values_list(
+            "id",
+            "user_id",
+            "user__telegram_profile__chat_id",
+            "rendered_title",
+            "reminder_text",
+            "next_due_at",
+        )
+        .iterator(chunk_size=settings.HABIT_REMINDERS_FETCH_CHUNK_SIZE)
+    )
+    return stage.stage(rows)
+
+
+@shared_task(name="habits.tasks.send_habit_digests")
+def send_habit_digests() -> int:
+    """
+    Ежедневные сводки для профилей в режиме «ежедневная сводка».
+    Запускается Celery Beat вместе с рассылкой напоминаний. Наступившие
+    сводки захватываются пачками по HABIT_DIGEST_BATCH_SIZE
+    (TelegramProfile.claim_due_digests сразу сдвигает next_digest_at на
+    следующие сутки, поэтому параллельный запуск их не повторит);
+    на пачку — один агрегирующий запрос привычек и по сообщению на пользователя.
+    Пользователю без привычек на сегодня сводка не отправляется.
+    Сводки пачки пишутся в очередь NotificationOutbox в одной транзакции
+    с захватом.
+    Возвращает:
+        int: количество сообщений, поставленных в очередь на отправку.
+    """
+    now = timezone.now()
+    queued_count = 0
+
+    while True:
+        with transaction.atomic():
+            digests = TelegramProfile.claim_due_digests(
+                now, settings.HABIT_DIGEST_BATCH_SIZE
+            )
+            queued = queue_reminder_messages(build_digest_messages(digests))
+        if not digests:
+            break
+        kick_outbox_drainers(len(queued))
+        queued_count += len(queued)
+
+    return queued_count
+
+
+@shared_task(name="habits.tasks.prune_reminder_deliveries")
+def prune_reminder_deliveries() -> int:
+    """
+    Удаляет записи журнала доставки старше REMINDER_DELIVERY_RETENTION_DAYS.
+    Возвращает:
+        int: сколько записей удалено.
+    """
+    cutoff = timezone.now() - datetime.timedelta(
+        days=settings.REMINDER_DELIVERY_RETENTION_DAYS
+    )
+    deleted, _ = ReminderDelivery.objects.filter(scheduled_for__lt=cutoff).delete()
+    return deleted
+
+
+@shared_task(name="habits.tasks.prune_schedule_changes")
+def prune_schedule_changes() -> int:
+    """
+    Удаляет записи ленты изменений расписания старше
+    HABIT_SCHEDULE_CHANGE_RETENTION_HOURS.
+    Возвращает:
+        int: сколько записей удалено.
+    """
+    cutoff = timezone.now() - datetime.timedelta(
+        hours=settings.HABIT_SCHEDULE_CHANGE_RETENTION_HOURS
+    )
+    deleted, _ = HabitScheduleChange.objects.filter(created_at__lt=cutoff).delete()
+    return deleted
+
+
+@shared_task(name="habits.tasks.realign_reminder_schedule")
+def realign_reminder_schedule() -> int:
+    """
+    Массово приводит next_due_at к местному времени владельцев
+    (см. HabitQuerySet.realign_next_due_at): страховка на случай смены
+    смещения часового пояса — переход на летнее/зимнее время, обновление tzdata.
+    Возвращает:
+        int: сколько привычек исправлено.
+    """
+    return Habit.objects.realign_next_due_at()
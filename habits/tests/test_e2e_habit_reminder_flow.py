@@ -16,7 +16,8 @@ from unittest.mock import patch
 from django.utils import timezone
 
 from habits.models import Habit
-from notifications.models import TelegramProfile, TelegramLinkToken
+from notifications.models import TelegramProfile, TelegramLinkToken, TelegramSendStatus
+from notifications.telegram import TelegramSendResult
 
 pytestmark = pytest.mark.django_db
 
@@ -77,8 +78,8 @@ def test_e2e_link_token_to_profile_to_reminder(user):
     from habits.tasks import send_habit_reminders
 
     with patch(
-        "habits.tasks.send_telegram_message",
-        return_value=True,
+        "notifications.telegram.deliver_telegram_message",
+        return_value=TelegramSendResult(TelegramSendStatus.OK),
     ) as send_mock:
         send_habit_reminders()
 
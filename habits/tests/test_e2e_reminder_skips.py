@@ -47,7 +47,7 @@ def test_task_skips_when_no_telegram_profile(user):
 
     from habits.tasks import send_habit_reminders
 
-    with patch("habits.tasks.send_telegram_message") as send_mock:
+    with patch("notifications.telegram.deliver_telegram_message") as send_mock:
         send_habit_reminders()
 
         send_mock.assert_not_called()
@@ -88,7 +88,7 @@ def test_task_skips_when_telegram_profile_inactive(user):
 
     from habits.tasks import send_habit_reminders
 
-    with patch("habits.tasks.send_telegram_message") as send_mock:
+    with patch("notifications.telegram.deliver_telegram_message") as send_mock:
         send_habit_reminders()
 
         send_mock.assert_not_called()
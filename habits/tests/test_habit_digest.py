@@ -0,0 +1,148 @@
+"""
+Тесты режима «ежедневная сводка» (TelegramProfile.delivery_mode = digest).
+Проверяется:
+- пользователь получает одно сообщение со всеми привычками на сегодня,
+  а привычки, не наступающие сегодня, в сводку не попадают;
+- повторный запуск сводку не дублирует, next_digest_at и next_due_at
+  сдвигаются на следующие сутки;
+- напоминания по каждой привычке такому пользователю не отправляются;
+- режим переключается через API профиля;
+- повторное включение профиля (save() или TelegramProfile.link())
+  пересчитывает устаревший next_digest_at.
+"""
+
+import datetime
+from unittest.mock import patch
+
+import pytest
+
+from habits.models import Habit, ReminderDelivery
+from habits.tasks import send_habit_digests, send_habit_reminders_shard
+from notifications.models import TelegramDeliveryMode, TelegramProfile
+from notifications.models import TelegramSendStatus
+from notifications.telegram import TelegramSendResult
+
+pytestmark = pytest.mark.django_db
+
+DIGEST_AT = datetime.datetime(2025, 1, 1, 8, 0, tzinfo=datetime.timezone.utc)
+
+
+def make_habit(user, action: str, due: datetime.datetime) -> Habit:
+    habit = Habit.objects.create(
+        user=user,
+        action=action,
+        time=due.time(),
+        periodicity=1,
+        duration=datetime.timedelta(seconds=60),
+    )
+    Habit.objects.filter(pk=habit.pk).update(next_due_at=due)
+    return habit
+
+
+@pytest.fixture
+def digest_profile(user):
+    profile = TelegramProfile.objects.create(
+        user=user,
+        chat_id="555",
+        is_active=True,
+        delivery_mode=TelegramDeliveryMode.DIGEST,
+    )
+    TelegramProfile.objects.filter(pk=profile.pk).update(next_digest_at=DIGEST_AT)
+    return profile
+
+
+def run_digests(now: datetime.datetime):
+    with (
+        patch("habits.tasks.timezone.now", return_value=now),
+        patch(
+            "notifications.telegram.deliver_telegram_message",
+            return_value=TelegramSendResult(TelegramSendStatus.OK),
+        ) as send_mock,
+    ):
+        sent = send_habit_digests()
+    return sent, send_mock
+
+
+def test_digest_contains_only_todays_habits(user, digest_profile):
+    today = make_habit(user, "Гулять", DIGEST_AT.replace(hour=20))
+    later = make_habit(user, "Читать", DIGEST_AT + datetime.timedelta(days=3))
+
+    sent, send_mock = run_digests(DIGEST_AT + datetime.timedelta(seconds=30))
+
+    assert sent == 1
+    chat_id, text = send_mock.call_args.args
+    assert chat_id == "555"
+    assert Habit.objects.get(pk=today.pk).rendered_title in text
+    assert Habit.objects.get(pk=later.pk).rendered_title not in text
+    assert ReminderDelivery.objects.filter(
+        habit=today, status=TelegramSendStatus.OK
+    ).exists()
+
+
+def test_digest_is_sent_once_and_schedule_advances(user, digest_profile):
+    habit = make_habit(user, "Гулять", DIGEST_AT.replace(hour=20))
+    now = DIGEST_AT + datetime.timedelta(seconds=30)
+
+    run_digests(now)
+    sent, send_mock = run_digests(now + datetime.timedelta(minutes=1))
+
+    assert sent == 0
+    send_mock.assert_not_called()
+    digest_profile.refresh_from_db()
+    habit.refresh_from_db()
+    assert digest_profile.next_digest_at == DIGEST_AT + datetime.timedelta(days=1)
+    assert habit.next_due_at == DIGEST_AT.replace(hour=20) + datetime.timedelta(days=1)
+
+
+def test_digest_user_gets_no_per_habit_reminders(user, digest_profile):
+    habit = make_habit(user, "Гулять", DIGEST_AT)
+
+    with patch("notifications.telegram.deliver_telegram_message") as send_mock:
+        assert send_habit_reminders_shard([habit.id], DIGEST_AT.isoformat()) == 1
+
+    send_mock.assert_not_called()
+    assert not Habit.objects.get(pk=habit.pk).reminders_enabled
+
+
+def test_delivery_mode_switch_via_api(auth_client, user):
+    TelegramProfile.objects.create(user=user, chat_id="1", is_active=True)
+    habit = make_habit(user, "Гулять", DIGEST_AT)
+
+    resp = auth_client.patch(
+        "/api/telegram/profile/",
+        {"delivery_mode": "digest", "digest_time": "07:30"},
+        format="json",
+    )
+
+    assert resp.status_code == 200
+    profile = TelegramProfile.objects.get(user=user)
+    assert profile.next_digest_at.time() == datetime.time(7, 30)
+    assert not Habit.objects.get(pk=habit.pk).reminders_enabled
+
+
+@pytest.mark.parametrize("reactivate", ["save", "link"])
+@pytest.mark.parametrize(
+    "hour, expected_day",
+    [(4, 1), (12, 2)],  # 08:00 по Москве (05:00 UTC) ещё впереди / уже прошло
+)
+def test_reactivation_recomputes_stale_digest_time(
+    user, digest_profile, reactivate, hour, expected_day
+):
+    TelegramProfile.objects.filter(pk=digest_profile.pk).update(
+        is_active=False, time_zone="Europe/Moscow"
+    )
+    now = datetime.datetime(2025, 6, 1, hour, 0, tzinfo=datetime.timezone.utc)
+
+    with patch("django.utils.timezone.now", return_value=now):
+        if reactivate == "save":
+            profile = TelegramProfile.objects.get(pk=digest_profile.pk)
+            profile.is_active = True
+            profile.save(update_fields=["is_active"])
+        else:
+            TelegramProfile.link(user.id, "555")
+
+    profile = TelegramProfile.objects.get(pk=digest_profile.pk)
+    assert profile.is_active is True
+    assert profile.next_digest_at == datetime.datetime(
+        2025, 6, expected_day, 5, 0, tzinfo=datetime.timezone.utc
+    )
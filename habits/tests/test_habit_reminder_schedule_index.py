@@ -0,0 +1,173 @@
+"""
+Тесты индекса расписания напоминаний.
+Проверяется, что денормализованные поля Habit поддерживаются в актуальном виде:
+- next_due_at пересчитывается при смене time и periodicity;
+- reminders_enabled следует за активностью TelegramProfile владельца
+  (создание, отключение, удаление профиля);
+- задача напоминаний выбирает привычки только через этот индекс.
+"""
+
+import datetime
+from unittest.mock import patch
+
+import pytest
+from django.utils import timezone
+
+from habits.models import Habit
+from notifications.models import TelegramProfile, TelegramSendStatus
+from notifications.telegram import TelegramSendResult
+
+pytestmark = pytest.mark.django_db
+
+
+def make_habit(user, time=datetime.time(8, 30)) -> Habit:
+    """
+    Создаёт минимальную валидную привычку пользователя.
+    """
+    return Habit.objects.create(
+        user=user,
+        action="Читать",
+        time=time,
+        periodicity=1,
+        duration=datetime.timedelta(seconds=60),
+    )
+
+
+def test_next_due_at_follows_time(user):
+    """
+    next_due_at — ближайшее вхождение time (сегодня или завтра) и
+    пересчитывается при смене time, в том числе при save(update_fields=["time"]).
+    """
+    habit = make_habit(user, time=datetime.time(8, 30))
+    due = timezone.localtime(habit.next_due_at)
+    assert due.time() == datetime.time(8, 30)
+    assert timezone.now() - datetime.timedelta(minutes=1) < due
+    assert due <= timezone.now() + datetime.timedelta(days=1)
+
+    habit.time = datetime.time(23, 59)
+    habit.save(update_fields=["time"])
+    habit.refresh_from_db()
+
+    assert timezone.localtime(habit.next_due_at).time() == datetime.time(23, 59)
+
+
+def test_next_due_at_kept_when_schedule_unchanged(user):
+    """
+    Правка без смены time/periodicity не сбрасывает уже сдвинутое вхождение.
+    """
+    habit = make_habit(user)
+    later = habit.next_due_at + datetime.timedelta(days=3)
+    Habit.objects.filter(pk=habit.pk).update(next_due_at=later)
+
+    habit = Habit.objects.get(pk=habit.pk)
+    habit.action = "Писать"
+    habit.save()
+    habit.refresh_from_db()
+
+    assert habit.next_due_at == later
+
+
+def test_reminders_enabled_follows_telegram_profile(user):
+    """
+    Флаг reminders_enabled включается при появлении активного профиля,
+    выключается при is_active=False и при удалении профиля.
+    """
+    habit = make_habit(user)
+    assert habit.reminders_enabled is False
+
+    profile = TelegramProfile.objects.create(user=user, chat_id="1", is_active=True)
+    habit.refresh_from_db()
+    assert habit.reminders_enabled is True
+
+    profile.is_active = False
+    profile.save()
+    habit.refresh_from_db()
+    assert habit.reminders_enabled is False
+
+    profile.is_active = True
+    profile.save()
+    profile.delete()
+    habit.refresh_from_db()
+    assert habit.reminders_enabled is False
+
+
+def test_task_selects_only_due_habits(user, user2):
+    """
+    Задача выбирает наступившие привычки только у пользователей
+    с активным Telegram-профилем.
+    """
+    TelegramProfile.objects.create(user=user, chat_id="111", is_active=True)
+    due = make_habit(user, time=datetime.time(9, 15))
+    make_habit(user, time=datetime.time(9, 16))
+    make_habit(user2, time=datetime.time(9, 15))
+
+    fake_now = timezone.localtime(due.next_due_at) + datetime.timedelta(seconds=42)
+
+    from habits.tasks import send_habit_reminders
+
+    with (
+        patch("habits.tasks.timezone.localtime", return_value=fake_now),
+        patch(
+            "notifications.telegram.deliver_telegram_message",
+            return_value=TelegramSendResult(TelegramSendStatus.OK),
+        ) as send_mock,
+    ):
+        shard_sizes = send_habit_reminders()
+
+    assert sum(shard_sizes) == 1
+    chat_id, text = send_mock.call_args.args
+    assert chat_id == "111"
+    assert due.title in text
+
+
+def test_weekly_habit_is_reminded_once_a_week(user):
+    """
+    После доставки next_due_at сдвигается на periodicity дней:
+    еженедельная привычка не напоминается на следующий день.
+    """
+    TelegramProfile.objects.create(user=user, chat_id="111", is_active=True)
+    habit = make_habit(user, time=datetime.time(9, 15))
+    Habit.objects.filter(pk=habit.pk).update(periodicity=7)
+    first_due = habit.next_due_at
+
+    from habits.tasks import send_habit_reminders
+
+    with patch(
+        "notifications.telegram.deliver_telegram_message",
+        return_value=TelegramSendResult(TelegramSendStatus.OK),
+    ) as send_mock:
+        for days in range(8):
+            fake_now = timezone.localtime(first_due) + datetime.timedelta(days=days)
+            with patch("habits.tasks.timezone.localtime", return_value=fake_now):
+                send_habit_reminders()
+
+    assert send_mock.call_count == 2
+    habit.refresh_from_db()
+    assert habit.next_due_at == first_due + datetime.timedelta(days=14)
+
+
+def test_missed_occurrences_are_not_replayed(user):
+    """
+    Если рассылка долго не запускалась, отправляется одно напоминание,
+    а next_due_at переносится на первое вхождение после текущего момента.
+    """
+    TelegramProfile.objects.create(user=user, chat_id="111", is_active=True)
+    habit = make_habit(user, time=datetime.time(9, 15))
+    first_due = habit.next_due_at
+    fake_now = timezone.localtime(first_due) + datetime.timedelta(days=3, hours=1)
+
+    from habits.tasks import send_habit_reminders
+
+    with (
+        patch("habits.tasks.timezone.localtime", return_value=fake_now),
+        patch(
+            "notifications.telegram.deliver_telegram_message",
+            return_value=TelegramSendResult(TelegramSendStatus.OK),
+        ) as send_mock,
+    ):
+        send_habit_reminders()
+        send_habit_reminders()
+
+    send_mock.assert_called_once()
+    habit.refresh_from_db()
+    assert habit.next_due_at == first_due + datetime.timedelta(days=4)
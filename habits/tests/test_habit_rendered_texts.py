@@ -0,0 +1,85 @@
+"""
+Тесты сохранённых текстов привычки (rendered_title, reminder_text).
+Проверяется:
+- тексты создаются при создании и перегенерируются при смене action/time/
+  periodicity/place, но не при правке остальных полей;
+- переименование и удаление места обновляют тексты его привычек;
+- API отдаёт title без join к таблице мест.
+"""
+
+import datetime
+
+import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+from habits.models import Habit, Place
+
+pytestmark = pytest.mark.django_db
+
+
+def make_habit(user, place=None) -> Habit:
+    return Habit.objects.create(
+        user=user,
+        place=place,
+        action="Пить воду",
+        time=datetime.time(12, 0),
+        periodicity=1,
+        duration=datetime.timedelta(seconds=60),
+    )
+
+
+def test_texts_are_rendered_on_create_and_on_relevant_change(user):
+    habit = make_habit(user, place=Place.objects.create(name="офисе"))
+
+    assert habit.rendered_title == "Я буду пить воду ежедневно в 12:00 в офисе"
+    assert habit.title == habit.rendered_title
+    assert habit.rendered_title in habit.reminder_text
+
+    habit.periodicity = 7
+    habit.save(update_fields=["periodicity"])
+    habit.refresh_from_db()
+
+    assert habit.rendered_title == "Я буду пить воду еженедельно в 12:00 в офисе"
+
+
+def test_texts_are_not_rerendered_on_unrelated_change(user):
+    habit = make_habit(user)
+    Habit.objects.filter(pk=habit.pk).update(rendered_title="сохранённое")
+
+    habit = Habit.objects.get(pk=habit.pk)
+    habit.is_public = True
+    habit.save()
+    habit.refresh_from_db()
+
+    assert habit.rendered_title == "сохранённое"
+
+
+def test_place_rename_and_delete_update_habit_texts(user, user2):
+    place = Place.objects.create(name="парке")
+    first, second = make_habit(user, place), make_habit(user2, place)
+
+    place.name = "саду"
+    place.save()
+
+    for habit in (first, second):
+        habit.refresh_from_db()
+        assert habit.rendered_title.endswith("в саду")
+        assert habit.reminder_text.count("в саду") == 1
+
+    place.delete()
+
+    first.refresh_from_db()
+    assert first.place_id is None
+    assert first.rendered_title.endswith("где бы то ни было")
+
+
+def test_api_reads_title_without_place_join(auth_client, user):
+    make_habit(user, place=Place.objects.create(name="офисе"))
+
+    with CaptureQueriesContext(connection) as ctx:
+        resp = auth_client.get("/api/habits/")
+
+    assert resp.status_code == 200
+    assert resp.data["results"][0]["title"].endswith("в офисе")
+    assert not any("habits_place" in query["sql"] for query in ctx.captured_queries)
@@ -0,0 +1,84 @@
+"""
+Тесты объединения напоминаний одного пользователя в одно сообщение.
+Проверяется:
+- наступившие привычки одного чата уходят одним вызовом Telegram API,
+  а итог сообщения записывается в журнал всем его привычкам;
+- сообщение делится на части только при превышении лимита длины;
+- названия привычек экранируются для parse_mode=HTML.
+"""
+
+import datetime
+from unittest.mock import patch
+
+import pytest
+from django.utils import timezone
+
+from habits.models import Habit, ReminderDelivery
+from habits.tasks import ReminderRow, send_habit_reminders, split_by_message_limit
+from notifications.models import TelegramProfile, TelegramSendStatus
+from notifications.telegram import TelegramSendResult
+
+pytestmark = pytest.mark.django_db
+
+
+def make_habit(user, action: str) -> Habit:
+    return Habit.objects.create(
+        user=user,
+        action=action,
+        time=timezone.localtime().time().replace(second=0, microsecond=0),
+        periodicity=1,
+        duration=datetime.timedelta(seconds=60),
+    )
+
+
+def test_due_habits_of_one_chat_are_sent_as_one_message(user, user2):
+    TelegramProfile.objects.create(user=user, chat_id="111", is_active=True)
+    TelegramProfile.objects.create(user=user2, chat_id="222", is_active=True)
+    read, walk = make_habit(user, "Читать"), make_habit(user, "Гулять")
+    single = make_habit(user2, "Бегать")
+
+    with patch(
+        "notifications.telegram.deliver_telegram_message",
+        return_value=TelegramSendResult(TelegramSendStatus.OK, message_id=7),
+    ) as send_mock:
+        send_habit_reminders()
+
+    texts = {call.args[0]: call.args[1] for call in send_mock.call_args_list}
+    assert send_mock.call_count == 2
+    assert read.title in texts["111"] and walk.title in texts["111"]
+    assert texts["222"] == single.reminder_text
+
+    deliveries = ReminderDelivery.objects.filter(habit__user=user)
+    assert [d.message_id for d in deliveries] == [7, 7]
+    assert {d.status for d in deliveries} == {TelegramSendStatus.OK}
+
+
+def test_split_only_above_limit():
+    rows = [ReminderRow(i, "1", f"Привычка {i}", f"Текст {i}") for i in range(1, 6)]
+
+    (single,) = split_by_message_limit(rows[:1])
+    assert single == ("Текст 1", rows[:1])
+
+    (whole,) = split_by_message_limit(rows)
+    assert all(row.title in whole[0] for row in rows)
+
+    parts = list(split_by_message_limit(rows, limit=len(whole[0]) - 1))
+    assert len(parts) == 2
+    assert [row for _, batch in parts for row in batch] == rows
+    assert all(len(text) <= len(whole[0]) - 1 for text, _ in parts)
+
+
+def test_titles_are_html_escaped(user):
+    habit = make_habit(user, "Читать <b>5 & 10</b> страниц")
+    rows = [
+        ReminderRow(habit.id, "1", habit.title, habit.reminder_text),
+        ReminderRow(0, "1", "Гулять", "Гулять"),
+    ]
+
+    assert "<b>Напоминание о привычке</b>" in habit.reminder_text
+    assert "&lt;b&gt;5 &amp; 10&lt;/b&gt;" in habit.reminder_text
+    assert "<b>5" not in habit.reminder_text
+
+    ((text, _),) = split_by_message_limit(rows)
+    assert "• Я буду читать &lt;b&gt;5 &amp; 10&lt;/b&gt; страниц" in text
+    assert "<b>5" not in text
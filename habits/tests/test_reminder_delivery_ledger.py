@@ -0,0 +1,114 @@
+"""
+Тесты журнала доставки напоминаний (ReminderDelivery).
+Проверяется:
+- claim() захватывает вхождение только один раз (ON CONFLICT DO NOTHING);
+- повторный запуск рассылки за ту же минуту не отправляет дубликаты;
+- в журнал записываются статус, задержка и message_id Telegram;
+- старые записи удаляются по сроку хранения.
+"""
+
+import datetime
+from unittest.mock import patch
+
+import pytest
+from django.utils import timezone
+
+from habits.models import Habit, ReminderDelivery
+from notifications.models import TelegramProfile, TelegramSendStatus
+from notifications.telegram import TelegramSendResult
+
+pytestmark = pytest.mark.django_db
+
+
+@pytest.fixture
+def occurrence():
+    """
+    Текущая минута — вхождение привычки, созданной в тесте.
+    """
+    return timezone.localtime().replace(second=0, microsecond=0)
+
+
+def make_habit(user, occurrence) -> Habit:
+    return Habit.objects.create(
+        user=user,
+        action="Медитировать",
+        time=occurrence.time(),
+        periodicity=1,
+        duration=datetime.timedelta(seconds=60),
+    )
+
+
+def test_claim_is_exclusive(user, occurrence):
+    """
+    Второй claim того же вхождения ничего не захватывает (next_due_at уже
+    сдвинут на следующий день); несуществующие привычки пропускаются.
+    """
+    habit = make_habit(user, occurrence)
+
+    first = ReminderDelivery.claim([habit.id, 999999], occurrence)
+    second = ReminderDelivery.claim([habit.id], occurrence)
+
+    assert list(first) == [habit.id]
+    assert second == {}
+    assert ReminderDelivery.claim([habit.id], occurrence + datetime.timedelta(days=1))
+
+
+def test_duplicate_dispatch_sends_once_and_records_outcome(user, occurrence):
+    """
+    Два запуска рассылки за одну минуту → одна отправка;
+    в журнале статус ok, message_id и задержка доставки.
+    """
+    TelegramProfile.objects.create(user=user, chat_id="555", is_active=True)
+    habit = make_habit(user, occurrence)
+
+    from habits.tasks import send_habit_reminders
+
+    with (
+        patch("habits.tasks.timezone.localtime", return_value=occurrence),
+        patch(
+            "notifications.telegram.deliver_telegram_message",
+            return_value=TelegramSendResult(TelegramSendStatus.OK, message_id=42),
+        ) as send_mock,
+    ):
+        send_habit_reminders()
+        send_habit_reminders()
+
+    send_mock.assert_called_once()
+
+    delivery = ReminderDelivery.objects.get(habit=habit)
+    assert delivery.scheduled_for == occurrence
+    assert delivery.status == TelegramSendStatus.OK
+    assert delivery.message_id == 42
+    assert delivery.sent_at is not None
+    assert delivery.latency_ms is not None
+
+
+def test_inactive_profile_marks_delivery_skipped(user, occurrence):
+    profile = TelegramProfile.objects.create(user=user, chat_id="1", is_active=True)
+    habit = make_habit(user, occurrence)
+    profile.is_active = False
+    profile.save()
+
+    from habits.tasks import send_habit_reminders_shard
+
+    with patch("notifications.telegram.deliver_telegram_message") as send_mock:
+        send_habit_reminders_shard([habit.id], occurrence.isoformat())
+
+    send_mock.assert_not_called()
+    delivery = ReminderDelivery.objects.get(habit=habit)
+    assert delivery.status == ReminderDelivery.STATUS_SKIPPED
+
+
+def test_prune_removes_expired_deliveries(settings, user, occurrence):
+    settings.REMINDER_DELIVERY_RETENTION_DAYS = 30
+    habit = make_habit(user, occurrence)
+    now = timezone.now()
+    ReminderDelivery.objects.bulk_create(
+        ReminderDelivery(habit=habit, scheduled_for=now - datetime.timedelta(days=days))
+        for days in (31, 1)
+    )
+
+    from habits.tasks import prune_reminder_deliveries
+
+    assert prune_reminder_deliveries() == 1
+    assert ReminderDelivery.objects.count() == 1
@@ -0,0 +1,150 @@
+"""
+Тесты аренды рассылки и выбора лидера beat (habits.lease, habits.beat).
+Проверяется:
+- аренда выдаётся одному владельцу, fencing-токен растёт с каждым захватом,
+  истёкшую аренду забирает другой владелец;
+- водяной знак отклоняет устаревший fencing-токен;
+- тик, заставший предыдущий, не запускает второй проход, а сливается
+  с ним: владелец аренды делает ещё один проход;
+- аренда продлевается перед каждым проходом, потерянная аренда или
+  устаревший fencing-токен останавливают тик с предупреждением в логе;
+- резервный beat отправляет расписание только после ухода лидера.
+"""
+
+import datetime
+from unittest.mock import patch
+
+import pytest
+from django.db import transaction
+
+from config import celery_app
+from habits.beat import STANDBY_INTERVAL, LeaderElectedScheduler
+from habits.lease import InMemoryLeaseBackend, Lease
+from habits.models import ReminderDispatchState, StaleFencingTokenError
+
+T0 = datetime.datetime(2025, 1, 1, 9, 0, tzinfo=datetime.timezone.utc)
+
+
+class FakeClock:
+    def __init__(self) -> None:
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+def test_lease_is_exclusive_and_tokens_grow():
+    clock = FakeClock()
+    backend = InMemoryLeaseBackend(clock=clock)
+    first, second = Lease(backend, "x", ttl=10), Lease(backend, "x", ttl=10)
+
+    assert first.acquire() == 1
+    assert second.acquire() is None
+
+    clock.now = 11
+    assert second.acquire() == 2
+    assert first.renew() is False
+    assert first.held is False
+
+
+def test_release_keeps_lease_when_merge_requested():
+    backend = InMemoryLeaseBackend()
+    owner, late_tick = Lease(backend, "x", ttl=10), Lease(backend, "x", ttl=10)
+    owner.acquire()
+
+    late_tick.request_merge()
+
+    assert owner.release() is False
+    assert owner.held
+    assert owner.release() is True
+    assert late_tick.acquire() is not None
+
+
+@pytest.mark.django_db
+def test_stale_fencing_token_is_rejected():
+    with transaction.atomic():
+        ReminderDispatchState.advance("test", T0, fencing_token=2)
+
+    with pytest.raises(StaleFencingTokenError), transaction.atomic():
+        ReminderDispatchState.advance(
+            "test", T0 + datetime.timedelta(minutes=1), fencing_token=1
+        )
+
+    assert ReminderDispatchState.objects.get(key="test").processed_until == T0
+
+
+@pytest.mark.django_db
+def test_overlapping_tick_merges_into_running_one():
+    from habits import tasks
+
+    calls = []
+
+    def dispatch(fencing_token):
+        calls.append(fencing_token)
+        if len(calls) == 1:
+            # Следующий тик beat стартует, пока первый проход ещё идёт
+            assert tasks.send_habit_reminders() == []
+        return [len(calls)]
+
+    with patch.object(tasks, "dispatch_reminder_window", side_effect=dispatch):
+        assert tasks.send_habit_reminders() == [1, 2]
+
+    assert calls == [1, 1]
+
+
+@pytest.mark.django_db
+def test_lost_lease_stops_before_next_pass(caplog):
+    from habits import tasks
+
+    calls = []
+
+    def dispatch(fencing_token):
+        calls.append(fencing_token)
+        # Следующий тик оставил отметку слияния, а проход затянулся
+        # дольше TTL — продлить аренду перед вторым проходом не удастся
+        tasks.get_lease_backend().request_merge(tasks.REMINDERS_DISPATCH_KEY, 10_000)
+        return [1]
+
+    with (
+        patch.object(tasks, "dispatch_reminder_window", side_effect=dispatch),
+        patch.object(
+            InMemoryLeaseBackend, "renew", side_effect=[True, False]
+        ) as renew_mock,
+    ):
+        assert tasks.send_habit_reminders() == [1]
+
+    assert calls == [1]
+    assert renew_mock.call_count == 2
+    assert "аренда habit_reminders потеряна" in caplog.text
+
+
+@pytest.mark.django_db
+def test_stale_fencing_token_is_logged(caplog):
+    from habits import tasks
+
+    with patch.object(
+        tasks,
+        "dispatch_reminder_window",
+        side_effect=StaleFencingTokenError("habit_reminders: токен 1 < 2"),
+    ):
+        assert tasks.send_habit_reminders() == []
+
+    assert "токен 1 < 2" in caplog.text
+
+
+def test_standby_beat_takes_over_after_leader_leaves(tmp_path):
+    leader, standby = (
+        LeaderElectedScheduler(
+            app=celery_app, schedule_filename=str(tmp_path / name), lazy=True
+        )
+        for name in ("leader", "standby")
+    )
+
+    assert leader.is_leader()
+    assert standby.tick() == STANDBY_INTERVAL
+    assert leader.is_leader()
+
+    leader.leader_lease.release(merge=False)
+
+    assert standby.is_leader()
+    assert not leader.is_leader()
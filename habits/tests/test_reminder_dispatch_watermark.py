@@ -0,0 +1,88 @@
+"""
+Тесты «водяного знака» рассылки напоминаний (ReminderDispatchState).
+Проверяется:
+- окна (processed_until, now] идут друг за другом и не откатываются назад;
+- напоминание, чей тик beat опоздал или был пропущен, отправляется
+  следующим запуском, а догоняющий проход пишется в лог;
+- вхождения, наступившие до начала окна, считаются отдельно.
+"""
+
+import datetime
+from unittest.mock import patch
+
+import pytest
+from django.db import transaction
+from django.utils import timezone
+
+from habits.models import Habit, ReminderDispatchState
+from notifications.models import TelegramProfile, TelegramSendStatus
+from notifications.telegram import TelegramSendResult
+
+pytestmark = pytest.mark.django_db
+
+T0 = datetime.datetime(2025, 1, 1, 9, 0, tzinfo=datetime.timezone.utc)
+
+
+def advance(now: datetime.datetime):
+    with transaction.atomic():
+        return ReminderDispatchState.advance("test", now)
+
+
+def test_windows_are_contiguous_and_monotonic():
+    t1 = T0 + datetime.timedelta(minutes=1)
+    t5 = T0 + datetime.timedelta(minutes=5)
+
+    assert advance(T0) == (None, T0)
+    assert advance(t1) == (T0, t1)
+    assert advance(t5) == (t1, t5)
+    # Часы «уехали» назад: окно пустое, водяной знак не двигается
+    assert advance(t1) == (t5, t5)
+    assert ReminderDispatchState.objects.get(key="test").processed_until == t5
+
+
+def test_late_tick_still_sends_reminder(user, caplog):
+    """
+    Тики в минуту вхождения пропущены: следующий запуск через 5 минут
+    подбирает напоминание из своего окна.
+    """
+    TelegramProfile.objects.create(user=user, chat_id="111", is_active=True)
+    habit = Habit.objects.create(
+        user=user,
+        action="Гулять",
+        time=datetime.time(9, 15),
+        periodicity=1,
+        duration=datetime.timedelta(seconds=60),
+    )
+    due = timezone.localtime(habit.next_due_at)
+
+    from habits.tasks import send_habit_reminders
+
+    with patch(
+        "notifications.telegram.deliver_telegram_message",
+        return_value=TelegramSendResult(TelegramSendStatus.OK),
+    ) as send_mock:
+        for now in (
+            due - datetime.timedelta(minutes=1),
+            due + datetime.timedelta(minutes=5),
+            due + datetime.timedelta(minutes=6),
+        ):
+            with patch("habits.tasks.timezone.localtime", return_value=now):
+                send_habit_reminders()
+
+    send_mock.assert_called_once()
+    state = ReminderDispatchState.objects.get()
+    assert state.processed_until == due + datetime.timedelta(minutes=6)
+    assert "тики beat были пропущены" in caplog.text
+
+
+def test_overdue_occurrences_are_counted(settings, caplog):
+    from habits.tasks import log_catch_up
+
+    settings.HABIT_REMINDERS_DISPATCH_INTERVAL_MINUTES = 1
+    start = T0 + datetime.timedelta(minutes=1)
+    due_times = [T0, start, start + datetime.timedelta(seconds=30)]
+
+    assert log_catch_up(None, start, due_times) == 0
+    assert log_catch_up(start, start + datetime.timedelta(minutes=1), due_times) == 2
+    assert "2 вхождений наступили до начала окна" in caplog.text
+    assert "тики beat были пропущены" not in caplog.text
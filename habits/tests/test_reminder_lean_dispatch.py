@@ -0,0 +1,50 @@
+"""
+Тесты лёгкого пути рассылки напоминаний.
+Проверяется:
+- шард отправляет сохранённый Habit.reminder_text, не создавая экземпляров моделей;
+- ReminderRow — слотовый объект без __dict__.
+"""
+
+import datetime
+from unittest.mock import patch
+
+import pytest
+from django.utils import timezone
+
+from habits.models import Habit
+from habits.tasks import ReminderRow, send_habit_reminders_shard
+from notifications.models import TelegramProfile, TelegramSendStatus
+from notifications.telegram import TelegramSendResult
+
+pytestmark = pytest.mark.django_db
+
+
+def test_shard_does_not_instantiate_models(user):
+    TelegramProfile.objects.create(user=user, chat_id="777", is_active=True)
+    habit = Habit.objects.create(
+        user=user,
+        action="Гулять",
+        time=timezone.localtime().time().replace(second=0, microsecond=0),
+        periodicity=1,
+        duration=datetime.timedelta(seconds=60),
+    )
+    expected_text = habit.reminder_text
+
+    with (
+        patch.object(Habit, "from_db", side_effect=AssertionError("model built")),
+        patch(
+            "notifications.telegram.deliver_telegram_message",
+            return_value=TelegramSendResult(TelegramSendStatus.OK),
+        ) as send_mock,
+    ):
+        assert send_habit_reminders_shard([habit.id]) == 1
+
+    send_mock.assert_called_once()
+    assert send_mock.call_args.args == ("777", expected_text)
+
+
+def test_reminder_row_is_slotted():
+    row = ReminderRow(1, "1", "Название", "Текст")
+
+    with pytest.raises((AttributeError, TypeError)):
+        row.extra = 1  # type: ignore[attr-defined]
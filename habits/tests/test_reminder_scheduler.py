@@ -0,0 +1,143 @@
+"""
+Тесты планировщика напоминаний на колесе таймеров (habits.scheduler).
+Проверяется:
+- TimingWheel срабатывает в срок на всех уровнях и при переносе записи;
+- холодный старт загружает вхождения ближайших суток, наступившее вхождение
+  уходит в шард, а в колесо встаёт следующее;
+- изменения привычек применяются из ленты HabitScheduleChange;
+- тёплый старт восстанавливает колесо из снимка без сканирования таблицы.
+"""
+
+import datetime
+import time
+from unittest.mock import patch
+
+import pytest
+
+from habits.models import Habit, HabitScheduleChange
+from habits.scheduler import ReminderScheduler, TimingWheel
+from habits.tasks import send_habit_reminders_shard
+from notifications.models import TelegramProfile
+
+pytestmark = pytest.mark.django_db
+
+DAY = 86400
+
+
+def test_timing_wheel_fires_on_every_level():
+    start = 1_700_000_000
+    wheel = TimingWheel(start)
+    for key, delta in (("sec", 5), ("min", 125), ("hour", 7300), ("day", DAY + 10)):
+        wheel.add(key, start + delta)
+
+    assert wheel.advance(start + 4) == []
+    assert wheel.advance(start + 5) == [("sec", start + 5)]
+    assert wheel.advance(start + 124) == []
+    assert wheel.advance(start + 125) == [("min", start + 125)]
+    assert wheel.advance(start + 7300) == [("hour", start + 7300)]
+    assert wheel.advance(start + DAY + 9) == []
+    assert wheel.advance(start + DAY + 10) == [("day", start + DAY + 10)]
+
+
+def test_timing_wheel_moves_and_removes_entries():
+    start = 1_700_000_000
+    wheel = TimingWheel(start)
+    wheel.add("moved", start + 10)
+    wheel.add("moved", start + 200)
+    wheel.add("removed", start + 10)
+    wheel.remove("removed")
+
+    assert wheel.advance(start + 10) == []
+    assert wheel.advance(start + 200) == [("moved", start + 200)]
+    assert len(wheel) == 0
+
+
+@pytest.fixture
+def now() -> int:
+    return int(time.time())
+
+
+@pytest.fixture
+def scheduler_settings(settings, tmp_path):
+    settings.HABIT_REMINDER_SCHEDULER_ENABLED = True
+    settings.HABIT_REMINDER_SCHEDULER_SNAPSHOT = str(tmp_path / "snapshot.json")
+    return settings
+
+
+def make_habit(user, due: int) -> Habit:
+    TelegramProfile.objects.get_or_create(
+        user=user, defaults={"chat_id": str(user.id), "is_active": True}
+    )
+    habit = Habit.objects.create(
+        user=user,
+        action="Гулять",
+        time=datetime.time(9, 0),
+        periodicity=1,
+        duration=datetime.timedelta(seconds=60),
+    )
+    Habit.objects.filter(pk=habit.pk).update(
+        next_due_at=datetime.datetime.fromtimestamp(due, tz=datetime.timezone.utc)
+    )
+    return habit
+
+
+def test_cold_start_dispatches_due_occurrence(scheduler_settings, user, now):
+    soon = make_habit(user, now + 3600)
+    later = make_habit(user, now + 2 * DAY)
+    scheduler = ReminderScheduler(clock=lambda: now)
+
+    assert scheduler.start() is False
+    assert scheduler.due_at(later.id) is None
+
+    with patch.object(send_habit_reminders_shard, "apply_async") as enqueue_mock:
+        assert scheduler.tick(now + 3599) == []
+        assert scheduler.tick(now + 3600) == [[soon.id]]
+
+    enqueue_mock.assert_called_once()
+    habit_ids, as_of = enqueue_mock.call_args.args[0]
+    assert habit_ids == [soon.id]
+    assert datetime.datetime.fromisoformat(as_of).timestamp() == now + 3600
+    assert scheduler.due_at(soon.id) == now + 3600 + DAY
+
+
+def test_change_feed_reschedules_habit(
+    scheduler_settings, user, now, django_capture_on_commit_callbacks
+):
+    habit = make_habit(user, now + 3600)
+    scheduler = ReminderScheduler(clock=lambda: now)
+    scheduler.start()
+
+    with django_capture_on_commit_callbacks(execute=True):
+        habit.refresh_from_db()
+        habit.time = datetime.time(21, 30)
+        habit.save()
+
+    assert HabitScheduleChange.objects.filter(user_id=user.id).exists()
+    scheduler.poll(now + 1)
+
+    habit.refresh_from_db()
+    assert scheduler.due_at(habit.id) == int(habit.next_due_at.timestamp())
+
+
+def test_warm_start_restores_snapshot_without_rescan(
+    scheduler_settings, user, user2, now, django_capture_on_commit_callbacks
+):
+    untouched = make_habit(user2, now + 600)
+    changed = make_habit(user, now + 3600)
+    first = ReminderScheduler(clock=lambda: now)
+    first.start()
+    first.save_snapshot(now)
+
+    # Без ленты изменений — тёплый старт эту правку не увидит
+    Habit.objects.filter(pk=untouched.pk).update(next_due_at=None)
+    with django_capture_on_commit_callbacks(execute=True):
+        changed.refresh_from_db()
+        changed.time = datetime.time(21, 30)
+        changed.save()
+
+    second = ReminderScheduler(clock=lambda: now + 5)
+
+    assert second.start() is True
+    assert second.due_at(untouched.id) == now + 600
+    changed.refresh_from_db()
+    assert second.due_at(changed.id) == int(changed.next_due_at.timestamp())
@@ -0,0 +1,163 @@
+"""
+Тесты разделения рассылки напоминаний на планировщик и шарды.
+Проверяется:
+- partition_by_user соблюдает лимит шарда и не разрывает пользователя;
+- планировщик ставит в очередь по задаче на шард и возвращает размеры шардов;
+- отправка шардов растягивается на HABIT_REMINDERS_MAX_SKEW_SECONDS
+  через not_before строк очереди;
+- шардовая задача возвращает число захваченных привычек: сумма результатов
+  шардов совпадает с суммой размеров, которую вернул планировщик.
+"""
+
+import datetime
+from unittest.mock import patch
+
+import pytest
+from django.utils import timezone
+
+from habits.models import Habit
+from habits.tasks import partition_by_user, spread_countdowns
+from notifications.models import NotificationOutbox, TelegramProfile
+
+pytestmark = pytest.mark.django_db
+
+
+def test_partition_by_user_respects_limit_and_users():
+    """
+    Шард закрывается, только когда он заполнен И начинается новый пользователь.
+    """
+    rows = [(1, 10), (2, 10), (3, 20), (4, 30), (5, 30), (6, 30), (7, 40)]
+
+    shards = partition_by_user(rows, shard_size=2)
+
+    assert shards == [[1, 2], [3, 4, 5, 6], [7]]
+
+
+def test_partition_by_user_empty():
+    """
+    Пустой набор привычек → ни одного шарда.
+    """
+    assert partition_by_user([], shard_size=10) == []
+
+
+def test_spread_countdowns_stay_within_max_skew():
+    """
+    Первый шард стартует сразу, остальные — равномерно в пределах max_skew.
+    """
+    assert spread_countdowns(4, 40) == [0, 10, 20, 30]
+    assert spread_countdowns(3, 0) == [0, 0, 0]
+    assert spread_countdowns(0, 40) == []
+
+
+def test_planner_enqueues_one_task_per_shard(settings, user, user2):
+    """
+    Планировщик только ставит шарды в очередь и возвращает их размеры.
+    """
+    settings.HABIT_REMINDERS_SHARD_SIZE = 1
+    settings.HABIT_REMINDERS_MAX_SKEW_SECONDS = 30
+
+    TelegramProfile.objects.create(user=user, chat_id="1", is_active=True)
+    TelegramProfile.objects.create(user=user2, chat_id="2", is_active=True)
+    for owner in (user, user, user2):
+        Habit.objects.create(
+            user=owner,
+            action="Бегать",
+            time=datetime.time(7, 0),
+            periodicity=1,
+            duration=datetime.timedelta(seconds=60),
+        )
+
+    fake_now = timezone.localtime(Habit.objects.first().next_due_at)
+
+    from habits.tasks import send_habit_reminders, send_habit_reminders_shard
+
+    with (
+        patch("habits.tasks.timezone.localtime", return_value=fake_now),
+        patch.object(send_habit_reminders_shard, "delay") as enqueue_mock,
+    ):
+        shard_sizes = send_habit_reminders()
+
+    assert shard_sizes == [2, 1]
+    assert enqueue_mock.call_count == 2
+    first_shard = enqueue_mock.call_args_list[0].args[0]
+    send_at = [
+        datetime.datetime.fromisoformat(c.args[2]) for c in enqueue_mock.call_args_list
+    ]
+    assert send_at[1] - send_at[0] == datetime.timedelta(seconds=15)
+    assert set(
+        Habit.objects.filter(id__in=first_shard).values_list("user_id", flat=True)
+    ) == {user.id}
+
+
+def test_shard_skips_habits_of_deactivated_profile(user):
+    """
+    Если профиль выключили после планирования, шард его пропускает.
+    """
+    profile = TelegramProfile.objects.create(user=user, chat_id="1", is_active=True)
+    habit = Habit.objects.create(
+        user=user,
+        action="Бегать",
+        time=timezone.localtime().time().replace(second=0, microsecond=0),
+        periodicity=1,
+        duration=datetime.timedelta(seconds=60),
+    )
+    profile.is_active = False
+    profile.save()
+
+    from habits.tasks import send_habit_reminders_shard
+
+    with patch("notifications.telegram.deliver_telegram_message") as send_mock:
+        claimed = send_habit_reminders_shard([habit.id])
+
+    assert claimed == 1
+    send_mock.assert_not_called()
+
+
+def test_shard_counts_claimed_habits_not_messages(user):
+    """
+    Две привычки одного чата → одно сообщение, но шард возвращает 2:
+    результат сверяется с размером шарда, который вернул планировщик.
+    """
+    TelegramProfile.objects.create(user=user, chat_id="1", is_active=True)
+    habits = [
+        Habit.objects.create(
+            user=user,
+            action=action,
+            time=timezone.localtime().time().replace(second=0, microsecond=0),
+            periodicity=1,
+            duration=datetime.timedelta(seconds=60),
+        )
+        for action in ("Бегать", "Читать")
+    ]
+
+    from habits.tasks import send_habit_reminders_shard
+
+    with patch("habits.tasks.kick_outbox_drainers"):
+        claimed = send_habit_reminders_shard([habit.id for habit in habits])
+
+    assert claimed == 2
+    assert NotificationOutbox.objects.count() == 1
+
+
+def test_shard_defers_outbox_rows_until_send_at(user):
+    """
+    Растяжка шарда попадает в not_before строк очереди и в countdown
+    отправителей: пик рассылки не уходит в Telegram разом.
+    """
+    TelegramProfile.objects.create(user=user, chat_id="1", is_active=True)
+    habit = Habit.objects.create(
+        user=user,
+        action="Бегать",
+        time=timezone.localtime().time().replace(second=0, microsecond=0),
+        periodicity=1,
+        duration=datetime.timedelta(seconds=60),
+    )
+    send_at = timezone.now() + datetime.timedelta(seconds=30)
+
+    from habits.tasks import send_habit_reminders_shard
+
+    with patch("notifications.tasks.drain_notification_outbox.apply_async") as kick:
+        send_habit_reminders_shard([habit.id], None, send_at.isoformat())
+
+    assert NotificationOutbox.objects.get().not_before == send_at
+    assert 25 < kick.call_args.kwargs["countdown"] <= 30
@@ -0,0 +1,109 @@
+"""
+Тесты предзагрузки напоминаний (habits.staging).
+Проверяется:
+- шард отправляет заранее подготовленный текст, не читая привычку из БД;
+- изменение привычки или профиля после подготовки делает корзину устаревшей;
+- подготовленная строка другого вхождения не используется.
+"""
+
+import datetime
+from unittest.mock import patch
+
+import pytest
+
+from habits.models import Habit
+from habits.tasks import send_habit_reminders_shard, stage_habit_reminders
+from notifications.models import TelegramProfile, TelegramSendStatus
+from notifications.telegram import TelegramSendResult
+
+pytestmark = pytest.mark.django_db
+
+NOW = datetime.datetime(2025, 1, 1, 9, 0, 30, tzinfo=datetime.timezone.utc)
+DUE = datetime.datetime(2025, 1, 1, 9, 1, tzinfo=datetime.timezone.utc)
+
+
+@pytest.fixture
+def frozen_now():
+    with (
+        patch("habits.tasks.timezone.now", return_value=NOW),
+        patch("habits.staging.timezone.now", return_value=NOW),
+    ):
+        yield
+
+
+@pytest.fixture
+def habit(user, frozen_now):
+    TelegramProfile.objects.create(user=user, chat_id="321", is_active=True)
+    habit = Habit.objects.create(
+        user=user,
+        action="Гулять",
+        time=datetime.time(9, 1),
+        periodicity=1,
+        duration=datetime.timedelta(seconds=60),
+    )
+    Habit.objects.filter(pk=habit.pk).update(next_due_at=DUE)
+    return habit
+
+
+def run_shard(habit_id: int):
+    with patch(
+        "notifications.telegram.deliver_telegram_message",
+        return_value=TelegramSendResult(TelegramSendStatus.OK),
+    ) as send_mock:
+        claimed = send_habit_reminders_shard([habit_id], DUE.isoformat())
+    return claimed, send_mock
+
+
+def test_shard_sends_staged_payload(habit):
+    assert stage_habit_reminders() == 1
+    # Обход сигналов: из БД шард прочитал бы уже новый текст
+    Habit.objects.filter(pk=habit.pk).update(reminder_text="из БД")
+
+    claimed, send_mock = run_shard(habit.id)
+
+    assert claimed == 1
+    assert send_mock.call_args.args == ("321", habit.reminder_text)
+
+
+def test_habit_change_invalidates_staged_payload(
+    habit, django_capture_on_commit_callbacks
+):
+    stage_habit_reminders()
+
+    with django_capture_on_commit_callbacks(execute=True):
+        habit.action = "Бегать"
+        habit.save()
+
+    _, send_mock = run_shard(habit.id)
+
+    assert "бегать" in send_mock.call_args.args[1]
+
+
+def test_profile_deactivation_invalidates_staged_payload(
+    habit, user, django_capture_on_commit_callbacks
+):
+    stage_habit_reminders()
+
+    with django_capture_on_commit_callbacks(execute=True):
+        profile = TelegramProfile.objects.get(user=user)
+        profile.is_active = False
+        profile.save()
+
+    claimed, send_mock = run_shard(habit.id)
+
+    assert claimed == 1
+    send_mock.assert_not_called()
+
+
+def test_staged_row_of_other_occurrence_is_ignored(habit):
+    stage_habit_reminders()
+    later = DUE + datetime.timedelta(days=1)
+    Habit.objects.filter(pk=habit.pk).update(next_due_at=later, reminder_text="из БД")
+
+    with patch(
+        "notifications.telegram.deliver_telegram_message",
+        return_value=TelegramSendResult(TelegramSendStatus.OK),
+    ) as send_mock:
+        send_habit_reminders_shard([habit.id], later.isoformat())
+
+    assert send_mock.call_args.args == ("321", "из БД")
@@ -0,0 +1,114 @@
+"""
+Тесты часовых поясов в расписании напоминаний.
+Проверяется:
+- `time` привычки трактуется как местное время часового пояса владельца;
+- после доставки next_due_at сдвигается по местному времени
+  (переход на летнее время не сдвигает напоминание);
+- задача realign_reminder_schedule исправляет только «уехавшие» вхождения
+  и пишет их владельцев в ленту изменений планировщика;
+- смена часового пояса через API пересчитывает расписание.
+"""
+
+import datetime
+import zoneinfo
+
+import pytest
+from django.utils import timezone
+
+from habits.models import Habit, HabitScheduleChange, ReminderDelivery
+from notifications.models import TelegramProfile
+
+pytestmark = pytest.mark.django_db
+
+BERLIN = zoneinfo.ZoneInfo("Europe/Berlin")
+
+
+def make_habit(user, time=datetime.time(9, 0)) -> Habit:
+    return Habit.objects.create(
+        user=user,
+        action="Читать",
+        time=time,
+        periodicity=1,
+        duration=datetime.timedelta(seconds=60),
+    )
+
+
+def test_time_is_local_to_owner_time_zone(user):
+    TelegramProfile.objects.create(user=user, chat_id="1", time_zone="Asia/Tokyo")
+    habit = make_habit(user)
+
+    local = habit.next_due_at.astimezone(zoneinfo.ZoneInfo("Asia/Tokyo"))
+    assert local.time() == datetime.time(9, 0)
+    assert habit.next_due_at.astimezone(datetime.timezone.utc).hour == 0
+
+
+def test_advance_keeps_local_time_across_dst(user):
+    """
+    29.03.2025 09:00 CET = 08:00 UTC, а 30.03.2025 09:00 CEST = 07:00 UTC.
+    """
+    TelegramProfile.objects.create(user=user, chat_id="1", time_zone="Europe/Berlin")
+    habit = make_habit(user)
+    before_dst = datetime.datetime(2025, 3, 29, 9, 0, tzinfo=BERLIN)
+    Habit.objects.filter(pk=habit.pk).update(next_due_at=before_dst)
+
+    assert ReminderDelivery.claim([habit.id], before_dst)
+
+    habit.refresh_from_db()
+    assert habit.next_due_at == datetime.datetime(2025, 3, 30, 9, 0, tzinfo=BERLIN)
+    assert habit.next_due_at.astimezone(datetime.timezone.utc).hour == 7
+
+
+def test_realign_fixes_only_shifted_occurrences(
+    user, user2, settings, django_capture_on_commit_callbacks
+):
+    settings.HABIT_REMINDER_SCHEDULER_ENABLED = True
+    TelegramProfile.objects.create(user=user, chat_id="1", time_zone="Europe/Berlin")
+    shifted = make_habit(user)
+    correct = make_habit(user2)
+    # Вхождение посчитано со «старым» смещением +01:00 → 10:00 по CEST
+    Habit.objects.filter(pk=shifted.pk).update(
+        next_due_at=datetime.datetime(2025, 3, 30, 8, 0, tzinfo=datetime.timezone.utc)
+    )
+    correct_due = Habit.objects.get(pk=correct.pk).next_due_at
+
+    from habits.tasks import realign_reminder_schedule
+
+    HabitScheduleChange.objects.all().delete()
+    with django_capture_on_commit_callbacks(execute=True):
+        assert realign_reminder_schedule() == 1
+        assert realign_reminder_schedule() == 0
+
+    assert list(HabitScheduleChange.objects.values_list("user_id", flat=True)) == [
+        user.id
+    ]
+
+    shifted.refresh_from_db()
+    assert shifted.next_due_at == datetime.datetime(2025, 3, 30, 9, 0, tzinfo=BERLIN)
+    assert Habit.objects.get(pk=correct.pk).next_due_at == correct_due
+
+
+def test_time_zone_change_via_api_reschedules(auth_client, user):
+    TelegramProfile.objects.create(user=user, chat_id="1")
+    habit = make_habit(user)
+
+    resp = auth_client.patch(
+        "/api/telegram/profile/", {"time_zone": "America/New_York"}, format="json"
+    )
+
+    assert resp.status_code == 200
+    assert resp.data["time_zone"] == "America/New_York"
+    habit.refresh_from_db()
+    local = habit.next_due_at.astimezone(zoneinfo.ZoneInfo("America/New_York"))
+    assert local.time() == datetime.time(9, 0)
+    assert habit.next_due_at > timezone.now() - datetime.timedelta(minutes=1)
+
+
+def test_unknown_time_zone_is_rejected(auth_client, user):
+    TelegramProfile.objects.create(user=user, chat_id="1")
+
+    resp = auth_client.patch(
+        "/api/telegram/profile/", {"time_zone": "Mars/Olympus"}, format="json"
+    )
+
+    assert resp.status_code == 400
+    assert "time_zone" in resp.data
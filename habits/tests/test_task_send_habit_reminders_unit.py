@@ -14,7 +14,8 @@ from unittest.mock import patch
 from django.utils import timezone
 
 from habits.models import Habit
-from notifications.models import TelegramProfile
+from notifications.models import TelegramProfile, TelegramSendStatus
+from notifications.telegram import TelegramSendResult
 
 pytestmark = pytest.mark.django_db
 
@@ -58,7 +59,10 @@ def test_send_habit_reminders_calls_send_telegram_message(user):
     from habits.tasks import send_habit_reminders
 
     # Мокаем реальную отправку сообщений в Telegram
-    with patch("habits.tasks.send_telegram_message", return_value=True) as send_mock:
+    with patch(
+        "notifications.telegram.deliver_telegram_message",
+        return_value=TelegramSendResult(TelegramSendStatus.OK),
+    ) as send_mock:
         send_habit_reminders()
 
         send_mock.assert_called_once()
@@ -78,11 +78,11 @@ class HabitViewSet(viewsets.ModelViewSet):
         Это обеспечивает:
         - список /api/habits/ содержит только мои привычки;
         - retrieve /api/habits/{id}/ не отдаст чужой объект (будет 404).
+        Название (title) читается из сохранённого rendered_title,
+        поэтому join к place/user не нужен.
         """
         user = self.request.user
-        return Habit.objects.filter(user=user).select_related(
-            "user", "place", "related_habit"
-        )
+        return Habit.objects.filter(user=user)
 
     def perform_create(self, serializer):
         """
@@ -117,6 +117,4 @@ class PublicHabitListAPIView(generics.ListAPIView):
         """
         Публичные привычки (без авторизации).
         """
-        return Habit.objects.filter(is_public=True).select_related(
-            "user", "place", "related_habit"
-        )
+        return Habit.objects.filter(is_public=True)
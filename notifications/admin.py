@@ -1 +1,39 @@
-# Register your models here.
+"""
+Админ-конфигурация приложения notifications.
+Содержит настройки отображения недоставленных сообщений Telegram
+(dead-letter) и действие для их массовой повторной отправки.
+"""
+
+from django.contrib import admin
+
+from .models import TelegramDeadLetter
+from .tasks import replay_dead_letters
+
+
+@admin.register(TelegramDeadLetter)
+class TelegramDeadLetterAdmin(admin.ModelAdmin):
+    """
+    Админ-настройки для недоставленных сообщений Telegram.
+    Позволяет:
+    - фильтровать записи по типу ошибки и коду ответа
+    - искать по chat_id и описанию ошибки
+    - массово ставить выбранные сообщения на повторную отправку
+    """
+
+    list_display = (
+        "chat_id",
+        "status",
+        "error_code",
+        "description",
+        "attempts",
+        "created_at",
+        "replayed_at",
+    )
+    list_filter = ("status", "error_code", "replayed_at")
+    search_fields = ("chat_id", "description")
+    actions = ("replay",)
+
+    @admin.action(description="Повторно отправить выбранные сообщения")
+    def replay(self, request, queryset) -> None:
+        count = replay_dead_letters(queryset)
+        self.message_user(request, f"Поставлено на повторную отправку: {count}")
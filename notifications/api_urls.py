@@ -6,7 +6,12 @@ URL-маршруты приложения notifications.
 
 from django.urls import path
 
-from .views import TelegramLinkAPIView
+from .views import (
+    TelegramBreakerAPIView,
+    TelegramLinkAPIView,
+    TelegramProfileAPIView,
+    TelegramWebhookAPIView,
+)
 
 urlpatterns = [
     path(
@@ -14,4 +19,19 @@ urlpatterns = [
         TelegramLinkAPIView.as_view(),
         name="telegram-link",
     ),
+    path(
+        "telegram/profile/",
+        TelegramProfileAPIView.as_view(),
+        name="telegram-profile",
+    ),
+    path(
+        "telegram/breaker/",
+        TelegramBreakerAPIView.as_view(),
+        name="telegram-breaker",
+    ),
+    path(
+        "telegram/webhook/",
+        TelegramWebhookAPIView.as_view(),
+        name="telegram-webhook",
+    ),
 ]
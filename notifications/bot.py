@@ -0,0 +1,219 @@
+"""
+Обработка обновлений Telegram-бота привязки аккаунтов.
+Общая логика для обоих способов получения обновлений:
+- webhook (продакшен): Telegram присылает update на
+  POST /api/telegram/webhook/, view проверяет секрет и ставит задачу
+  process_telegram_update в очередь Celery;
+- long polling (разработка): процесс telegram_bot.py.
+Обрабатывается команда /start <token> (deep-link привязка, см.
+TelegramLinkAPIView); на остальные сообщения бот отвечает подсказкой.
+Для polling пачка обновлений обрабатывается конкурентно
+(process_update_batch): обновления разных чатов — параллельно
+(не больше TELEGRAM_BOT_CONCURRENCY одновременно), одного чата — строго
+по порядку; блокирующие ORM и HTTP выполняются в пуле потоков.
+Offset сдвигается только до первого обновления, обработка которого
+упала (next_update_offset): оно будет получено и обработано снова.
+Обработка идемпотентна: update_id захватывается в журнале
+TelegramProcessedUpdate в одной транзакции с обработкой, поэтому
+повторно доставленное обновление (перезапуск polling, повтор webhook)
+не обрабатывается второй раз.
+"""
+
+from __future__ import annotations
+
+import asyncio
+from collections.abc import Callable, Sequence
+from concurrent.futures import Executor
+from typing import Any
+
+from django.db import close_old_connections, transaction
+
+from .models import (
+    TelegramDeliveryMode,
+    TelegramLinkToken,
+    TelegramProcessedUpdate,
+    TelegramProfile,
+)
+from .signals import telegram_profile_linked
+from .telegram import TelegramSendResult, get_telegram_client
+
+
+def send_message(chat_id: str | int, text: str) -> TelegramSendResult:
+    """
+    Отправить сообщение в Telegram чат (обычный текст, без разметки).
+    :param chat_id: идентификатор чата (int или str)
+    :param text: текст сообщения
+    :return: классифицированный ответ Telegram
+    """
+    return get_telegram_client().send_message(chat_id, text, parse_mode=None)
+
+
+def link_chat(chat_id: str | int, text: str, username: str | None = None) -> str:
+    """
+    Выполнить команду /start в БД, ничего не отправляя.
+    Ожидаем формат:
+        /start <token>
+    Привязка — два запроса в одной транзакции:
+    - TelegramLinkToken.claim() помечает токен использованным, только если
+      он ещё не использован и не просрочен (повторный /start его не получит);
+    - TelegramProfile.link() создаёт/обновляет TelegramProfile пользователя.
+    Если чат уже привязан к другому пользователю, транзакция откатывается
+    (токен остаётся неиспользованным).
+    :param chat_id: telegram chat id
+    :param text: полный текст сообщения (например "/start abcdef")
+    :param username: telegram username (если есть)
+    :return: текст ответа пользователю
+    """
+    parts = text.strip().split(maxsplit=1)
+
+    # /start без токена
+    if len(parts) == 1:
+        return "Привет! Открой ссылку из приложения AtomicHabits, чтобы привязать Telegram."
+
+    token = parts[1].strip()
+
+    with transaction.atomic():
+        claimed = TelegramLinkToken.claim(token)
+        if claimed is None:
+            return (
+                "❌ Неверный, устаревший или уже использованный токен. "
+                "Сгенерируйте новую ссылку в приложении."
+            )
+
+        user_id, account = claimed
+        linked = TelegramProfile.link(user_id, chat_id, username or "")
+        if linked is None:
+            transaction.set_rollback(True)
+            return (
+                "❌ Этот Telegram уже привязан к другому аккаунту AtomicHabits. "
+                "Отключите уведомления в нём или используйте другой Telegram."
+            )
+
+        reactivated, delivery_mode = linked
+        telegram_profile_linked.send(
+            sender=TelegramProfile,
+            user_id=user_id,
+            per_habit_reminders=delivery_mode == TelegramDeliveryMode.PER_HABIT,
+            reactivated=reactivated,
+        )
+
+    return (
+        f"✅ Телеграм успешно привязан к аккаунту {account}.\n"
+        f"Теперь вы будете получать напоминания о привычках."
+    )
+
+
+def extract_message(
+    update: dict[str, Any],
+) -> tuple[str | None, str | None, str | None]:
+    """
+    Вытащить chat_id, username и text из update (с защитой от отсутствующих ключей).
+    :param update: элемент из массива result Telegram API
+    :return: (chat_id, username, text) как строки или None
+    """
+    message = update.get("message") or {}
+    chat = message.get("chat") or {}
+    chat_id = chat.get("id")
+    username = chat.get("username")
+    text = message.get("text")
+
+    return (str(chat_id) if chat_id is not None else None, username, text)
+
+
+def handle_update(update: dict[str, Any]) -> bool:
+    """
+    Обработать один update Telegram (не больше одного раза на update_id).
+    - /start → привязка (link_chat);
+    - прочие текстовые сообщения → подсказка;
+    - update без чата или текста (редактирование, стикер и т.п.) пропускается.
+    Ответ отправляется после коммита: транзакция не держит блокировки
+    и соединение с БД на время запроса к Telegram.
+    :return: False — update_id уже обрабатывался, ничего не сделано
+    """
+    with transaction.atomic():
+        if not TelegramProcessedUpdate.claim(int(update["update_id"])):
+            return False
+
+        chat_id, username, text = extract_message(update)
+        if not chat_id or not text:
+            return True
+
+        if text.startswith("/start"):
+            reply = link_chat(chat_id, text, username=username)
+        else:
+            reply = "Напишите /start по ссылке из приложения, чтобы привязать аккаунт."
+
+    send_message(chat_id, reply)
+    return True
+
+
+def handle_update_in_thread(update: dict[str, Any]) -> None:
+    """
+    handle_update для пула потоков долгоживущего процесса: соединения с БД,
+    пережившие CONN_MAX_AGE или оборвавшиеся, закрываются до и после
+    обработки (как в цикле запрос/ответ Django).
+    """
+    close_old_connections()
+    try:
+        handle_update(update)
+    finally:
+        close_old_connections()
+
+
+def update_chat_key(update: dict[str, Any]) -> str:
+    """
+    Ключ упорядочивания: chat_id, а для update без чата — сам update_id.
+    """
+    chat_id, _, _ = extract_message(update)
+    return chat_id or f"update:{update.get('update_id')}"
+
+
+async def process_update_batch(
+    updates: Sequence[dict[str, Any]],
+    executor: Executor,
+    concurrency: int,
+    handler: Callable[[dict[str, Any]], Any] = handle_update_in_thread,
+) -> set[int]:
+    """
+    Обрабатывает пачку обновлений getUpdates.
+    - обновления группируются по чату; чаты обрабатываются параллельно,
+      внутри чата — в порядке update_id;
+    - одновременно выполняется не больше concurrency обработчиков
+      (asyncio.Semaphore);
+    - handler (блокирующий: ORM, HTTP) выполняется в executor;
+    - ошибка обновления останавливает только его чат: следующие обновления
+      этого чата не обрабатываются (строгий порядок внутри чата) и придут
+      снова вместе с упавшим; другие чаты продолжают работу.
+    :return: update_id, обработанные без ошибок (см. next_update_offset)
+    """
+    loop = asyncio.get_running_loop()
+    semaphore = asyncio.Semaphore(concurrency)
+    succeeded: set[int] = set()
+
+    chats: dict[str, list[dict[str, Any]]] = {}
+    for update in sorted(updates, key=lambda update: int(update["update_id"])):
+        chats.setdefault(update_chat_key(update), []).append(update)
+
+    async def process_chat(chat_updates: list[dict[str, Any]]) -> None:
+        for update in chat_updates:
+            async with semaphore:
+                try:
+                    await loop.run_in_executor(executor, handler, update)
+                except Exception as e:
+                    print(f"[WARN] update {update.get('update_id')} failed: {e}")
+                    return
+            succeeded.add(int(update["update_id"]))
+
+    await asyncio.gather(*(process_chat(chat) for chat in chats.values()))
+    return succeeded
+
+
+def next_update_offset(updates: Sequence[dict[str, Any]], succeeded: set[int]) -> int:
+    """
+    Offset getUpdates после пачки: до первого необработанного update_id
+    (он и следующие придут снова; уже обработанные отсеет журнал update_id),
+    а если ошибок не было — за последним обновлением пачки.
+    """
+    update_ids = sorted(int(update["update_id"]) for update in updates)
+    failed = [update_id for update_id in update_ids if update_id not in succeeded]
+    return failed[0] if failed else update_ids[-1] + 1
@@ -0,0 +1,344 @@
+"""
+Размыкатель цепи (circuit breaker) для запросов к Telegram Bot API.
+Когда api.telegram.org тормозит или лежит, каждая отправка ждёт полный
+таймаут запроса, и воркеры рассылки часами стоят в таймаутах. Размыкатель
+считает долю неудачных запросов (сеть, таймаут, 5xx) в окне
+TELEGRAM_BREAKER_WINDOW_SECONDS и, если она достигла
+TELEGRAM_BREAKER_FAILURE_RATE (при минимум TELEGRAM_BREAKER_MIN_REQUESTS
+запросах), размыкается:
+- open — запросы не выполняются, отправка сразу получает CIRCUIT_OPEN
+  с retry_after до конца паузы (повтор откладывается, а не ждёт таймаут);
+- half_open — после TELEGRAM_BREAKER_OPEN_SECONDS пропускается не больше
+  TELEGRAM_BREAKER_HALF_OPEN_PROBES пробных запросов: успех замыкает цепь,
+  неудача снова размыкает её на ту же паузу;
+- closed — обычная работа.
+429 и прочие 4xx — ответы живого API, на размыкатель они не влияют.
+Бэкенды:
+- RedisBreakerBackend — одно состояние на все процессы (Lua-скрипты,
+  время берётся из Redis);
+- InMemoryBreakerBackend — состояние в памяти процесса (тесты, локальный запуск).
+"""
+
+import threading
+import time
+from collections.abc import Callable
+from typing import NamedTuple, Protocol
+
+from django.conf import settings
+from redis.exceptions import RedisError
+
+from config.backends import ProcessSingleton, backend_redis
+
+CLOSED, OPEN, HALF_OPEN = "closed", "open", "half_open"
+
+# Разрешение запроса. Возвращает {решение, ожидание}: 1 — обычный запрос,
+# 2 — пробный запрос, 0 — отказ (ожидание — сколько секунд до следующей пробы)
+_ALLOW_SCRIPT = """
+local t = redis.call('TIME')
+local now = tonumber(t[1]) + tonumber(t[2]) / 1000000
+local data = redis.call('HMGET', KEYS[1], 'state', 'until', 'probes')
+local state = data[1] or 'closed'
+local deadline = tonumber(data[2]) or 0
+local probes = tonumber(data[3]) or 0
+if state == 'closed' then
+  return {1, '0'}
+end
+if now >= deadline then
+  -- Пауза истекла (или пробы зависли) — начинаем новый раунд проб
+  state = 'half_open'
+  probes = 0
+  deadline = now + tonumber(ARGV[2])
+  redis.call('HSET', KEYS[1], 'state', state, 'until', deadline, 'probes', 0)
+end
+if state == 'half_open' and probes < tonumber(ARGV[1]) then
+  redis.call('HINCRBY', KEYS[1], 'probes', 1)
+  return {2, '0'}
+end
+return {0, tostring(deadline - now)}
+"""
+
+# Учёт результата. ARGV: успех (1/0), проба (1/0), порог доли ошибок,
+# минимум запросов, окно (сек), пауза (сек). Возвращает новое состояние.
+_RECORD_SCRIPT = """
+local t = redis.call('TIME')
+local now = tonumber(t[1]) + tonumber(t[2]) / 1000000
+local success = ARGV[1] == '1'
+local open_seconds = tonumber(ARGV[6])
+local data = redis.call('HMGET', KEYS[1], 'state', 'since', 'requests', 'failures')
+local state = data[1] or 'closed'
+if ARGV[2] == '1' then
+  if state ~= 'half_open' then
+    return state
+  end
+  if success then
+    redis.call('DEL', KEYS[1])
+    return 'closed'
+  end
+  redis.call('HSET', KEYS[1], 'state', 'open', 'until', now + open_seconds)
+  return 'open'
+end
+if state ~= 'closed' then
+  return state
+end
+local since = tonumber(data[2]) or now
+local requests = tonumber(data[3]) or 0
+local failures = tonumber(data[4]) or 0
+if now - since >= tonumber(ARGV[5]) then
+  since, requests, failures = now, 0, 0
+end
+requests = requests + 1
+if not success then
+  failures = failures + 1
+end
+if requests >= tonumber(ARGV[4]) and failures / requests >= tonumber(ARGV[3]) then
+  redis.call('DEL', KEYS[1])
+  redis.call('HSET', KEYS[1], 'state', 'open', 'until', now + open_seconds)
+  return 'open'
+end
+redis.call('HSET', KEYS[1], 'since', since, 'requests', requests, 'failures', failures)
+redis.call('PEXPIRE', KEYS[1], math.ceil(tonumber(ARGV[5]) * 1000) + 1000)
+return 'closed'
+"""
+
+
+class BreakerPolicy(NamedTuple):
+    """
+    Параметры размыкателя (см. настройки TELEGRAM_BREAKER_*).
+    """
+
+    failure_rate: float
+    min_requests: int
+    window: float
+    open_seconds: float
+    half_open_probes: int
+
+
+class BreakerSnapshot(NamedTuple):
+    """
+    Состояние размыкателя для метрик.
+    retry_in — сколько секунд осталось до следующей пробы (в open).
+    """
+
+    state: str
+    requests: int = 0
+    failures: int = 0
+    retry_in: float = 0.0
+
+
+class BreakerBackend(Protocol):
+    """
+    Хранилище состояния размыкателя.
+    allow() — (решение, ожидание): решение 1 — запрос, 2 — пробный запрос,
+    0 — отказ на `ожидание` секунд;
+    record() — учесть результат запроса, вернуть новое состояние;
+    snapshot() — текущее состояние для метрик.
+    """
+
+    def allow(self, name: str, policy: BreakerPolicy) -> tuple[int, float]: ...
+
+    def record(
+        self, name: str, policy: BreakerPolicy, success: bool, probe: bool
+    ) -> str: ...
+
+    def snapshot(self, name: str) -> BreakerSnapshot: ...
+
+
+class InMemoryBreakerBackend:
+    """
+    Размыкатель в памяти процесса (потокобезопасно).
+    Подходит для тестов и запуска с одним воркером.
+    """
+
+    def __init__(self, clock: Callable[[], float] = time.monotonic) -> None:
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._state: dict[str, dict] = {}
+
+    def allow(self, name: str, policy: BreakerPolicy) -> tuple[int, float]:
+        with self._lock:
+            now = self._clock()
+            data = self._state.setdefault(name, {"state": CLOSED})
+            if data["state"] == CLOSED:
+                return 1, 0.0
+            if now >= data["until"]:
+                data.update(state=HALF_OPEN, until=now + policy.open_seconds, probes=0)
+            if data["state"] == HALF_OPEN and data["probes"] < policy.half_open_probes:
+                data["probes"] += 1
+                return 2, 0.0
+            return 0, data["until"] - now
+
+    def record(
+        self, name: str, policy: BreakerPolicy, success: bool, probe: bool
+    ) -> str:
+        with self._lock:
+            now = self._clock()
+            data = self._state.setdefault(name, {"state": CLOSED})
+            if probe:
+                if data["state"] != HALF_OPEN:
+                    return data["state"]
+                if success:
+                    self._state[name] = {"state": CLOSED}
+                    return CLOSED
+                self._state[name] = {"state": OPEN, "until": now + policy.open_seconds}
+                return OPEN
+            if data["state"] != CLOSED:
+                return data["state"]
+
+            if "since" not in data or now - data["since"] >= policy.window:
+                data.update(since=now, requests=0, failures=0)
+            data["requests"] += 1
+            data["failures"] += not success
+            if (
+                data["requests"] >= policy.min_requests
+                and data["failures"] / data["requests"] >= policy.failure_rate
+            ):
+                self._state[name] = {"state": OPEN, "until": now + policy.open_seconds}
+                return OPEN
+            return CLOSED
+
+    def snapshot(self, name: str) -> BreakerSnapshot:
+        with self._lock:
+            data = self._state.get(name, {"state": CLOSED})
+            return BreakerSnapshot(
+                data["state"],
+                requests=data.get("requests", 0),
+                failures=data.get("failures", 0),
+                retry_in=max(0.0, data.get("until", 0.0) - self._clock()),
+            )
+
+
+class RedisBreakerBackend:
+    """
+    Размыкатель в Redis — одно состояние на все процессы и хосты воркеров.
+    Ключ: <prefix><name> (hash: state, until, probes, since, requests, failures).
+    Если Redis недоступен, размыкатель пропускает запросы (fail-open):
+    его недоступность не должна останавливать рассылку.
+    """
+
+    def __init__(self, client, prefix: str = "telegram:breaker:") -> None:
+        self._client = client
+        self._prefix = prefix
+        self._allow = client.register_script(_ALLOW_SCRIPT)
+        self._record = client.register_script(_RECORD_SCRIPT)
+
+    def _key(self, name: str) -> str:
+        return f"{self._prefix}{name}"
+
+    def allow(self, name: str, policy: BreakerPolicy) -> tuple[int, float]:
+        try:
+            decision, wait = self._allow(
+                keys=[self._key(name)],
+                args=[policy.half_open_probes, policy.open_seconds],
+            )
+        except RedisError:
+            return 1, 0.0
+        return int(decision), float(wait)
+
+    def record(
+        self, name: str, policy: BreakerPolicy, success: bool, probe: bool
+    ) -> str:
+        try:
+            state = self._record(
+                keys=[self._key(name)],
+                args=[
+                    "1" if success else "0",
+                    "1" if probe else "0",
+                    policy.failure_rate,
+                    policy.min_requests,
+                    policy.window,
+                    policy.open_seconds,
+                ],
+            )
+        except RedisError:
+            return CLOSED
+        return state.decode() if isinstance(state, bytes) else state
+
+    def snapshot(self, name: str) -> BreakerSnapshot:
+        try:
+            now_s, now_us = self._client.time()
+            data = {
+                key.decode(): value.decode()
+                for key, value in self._client.hgetall(self._key(name)).items()
+            }
+        except RedisError:
+            return BreakerSnapshot(CLOSED)
+        now = now_s + now_us / 1_000_000
+        return BreakerSnapshot(
+            data.get("state", CLOSED),
+            requests=int(float(data.get("requests", 0))),
+            failures=int(float(data.get("failures", 0))),
+            retry_in=max(0.0, float(data.get("until", 0)) - now),
+        )
+
+
+class CircuitBreaker:
+    """
+    Размыкатель одного внешнего сервиса (name) с общей политикой.
+    Использование:
+        decision = breaker.before_request()
+        if not decision.allowed: ...  # отказ, повторить через decision.retry_in
+        ...
+        breaker.record(decision, success)
+    """
+
+    class Decision(NamedTuple):
+        allowed: bool
+        probe: bool = False
+        retry_in: float = 0.0
+
+    def __init__(
+        self, backend: BreakerBackend, name: str, policy: BreakerPolicy
+    ) -> None:
+        self._backend = backend
+        self._name = name
+        self._policy = policy
+
+    def before_request(self) -> "CircuitBreaker.Decision":
+        """
+        Можно ли выполнить запрос сейчас (в half_open занимает слот пробы).
+        """
+        decision, wait = self._backend.allow(self._name, self._policy)
+        if decision == 0:
+            return self.Decision(False, retry_in=wait)
+        return self.Decision(True, probe=decision == 2)
+
+    def record(self, decision: "CircuitBreaker.Decision", success: bool) -> str:
+        """
+        Учитывает результат разрешённого запроса.
+        :param success: API ответил (не сеть, не таймаут, не 5xx)
+        :return: состояние размыкателя после учёта
+        """
+        return self._backend.record(self._name, self._policy, success, decision.probe)
+
+    def snapshot(self) -> BreakerSnapshot:
+        """
+        Текущее состояние (для метрик).
+        """
+        return self._backend.snapshot(self._name)
+
+
+def build_circuit_breaker() -> CircuitBreaker:
+    """
+    Создаёт размыкатель Bot API по настройкам TELEGRAM_BREAKER_*.
+    """
+    redis = backend_redis("TELEGRAM_BREAKER")
+    backend: BreakerBackend = (
+        InMemoryBreakerBackend() if redis is None else RedisBreakerBackend(redis)
+    )
+    return CircuitBreaker(
+        backend,
+        "bot_api",
+        BreakerPolicy(
+            failure_rate=settings.TELEGRAM_BREAKER_FAILURE_RATE,
+            min_requests=settings.TELEGRAM_BREAKER_MIN_REQUESTS,
+            window=settings.TELEGRAM_BREAKER_WINDOW_SECONDS,
+            open_seconds=settings.TELEGRAM_BREAKER_OPEN_SECONDS,
+            half_open_probes=settings.TELEGRAM_BREAKER_HALF_OPEN_PROBES,
+        ),
+    )
+
+
+# Общий для процесса размыкатель Bot API (создаётся лениво, один раз)
+circuit_breaker = ProcessSingleton(build_circuit_breaker)
+get_circuit_breaker = circuit_breaker.get
+reset_circuit_breaker = circuit_breaker.reset
@@ -0,0 +1,42 @@
+"""
+Управление webhook Telegram-бота.
+    python manage.py telegram_webhook set     # TELEGRAM_WEBHOOK_URL + секрет
+    python manage.py telegram_webhook delete  # вернуться к polling (telegram_bot.py)
+"""
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from notifications.telegram import get_telegram_client
+
+
+class Command(BaseCommand):
+    help = "Установить или удалить webhook Telegram-бота."
+
+    def add_arguments(self, parser) -> None:
+        parser.add_argument("action", choices=["set", "delete"])
+
+    def handle(self, *args, action: str, **options) -> None:
+        if not settings.TELEGRAM_BOT_TOKEN:
+            raise CommandError("TELEGRAM_BOT_TOKEN не задан.")
+
+        client = get_telegram_client()
+        if action == "delete":
+            result = client.delete_webhook()
+        else:
+            if (
+                not settings.TELEGRAM_WEBHOOK_URL
+                or not settings.TELEGRAM_WEBHOOK_SECRET
+            ):
+                raise CommandError(
+                    "Задайте TELEGRAM_WEBHOOK_URL и TELEGRAM_WEBHOOK_SECRET."
+                )
+            result = client.set_webhook(
+                settings.TELEGRAM_WEBHOOK_URL,
+                settings.TELEGRAM_WEBHOOK_SECRET,
+                allowed_updates=["message"],
+            )
+
+        if not result.ok:
+            raise CommandError(f"Telegram: {result.error_code} {result.description}")
+        self.stdout.write(self.style.SUCCESS(f"webhook: {action} — ok"))
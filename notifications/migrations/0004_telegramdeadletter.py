@@ -0,0 +1,86 @@
+# Generated by Django 5.2.8 on 2026-10-17 07:23
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("notifications", "0003_alter_telegramlinktoken_options_and_more"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="TelegramDeadLetter",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "chat_id",
+                    models.CharField(max_length=64, verbose_name="Telegram chat ID"),
+                ),
+                ("text", models.TextField(verbose_name="текст сообщения")),
+                (
+                    "status",
+                    models.CharField(
+                        choices=[
+                            ("ok", "отправлено"),
+                            ("disabled", "бот не настроен"),
+                            ("network_error", "сетевая ошибка"),
+                            ("rate_limited", "превышен лимит (429)"),
+                            ("server_error", "ошибка сервера (5xx)"),
+                            ("permanent", "постоянная ошибка (4xx)"),
+                        ],
+                        max_length=32,
+                        verbose_name="тип ошибки",
+                    ),
+                ),
+                (
+                    "error_code",
+                    models.PositiveSmallIntegerField(
+                        blank=True,
+                        help_text="error_code из ответа Telegram (если был ответ).",
+                        null=True,
+                        verbose_name="код ошибки",
+                    ),
+                ),
+                (
+                    "description",
+                    models.CharField(
+                        blank=True, max_length=255, verbose_name="описание ошибки"
+                    ),
+                ),
+                (
+                    "attempts",
+                    models.PositiveSmallIntegerField(
+                        default=1, verbose_name="попыток отправки"
+                    ),
+                ),
+                (
+                    "created_at",
+                    models.DateTimeField(auto_now_add=True, verbose_name="создано"),
+                ),
+                (
+                    "replayed_at",
+                    models.DateTimeField(
+                        blank=True,
+                        help_text="Когда сообщение было поставлено на повторную отправку.",
+                        null=True,
+                        verbose_name="повторно отправлено",
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "недоставленное сообщение Telegram",
+                "verbose_name_plural": "недоставленные сообщения Telegram",
+                "ordering": ("-created_at",),
+            },
+        ),
+    ]
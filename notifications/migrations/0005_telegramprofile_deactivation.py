@@ -0,0 +1,33 @@
+# Generated by Django 5.2.8 on 2026-10-17 07:25
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("notifications", "0004_telegramdeadletter"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="telegramprofile",
+            name="deactivated_at",
+            field=models.DateTimeField(
+                blank=True,
+                help_text="Когда профиль был отключён из-за недоступности чата.",
+                null=True,
+                verbose_name="отключён автоматически",
+            ),
+        ),
+        migrations.AddField(
+            model_name="telegramprofile",
+            name="deactivation_reason",
+            field=models.CharField(
+                blank=True,
+                help_text="Ответ Telegram, по которому чат признан недоступным.",
+                max_length=255,
+                verbose_name="причина отключения",
+            ),
+        ),
+    ]
@@ -0,0 +1,25 @@
+# Generated by Django 5.2.8 on 2026-10-17 07:41
+
+import notifications.validators
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("notifications", "0005_telegramprofile_deactivation"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="telegramprofile",
+            name="time_zone",
+            field=models.CharField(
+                blank=True,
+                help_text="Часовой пояс IANA (например, Europe/Moscow), в котором пользователь задаёт время привычек. Пусто — часовой пояс сервера.",
+                max_length=64,
+                validators=[notifications.validators.validate_time_zone],
+                verbose_name="часовой пояс",
+            ),
+        ),
+    ]
@@ -0,0 +1,58 @@
+# Generated by Django 5.2.8 on 2026-10-17 07:51
+
+import datetime
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("notifications", "0006_telegramprofile_time_zone"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="telegramprofile",
+            name="delivery_mode",
+            field=models.CharField(
+                choices=[
+                    ("per_habit", "по каждой привычке"),
+                    ("digest", "ежедневная сводка"),
+                ],
+                default="per_habit",
+                help_text="По каждой привычке — напоминание в её время; ежедневная сводка — одно сообщение со всеми привычками на сегодня в digest_time.",
+                max_length=16,
+                verbose_name="режим доставки",
+            ),
+        ),
+        migrations.AddField(
+            model_name="telegramprofile",
+            name="digest_time",
+            field=models.TimeField(
+                default=datetime.time(8, 0),
+                help_text="Местное время ежедневной сводки (для режима «ежедневная сводка»).",
+                verbose_name="время сводки",
+            ),
+        ),
+        migrations.AddField(
+            model_name="telegramprofile",
+            name="next_digest_at",
+            field=models.DateTimeField(
+                blank=True,
+                editable=False,
+                help_text="Момент ближайшей сводки (поддерживается автоматически).",
+                null=True,
+                verbose_name="следующая сводка",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="telegramprofile",
+            index=models.Index(
+                condition=models.Q(("delivery_mode", "digest"), ("is_active", True)),
+                fields=["next_digest_at"],
+                name="telegram_profile_digest_idx",
+            ),
+        ),
+    ]
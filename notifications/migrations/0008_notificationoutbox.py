@@ -0,0 +1,73 @@
+# Generated by Django 5.2.8 on 2026-10-17 08:10
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("notifications", "0007_telegramprofile_delivery_mode"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="NotificationOutbox",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "channel",
+                    models.CharField(
+                        choices=[("telegram", "Telegram")],
+                        default="telegram",
+                        max_length=16,
+                        verbose_name="канал",
+                    ),
+                ),
+                (
+                    "recipient",
+                    models.CharField(
+                        help_text="Для Telegram — chat_id.",
+                        max_length=64,
+                        verbose_name="получатель",
+                    ),
+                ),
+                ("payload", models.JSONField(verbose_name="содержимое")),
+                (
+                    "attempts",
+                    models.PositiveSmallIntegerField(
+                        default=0, verbose_name="попыток отправки"
+                    ),
+                ),
+                (
+                    "not_before",
+                    models.DateTimeField(
+                        default=django.utils.timezone.now,
+                        help_text="Когда строку можно забрать на отправку (повтор, аренда отправителя).",
+                        verbose_name="не раньше",
+                    ),
+                ),
+                (
+                    "created_at",
+                    models.DateTimeField(auto_now_add=True, verbose_name="создано"),
+                ),
+            ],
+            options={
+                "verbose_name": "исходящее уведомление",
+                "verbose_name_plural": "исходящие уведомления",
+                "indexes": [
+                    models.Index(
+                        fields=["not_before", "id"], name="notification_outbox_due_idx"
+                    )
+                ],
+            },
+        ),
+    ]
@@ -0,0 +1,30 @@
+# Generated by Django 5.2.8 on 2026-10-17 08:17
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("notifications", "0008_notificationoutbox"),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name="telegramdeadletter",
+            name="status",
+            field=models.CharField(
+                choices=[
+                    ("ok", "отправлено"),
+                    ("disabled", "бот не настроен"),
+                    ("network_error", "сетевая ошибка"),
+                    ("rate_limited", "превышен лимит (429)"),
+                    ("server_error", "ошибка сервера (5xx)"),
+                    ("permanent", "постоянная ошибка (4xx)"),
+                    ("circuit_open", "Bot API недоступен (размыкатель)"),
+                ],
+                max_length=32,
+                verbose_name="тип ошибки",
+            ),
+        ),
+    ]
@@ -0,0 +1,67 @@
+# Generated by Django 5.2.8 on 2026-10-17 08:25
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("notifications", "0009_alter_telegramdeadletter_status"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="TelegramBotState",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "key",
+                    models.CharField(max_length=64, unique=True, verbose_name="бот"),
+                ),
+                (
+                    "update_offset",
+                    models.BigIntegerField(default=0, verbose_name="offset getUpdates"),
+                ),
+                (
+                    "updated_at",
+                    models.DateTimeField(auto_now=True, verbose_name="обновлено"),
+                ),
+            ],
+            options={
+                "verbose_name": "состояние Telegram-бота",
+                "verbose_name_plural": "состояния Telegram-бота",
+            },
+        ),
+        migrations.CreateModel(
+            name="TelegramProcessedUpdate",
+            fields=[
+                (
+                    "update_id",
+                    models.BigIntegerField(
+                        primary_key=True, serialize=False, verbose_name="update_id"
+                    ),
+                ),
+                (
+                    "processed_at",
+                    models.DateTimeField(
+                        db_index=True,
+                        default=django.utils.timezone.now,
+                        verbose_name="обработано",
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "обработанное обновление Telegram",
+                "verbose_name_plural": "обработанные обновления Telegram",
+            },
+        ),
+    ]
@@ -1,17 +1,74 @@
 """
 Модели приложения notifications.
 Отвечают за:
-- привязку пользователя к Telegram (chat_id);
-- хранение одноразовых токенов для deep-link авторизации через Telegram-бота.
+- привязку пользователя к Telegram (chat_id) и настройки доставки
+  (часовой пояс, режим: напоминание по каждой привычке или ежедневная сводка);
+- хранение одноразовых токенов для deep-link авторизации через Telegram-бота;
+- хранение неотправленных сообщений (dead-letter) для разбора и повторной отправки;
+- очередь исходящих уведомлений (NotificationOutbox), которую разбирают
+  задачи-отправители;
+- состояние Telegram-бота: offset getUpdates и журнал обработанных
+  update_id (защита от повторной обработки).
 """
 
 import datetime
 import secrets
+import zoneinfo
 
 from django.conf import settings
-from django.db import models
+from django.contrib.auth import get_user_model
+from django.db import IntegrityError, connection, models, transaction
 from django.utils import timezone
 
+from .validators import validate_time_zone
+
+# Время ежедневной сводки нового профиля (местное)
+DEFAULT_DIGEST_TIME = datetime.time(8, 0)
+
+
+class TelegramDeliveryMode(models.TextChoices):
+    """
+    Режим доставки напоминаний о привычках.
+    """
+
+    PER_HABIT = "per_habit", "по каждой привычке"
+    DIGEST = "digest", "ежедневная сводка"
+
+
+def next_local_occurrence(
+    value: datetime.time, zone_name: str, now: datetime.datetime | None = None
+) -> datetime.datetime:
+    """
+    Ближайший момент (начиная с текущей минуты), когда в часовом поясе
+    zone_name наступает местное время value.
+    """
+    zone = zoneinfo.ZoneInfo(zone_name)
+    local_now = (
+        (now or timezone.now()).astimezone(zone).replace(second=0, microsecond=0)
+    )
+    candidate = datetime.datetime.combine(local_now.date(), value, tzinfo=zone)
+    if candidate < local_now:
+        candidate = datetime.datetime.combine(
+            local_now.date() + datetime.timedelta(days=1), value, tzinfo=zone
+        )
+    return candidate
+
+
+def next_local_occurrence_sql(time_sql: str, zone_sql: str) -> str:
+    """
+    SQL-аналог next_local_occurrence() для запросов с параметрами
+    %(now)s и %(default_tz)s (пустой часовой пояс — TIME_ZONE сервера).
+    :param time_sql: SQL-выражение местного времени (time)
+    :param zone_sql: SQL-выражение часового пояса пользователя
+    """
+    zone = f"COALESCE(NULLIF({zone_sql}, ''), %(default_tz)s)"
+    local_now = f"date_trunc('minute', %(now)s AT TIME ZONE {zone})"
+    return (
+        f"((({local_now})::date + {time_sql} + CASE "
+        f"WHEN ({local_now})::date + {time_sql} < {local_now} "
+        f"THEN interval '1 day' ELSE interval '0' END) AT TIME ZONE {zone})"
+    )
+
 
 class TelegramProfile(models.Model):
     """
@@ -19,7 +76,9 @@ class TelegramProfile(models.Model):
     Используется для:
     - хранения chat_id Telegram;
     - отправки уведомлений о привычках;
-    - включения/отключения уведомлений пользователем.
+    - включения/отключения уведомлений пользователем;
+    - выбора режима доставки: по каждой привычке или одна сводка в день
+      в digest_time (next_digest_at — ближайшая сводка, момент в UTC).
     """
 
     user = models.OneToOneField(
@@ -45,15 +104,257 @@ class TelegramProfile(models.Model):
         verbose_name="уведомления включены",
         help_text="Если выключено — напоминания в Telegram не отправляются.",
     )
+    deactivated_at = models.DateTimeField(
+        null=True,
+        blank=True,
+        verbose_name="отключён автоматически",
+        help_text="Когда профиль был отключён из-за недоступности чата.",
+    )
+    deactivation_reason = models.CharField(
+        max_length=255,
+        blank=True,
+        verbose_name="причина отключения",
+        help_text="Ответ Telegram, по которому чат признан недоступным.",
+    )
+    time_zone = models.CharField(
+        max_length=64,
+        blank=True,
+        verbose_name="часовой пояс",
+        help_text=(
+            "Часовой пояс IANA (например, Europe/Moscow), в котором "
+            "пользователь задаёт время привычек. Пусто — часовой пояс сервера."
+        ),
+        validators=[validate_time_zone],
+    )
+    delivery_mode = models.CharField(
+        max_length=16,
+        choices=TelegramDeliveryMode.choices,
+        default=TelegramDeliveryMode.PER_HABIT,
+        verbose_name="режим доставки",
+        help_text=(
+            "По каждой привычке — напоминание в её время; ежедневная сводка — "
+            "одно сообщение со всеми привычками на сегодня в digest_time."
+        ),
+    )
+    digest_time = models.TimeField(
+        default=DEFAULT_DIGEST_TIME,
+        verbose_name="время сводки",
+        help_text="Местное время ежедневной сводки (для режима «ежедневная сводка»).",
+    )
+    next_digest_at = models.DateTimeField(
+        null=True,
+        blank=True,
+        editable=False,
+        verbose_name="следующая сводка",
+        help_text="Момент ближайшей сводки (поддерживается автоматически).",
+    )
+
+    # Поля, от которых зависят расписания напоминаний и сводки
+    SCHEDULE_FIELDS = ("time_zone", "delivery_mode", "digest_time", "is_active")
 
     class Meta:
         verbose_name = "Telegram-профиль"
         verbose_name_plural = "Telegram-профили"
         ordering = ("user",)
+        indexes = [
+            # Поиск наступивших сводок: только профили в режиме сводки
+            models.Index(
+                fields=("next_digest_at",),
+                condition=models.Q(delivery_mode="digest", is_active=True),
+                name="telegram_profile_digest_idx",
+            ),
+        ]
 
     def __str__(self) -> str:
         return f"{self.user} — {self.chat_id}"
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Исходные значения — чтобы при save() понять, что поменялось
+        instance._loaded_values = {
+            name: instance.__dict__[name]
+            for name in cls.SCHEDULE_FIELDS
+            if name in instance.__dict__
+        }
+        return instance
+
+    def schedule_changed(self, *names: str) -> bool:
+        """
+        Изменилось ли хоть одно из полей с момента загрузки (для нового — True).
+        До конца save() (в том числе в post_save) сравнение идёт
+        со значениями до сохранения.
+        """
+        loaded = getattr(self, "_loaded_values", {})
+        return any(
+            name not in loaded or loaded[name] != getattr(self, name)
+            for name in names or self.SCHEDULE_FIELDS
+        )
+
+    @classmethod
+    def claim_due_digests(
+        cls, now: datetime.datetime, limit: int
+    ) -> list[tuple[int, str, datetime.datetime]]:
+        """
+        Захватывает до limit наступивших сводок одним запросом: строки берутся
+        через FOR UPDATE SKIP LOCKED, а next_digest_at сразу сдвигается
+        на следующие местные сутки (пропущенные сводки не догоняются).
+        :return: (user_id, chat_id, конец местных суток сводки) —
+                 сводка включает привычки, наступающие до этого момента
+        """
+        table = cls._meta.db_table
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f"""
+                WITH due AS (
+                    SELECT id, next_digest_at,
+                           COALESCE(NULLIF(time_zone, ''), %(default_tz)s) AS tz
+                    FROM {table}
+                    WHERE delivery_mode = %(mode)s AND is_active
+                      AND next_digest_at <= %(now)s
+                    ORDER BY next_digest_at
+                    LIMIT %(limit)s
+                    FOR UPDATE SKIP LOCKED
+                )
+                UPDATE {table} p
+                SET next_digest_at = (
+                    (due.next_digest_at AT TIME ZONE due.tz) + make_interval(
+                        days => 1 + floor(
+                            extract(epoch FROM %(now)s - due.next_digest_at) / 86400
+                        )::int
+                    )
+                ) AT TIME ZONE due.tz
+                FROM due
+                WHERE p.id = due.id
+                RETURNING p.user_id, p.chat_id,
+                    ((due.next_digest_at AT TIME ZONE due.tz)::date + 1)::timestamp
+                        AT TIME ZONE due.tz
+                """,
+                {
+                    "now": now,
+                    "limit": limit,
+                    "mode": TelegramDeliveryMode.DIGEST,
+                    "default_tz": settings.TIME_ZONE,
+                },
+            )
+            return cursor.fetchall()
+
+    @classmethod
+    def link(
+        cls, user_id: int, chat_id: str | int, username: str = ""
+    ) -> tuple[bool, str] | None:
+        """
+        Привязывает чат к пользователю одним INSERT ... ON CONFLICT: новый
+        профиль создаётся с настройками по умолчанию, у существующего
+        обновляются chat_id и username, и он снова включается.
+        save() и post_save при этом не вызываются — вызывающий код отправляет
+        сигнал telegram_profile_linked.
+        Запрос выполняется в точке сохранения: если чат уже привязан
+        к другому пользователю (уникальный chat_id), откатывается только он.
+        :return: (профиль создан или снова включён, режим доставки);
+                 None — чат уже привязан к другому пользователю
+        """
+        table = cls._meta.db_table
+        try:
+            with transaction.atomic(), connection.cursor() as cursor:
+                cursor.execute(
+                    f"""
+                    WITH previous AS (
+                        SELECT is_active FROM {table} WHERE user_id = %(user_id)s
+                    )
+                    INSERT INTO {table} AS p (
+                        user_id, chat_id, username, is_active, deactivated_at,
+                        deactivation_reason, time_zone, delivery_mode, digest_time,
+                        next_digest_at
+                    )
+                    VALUES (
+                        %(user_id)s, %(chat_id)s, %(username)s, true, NULL,
+                        '', '', %(mode)s, %(digest_time)s, NULL
+                    )
+                    ON CONFLICT (user_id) DO UPDATE SET
+                        chat_id = EXCLUDED.chat_id,
+                        username = EXCLUDED.username,
+                        is_active = true,
+                        deactivated_at = NULL,
+                        deactivation_reason = '',
+                        next_digest_at = CASE
+                            WHEN p.delivery_mode = %(digest_mode)s AND NOT p.is_active
+                            THEN {next_local_occurrence_sql("p.digest_time", "p.time_zone")}
+                            ELSE p.next_digest_at
+                        END
+                    RETURNING NOT COALESCE((SELECT is_active FROM previous), false),
+                        delivery_mode
+                    """,
+                    {
+                        "user_id": user_id,
+                        "chat_id": str(chat_id),
+                        "username": username,
+                        "mode": TelegramDeliveryMode.PER_HABIT,
+                        "digest_time": DEFAULT_DIGEST_TIME,
+                        "digest_mode": TelegramDeliveryMode.DIGEST,
+                        "now": timezone.now(),
+                        "default_tz": settings.TIME_ZONE,
+                    },
+                )
+                return cursor.fetchone()
+        except IntegrityError:
+            taken = cls.objects.filter(chat_id=str(chat_id)).exclude(user_id=user_id)
+            if taken.exists():
+                return None
+            raise
+
+    @property
+    def per_habit_reminders(self) -> bool:
+        """
+        Получает ли пользователь напоминания по каждой привычке.
+        """
+        return self.is_active and self.delivery_mode == TelegramDeliveryMode.PER_HABIT
+
+    def save(self, *args, **kwargs):
+        """
+        Пересчитывает next_digest_at при смене режима, времени сводки,
+        часового пояса и при повторном включении профиля (иначе устаревший
+        next_digest_at в прошлом отправил бы сводку сразу, не в digest_time).
+        При повторном включении также сбрасывает отметку автоотключения
+        (deactivated_at, deactivation_reason).
+        """
+        reactivated = self.is_active and self.schedule_changed("is_active")
+        if reactivated and (self.deactivated_at or self.deactivation_reason):
+            self.deactivated_at = None
+            self.deactivation_reason = ""
+            update_fields = kwargs.get("update_fields")
+            if update_fields is not None:
+                kwargs["update_fields"] = {
+                    *update_fields,
+                    "deactivated_at",
+                    "deactivation_reason",
+                }
+        if reactivated or self.schedule_changed(
+            "delivery_mode", "digest_time", "time_zone"
+        ):
+            if self.delivery_mode == TelegramDeliveryMode.DIGEST:
+                self.next_digest_at = next_local_occurrence(
+                    self.digest_time, self.zone_name
+                )
+            else:
+                self.next_digest_at = None
+            update_fields = kwargs.get("update_fields")
+            if update_fields is not None:
+                kwargs["update_fields"] = {*update_fields, "next_digest_at"}
+
+        result = super().save(*args, **kwargs)
+        self._loaded_values = {
+            name: getattr(self, name) for name in self.SCHEDULE_FIELDS
+        }
+        return result
+
+    @property
+    def zone_name(self) -> str:
+        """
+        Действующий часовой пояс пользователя (с учётом значения по умолчанию).
+        """
+        return self.time_zone or settings.TIME_ZONE
+
 
 class TelegramLinkToken(models.Model):
     """
@@ -116,6 +417,30 @@ class TelegramLinkToken(models.Model):
             expires_at=expires_at,
         )
 
+    @classmethod
+    def claim(cls, token: str) -> tuple[int, str] | None:
+        """
+        Помечает токен использованным одним условным UPDATE: из двух
+        одновременных /start с одним токеном его получит только один.
+        :return: (user_id, username владельца) или None, если токена нет,
+                 он просрочен или уже использован
+        """
+        table = cls._meta.db_table
+        user_table = get_user_model()._meta.db_table
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f"""
+                UPDATE {table} t
+                SET is_used = true
+                FROM {user_table} u
+                WHERE t.token = %s AND NOT t.is_used AND t.expires_at > now()
+                  AND u.id = t.user_id
+                RETURNING t.user_id, u.username
+                """,
+                [token],
+            )
+            return cursor.fetchone()
+
     def is_valid(self) -> bool:
         """
         Проверяет, валиден ли токен.
@@ -124,3 +449,273 @@ class TelegramLinkToken(models.Model):
         - текущее время меньше expires_at.
         """
         return (not self.is_used) and (self.expires_at > timezone.now())
+
+
+class TelegramSendStatus(models.TextChoices):
+    """
+    Классификация результата отправки сообщения в Telegram.
+    """
+
+    OK = "ok", "отправлено"
+    DISABLED = "disabled", "бот не настроен"
+    NETWORK_ERROR = "network_error", "сетевая ошибка"
+    RATE_LIMITED = "rate_limited", "превышен лимит (429)"
+    SERVER_ERROR = "server_error", "ошибка сервера (5xx)"
+    PERMANENT = "permanent", "постоянная ошибка (4xx)"
+    CIRCUIT_OPEN = "circuit_open", "Bot API недоступен (размыкатель)"
+
+
+class TelegramDeadLetter(models.Model):
+    """
+    Сообщение, которое не удалось доставить в Telegram.
+    Сюда попадают:
+    - постоянные ошибки (4xx, кроме 429) — повтор без исправления не поможет;
+    - временные ошибки, для которых исчерпаны повторы.
+    Записи можно разобрать в админке и массово отправить повторно
+    (см. notifications.tasks.replay_dead_letters).
+    """
+
+    chat_id = models.CharField(
+        max_length=64,
+        verbose_name="Telegram chat ID",
+    )
+    text = models.TextField(
+        verbose_name="текст сообщения",
+    )
+    status = models.CharField(
+        max_length=32,
+        choices=TelegramSendStatus.choices,
+        verbose_name="тип ошибки",
+    )
+    error_code = models.PositiveSmallIntegerField(
+        null=True,
+        blank=True,
+        verbose_name="код ошибки",
+        help_text="error_code из ответа Telegram (если был ответ).",
+    )
+    description = models.CharField(
+        max_length=255,
+        blank=True,
+        verbose_name="описание ошибки",
+    )
+    attempts = models.PositiveSmallIntegerField(
+        default=1,
+        verbose_name="попыток отправки",
+    )
+    created_at = models.DateTimeField(
+        auto_now_add=True,
+        verbose_name="создано",
+    )
+    replayed_at = models.DateTimeField(
+        null=True,
+        blank=True,
+        verbose_name="повторно отправлено",
+        help_text="Когда сообщение было поставлено на повторную отправку.",
+    )
+
+    class Meta:
+        verbose_name = "недоставленное сообщение Telegram"
+        verbose_name_plural = "недоставленные сообщения Telegram"
+        ordering = ("-created_at",)
+
+    def __str__(self) -> str:
+        return f"{self.chat_id} — {self.get_status_display()}"
+
+
+class NotificationChannel(models.TextChoices):
+    """
+    Канал доставки уведомления.
+    """
+
+    TELEGRAM = "telegram", "Telegram"
+
+
+class NotificationOutbox(models.Model):
+    """
+    Исходящее уведомление, ожидающее отправки (transactional outbox).
+    Рассылки пишут сюда сообщения пачкой (bulk_create) в той же транзакции,
+    что и захват вхождений, а отправляют их задачи drain_notification_outbox:
+    строки забираются пачками через SELECT ... FOR UPDATE SKIP LOCKED,
+    поэтому отправителей может быть сколько угодно, а падение воркера
+    ничего не теряет — строка снова станет доступна после
+    NOTIFICATION_OUTBOX_VISIBILITY_SECONDS.
+    payload — {"text": ..., ...}: кроме текста отправитель может положить
+    свои данные (например, записи журнала доставки напоминаний), они
+    возвращаются ему в сигнале notification_outbox_attempted.
+    Отправленные строки удаляются; исчерпавшие повторы уходят в dead-letter.
+    """
+
+    channel = models.CharField(
+        max_length=16,
+        choices=NotificationChannel.choices,
+        default=NotificationChannel.TELEGRAM,
+        verbose_name="канал",
+    )
+    recipient = models.CharField(
+        max_length=64,
+        verbose_name="получатель",
+        help_text="Для Telegram — chat_id.",
+    )
+    payload = models.JSONField(verbose_name="содержимое")
+    attempts = models.PositiveSmallIntegerField(
+        default=0,
+        verbose_name="попыток отправки",
+    )
+    not_before = models.DateTimeField(
+        default=timezone.now,
+        verbose_name="не раньше",
+        help_text="Когда строку можно забрать на отправку (повтор, аренда отправителя).",
+    )
+    created_at = models.DateTimeField(auto_now_add=True, verbose_name="создано")
+
+    class Meta:
+        verbose_name = "исходящее уведомление"
+        verbose_name_plural = "исходящие уведомления"
+        indexes = [
+            models.Index(
+                fields=["not_before", "id"], name="notification_outbox_due_idx"
+            ),
+        ]
+
+    def __str__(self) -> str:
+        return f"{self.channel}:{self.recipient} (попыток: {self.attempts})"
+
+    @classmethod
+    def claim_batch(
+        cls, limit: int, now: datetime.datetime | None = None
+    ) -> list["NotificationOutbox"]:
+        """
+        Забирает до limit готовых к отправке строк одним UPDATE:
+        строки выбираются через FOR UPDATE SKIP LOCKED (параллельные
+        отправители получают разные строки), attempts увеличивается,
+        а not_before сдвигается на NOTIFICATION_OUTBOX_VISIBILITY_SECONDS —
+        если отправитель упадёт, строку заберёт другой.
+        """
+        now = now or timezone.now()
+        table = cls._meta.db_table
+        return list(
+            cls.objects.raw(
+                f"""
+                UPDATE {table} o
+                SET attempts = o.attempts + 1, not_before = %(lease_until)s
+                WHERE o.id IN (
+                    SELECT id FROM {table}
+                    WHERE not_before <= %(now)s
+                    ORDER BY not_before, id
+                    LIMIT %(limit)s
+                    FOR UPDATE SKIP LOCKED
+                )
+                RETURNING o.*
+                """,
+                {
+                    "now": now,
+                    "limit": limit,
+                    "lease_until": now
+                    + datetime.timedelta(
+                        seconds=settings.NOTIFICATION_OUTBOX_VISIBILITY_SECONDS
+                    ),
+                },
+            )
+        )
+
+
+class TelegramBotState(models.Model):
+    """
+    Состояние polling-бота (одна строка на бота).
+    update_offset — offset для следующего getUpdates: все обновления с
+    меньшим update_id уже обработаны. Фиксируется после каждой пачки,
+    поэтому после перезапуска бот продолжает с того же места, а не
+    перечитывает необработанные за сутки обновления заново.
+    """
+
+    key = models.CharField(
+        max_length=64,
+        unique=True,
+        verbose_name="бот",
+    )
+    update_offset = models.BigIntegerField(
+        default=0,
+        verbose_name="offset getUpdates",
+    )
+    updated_at = models.DateTimeField(auto_now=True, verbose_name="обновлено")
+
+    class Meta:
+        verbose_name = "состояние Telegram-бота"
+        verbose_name_plural = "состояния Telegram-бота"
+
+    def __str__(self) -> str:
+        return f"{self.key}: offset {self.update_offset}"
+
+    @classmethod
+    def load_offset(cls, key: str) -> int | None:
+        """
+        Сохранённый offset (None — бот ещё не запускался).
+        """
+        return (
+            cls.objects.filter(key=key).values_list("update_offset", flat=True).first()
+        )
+
+    @classmethod
+    def commit_offset(cls, key: str, offset: int) -> None:
+        """
+        Сохраняет offset одним INSERT ... ON CONFLICT DO UPDATE.
+        Offset не откатывается назад.
+        """
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f"""
+                INSERT INTO {cls._meta.db_table} AS s (key, update_offset, updated_at)
+                VALUES (%s, %s, now())
+                ON CONFLICT (key) DO UPDATE
+                SET update_offset = GREATEST(s.update_offset, EXCLUDED.update_offset),
+                    updated_at = EXCLUDED.updated_at
+                """,
+                [key, offset],
+            )
+
+
+class TelegramProcessedUpdate(models.Model):
+    """
+    Журнал обработанных обновлений Telegram (по update_id).
+    Одно и то же обновление может прийти повторно: polling после перезапуска
+    до фиксации offset, повтор webhook, повторная доставка задачи Celery.
+    Обработчик захватывает update_id в той же транзакции, что и обработка
+    (claim), — повтор ничего не делает. Записи старше
+    TELEGRAM_PROCESSED_UPDATES_RETENTION_HOURS удаляются: Telegram хранит
+    неполученные обновления не больше суток.
+    """
+
+    update_id = models.BigIntegerField(primary_key=True, verbose_name="update_id")
+    processed_at = models.DateTimeField(
+        default=timezone.now,
+        db_index=True,
+        verbose_name="обработано",
+    )
+
+    class Meta:
+        verbose_name = "обработанное обновление Telegram"
+        verbose_name_plural = "обработанные обновления Telegram"
+
+    def __str__(self) -> str:
+        return str(self.update_id)
+
+    @classmethod
+    def claim(cls, update_id: int) -> bool:
+        """
+        Захватывает update_id (INSERT ... ON CONFLICT DO NOTHING).
+        Параллельный захват того же update_id ждёт завершения первой
+        транзакции. Вызывать внутри transaction.atomic() вместе с обработкой:
+        если обработка упадёт, захват откатится.
+        :return: True — обновление ещё не обрабатывалось
+        """
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f"""
+                INSERT INTO {cls._meta.db_table} (update_id, processed_at)
+                VALUES (%s, now())
+                ON CONFLICT (update_id) DO NOTHING
+                RETURNING update_id
+                """,
+                [update_id],
+            )
+            return cursor.fetchone() is not None
@@ -0,0 +1,203 @@
+"""
+Ограничитель частоты отправки сообщений в Telegram (token bucket).
+Лимиты Telegram Bot API:
+- около 30 сообщений в секунду на бота (глобально);
+- около 1 сообщения в секунду в один чат.
+Каждая отправка забирает по одному токену из глобального бакета и из бакета
+конкретного чата — атомарно: либо из обоих, либо ни из одного.
+Если токенов нет, отправитель ждёт ровно столько, сколько нужно до пополнения,
+вместо того чтобы получить 429 от Telegram.
+Бэкенды:
+- RedisBucketBackend — общее состояние для всех процессов Celery-воркеров
+  (Lua-скрипт, время берётся из Redis, чтобы часы воркеров не расходились);
+- InMemoryBucketBackend — состояние в памяти процесса (тесты, локальный запуск).
+"""
+
+import threading
+import time
+from collections.abc import Callable, Sequence
+from typing import NamedTuple, Protocol
+
+from django.conf import settings
+from redis.exceptions import RedisError
+
+from config.backends import ProcessSingleton, backend_redis
+
+# Атомарно пополняет все бакеты и списывает по токену, если он есть в каждом.
+# Возвращает строку с числом секунд ожидания ("0" — токены списаны).
+_TAKE_SCRIPT = """
+local t = redis.call('TIME')
+local now = tonumber(t[1]) + tonumber(t[2]) / 1000000
+local wait = 0
+local tokens = {}
+for i = 1, #KEYS do
+  local rate = tonumber(ARGV[2 * i - 1])
+  local capacity = tonumber(ARGV[2 * i])
+  local data = redis.call('HMGET', KEYS[i], 'tokens', 'ts')
+  local current = tonumber(data[1]) or capacity
+  local ts = tonumber(data[2]) or now
+  current = math.min(capacity, current + math.max(0, now - ts) * rate)
+  tokens[i] = current
+  if current < 1 then
+    wait = math.max(wait, (1 - current) / rate)
+  end
+end
+for i = 1, #KEYS do
+  local rate = tonumber(ARGV[2 * i - 1])
+  local capacity = tonumber(ARGV[2 * i])
+  if wait == 0 then
+    tokens[i] = tokens[i] - 1
+  end
+  redis.call('HSET', KEYS[i], 'tokens', tokens[i], 'ts', now)
+  redis.call('PEXPIRE', KEYS[i], math.ceil(capacity / rate * 1000) + 1000)
+end
+return tostring(wait)
+"""
+
+
+class Bucket(NamedTuple):
+    """
+    Описание бакета: ключ, скорость пополнения (токенов/сек) и ёмкость.
+    """
+
+    key: str
+    rate: float
+    capacity: float
+
+
+class BucketBackend(Protocol):
+    """
+    Хранилище состояния бакетов.
+    take() пытается атомарно забрать по токену из каждого бакета и возвращает
+    0.0 при успехе либо число секунд, через которое стоит повторить попытку.
+    """
+
+    def take(self, buckets: Sequence[Bucket]) -> float: ...
+
+
+class InMemoryBucketBackend:
+    """
+    Бакеты в памяти процесса (потокобезопасно).
+    Подходит для тестов и запуска с одним воркером.
+    """
+
+    def __init__(self, clock: Callable[[], float] = time.monotonic) -> None:
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._state: dict[str, tuple[float, float]] = {}
+
+    def take(self, buckets: Sequence[Bucket]) -> float:
+        with self._lock:
+            now = self._clock()
+            tokens: list[float] = []
+            wait = 0.0
+
+            for bucket in buckets:
+                current, ts = self._state.get(bucket.key, (bucket.capacity, now))
+                current = min(
+                    bucket.capacity, current + max(0.0, now - ts) * bucket.rate
+                )
+                tokens.append(current)
+                if current < 1:
+                    wait = max(wait, (1 - current) / bucket.rate)
+
+            for bucket, current in zip(buckets, tokens):
+                if wait == 0:
+                    current -= 1
+                self._state[bucket.key] = (current, now)
+
+            return wait
+
+
+class RedisBucketBackend:
+    """
+    Бакеты в Redis — одно состояние на все процессы и хосты воркеров.
+    Если Redis недоступен, ограничитель пропускает отправку (fail-open):
+    лучше получить редкий 429, чем не отправить напоминания вовсе.
+    """
+
+    def __init__(self, client, prefix: str = "telegram:ratelimit:") -> None:
+        self._script = client.register_script(_TAKE_SCRIPT)
+        self._prefix = prefix
+
+    def take(self, buckets: Sequence[Bucket]) -> float:
+        keys = [f"{self._prefix}{bucket.key}" for bucket in buckets]
+        args: list[float] = []
+        for bucket in buckets:
+            args.extend((bucket.rate, bucket.capacity))
+        try:
+            return float(self._script(keys=keys, args=args))
+        except RedisError:
+            return 0.0
+
+
+class TelegramRateLimiter:
+    """
+    Глобальный бакет бота + бакет на каждый чат.
+    """
+
+    def __init__(
+        self,
+        backend: BucketBackend,
+        global_rate: float,
+        chat_rate: float,
+        global_capacity: float | None = None,
+        chat_capacity: float | None = None,
+        sleep: Callable[[float], None] = time.sleep,
+    ) -> None:
+        self._backend = backend
+        self._global = Bucket("global", global_rate, global_capacity or global_rate)
+        self._chat_rate = chat_rate
+        self._chat_capacity = chat_capacity or max(chat_rate, 1.0)
+        self._sleep = sleep
+
+    def _buckets(self, chat_id: str) -> list[Bucket]:
+        return [
+            self._global,
+            Bucket(f"chat:{chat_id}", self._chat_rate, self._chat_capacity),
+        ]
+
+    def try_acquire(self, chat_id: str) -> float:
+        """
+        Одна попытка забрать токены для отправки в chat_id.
+        :return: 0.0 — можно отправлять; иначе сколько секунд подождать
+        """
+        return self._backend.take(self._buckets(chat_id))
+
+    def acquire(self, chat_id: str, timeout: float | None = None) -> bool:
+        """
+        Блокирует поток, пока не появятся токены для отправки в chat_id.
+        :param timeout: максимальное суммарное ожидание (None — без ограничения)
+        :return: True — токены получены; False — не уложились в timeout
+                 (вызывающий может перепланировать отправку)
+        """
+        waited = 0.0
+        while True:
+            wait = self.try_acquire(chat_id)
+            if wait <= 0:
+                return True
+            if timeout is not None and waited + wait > timeout:
+                return False
+            self._sleep(wait)
+            waited += wait
+
+
+def build_rate_limiter() -> TelegramRateLimiter:
+    """
+    Создаёт ограничитель по настройкам TELEGRAM_RATE_LIMIT_*.
+    """
+    redis = backend_redis("TELEGRAM_RATE_LIMIT")
+    backend: BucketBackend = (
+        InMemoryBucketBackend() if redis is None else RedisBucketBackend(redis)
+    )
+    return TelegramRateLimiter(
+        backend,
+        global_rate=settings.TELEGRAM_RATE_LIMIT_GLOBAL_PER_SECOND,
+        chat_rate=settings.TELEGRAM_RATE_LIMIT_CHAT_PER_SECOND,
+    )
+
+
+# Общий для процесса ограничитель (создаётся лениво, один раз)
+rate_limiter = ProcessSingleton(build_rate_limiter)
+get_rate_limiter = rate_limiter.get
+reset_rate_limiter = rate_limiter.reset
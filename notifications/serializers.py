@@ -2,11 +2,16 @@
 Сериализаторы приложения notifications.
 Используются для:
 - возврата данных, связанных с Telegram-интеграцией;
-- формирования deep-link для привязки Telegram-аккаунта пользователя.
+- формирования deep-link для привязки Telegram-аккаунта пользователя;
+- просмотра и изменения настроек Telegram-профиля (уведомления, часовой пояс,
+  режим доставки);
+- метрик размыкателя Bot API.
 """
 
 from rest_framework import serializers
 
+from .models import TelegramProfile
+
 
 class TelegramLinkSerializer(serializers.Serializer):
     """
@@ -24,3 +29,36 @@ class TelegramLinkSerializer(serializers.Serializer):
         read_only=True,
         help_text="Deep-link для привязки Telegram-аккаунта пользователя.",
     )
+
+
+class TelegramProfileSerializer(serializers.ModelSerializer):
+    """
+    Настройки Telegram-профиля текущего пользователя.
+    Изменять можно is_active, time_zone и режим доставки
+    (delivery_mode, digest_time); chat_id и username заполняет бот при привязке.
+    """
+
+    class Meta:
+        model = TelegramProfile
+        fields = (
+            "chat_id",
+            "username",
+            "is_active",
+            "time_zone",
+            "delivery_mode",
+            "digest_time",
+        )
+        read_only_fields = ("chat_id", "username")
+
+
+class TelegramBreakerSerializer(serializers.Serializer):
+    """
+    Состояние размыкателя Bot API (notifications.circuitbreaker.BreakerSnapshot).
+    """
+
+    state = serializers.CharField(help_text="closed / open / half_open.")
+    requests = serializers.IntegerField(help_text="Запросов в текущем окне.")
+    failures = serializers.IntegerField(help_text="Из них неудачных.")
+    retry_in = serializers.FloatField(
+        help_text="Секунд до следующей пробы (если цепь разомкнута)."
+    )
@@ -0,0 +1,22 @@
+"""
+Сигналы приложения notifications.
+telegram_profiles_deactivated отправляется после массового отключения
+Telegram-профилей через QuerySet.update() (обычные post_save при этом
+не срабатывают). Аргументы: user_ids — список id владельцев профилей.
+telegram_profile_linked отправляется после привязки чата через
+TelegramProfile.link() (INSERT ... ON CONFLICT, тоже без post_save).
+Аргументы: user_id; per_habit_reminders — профиль в режиме «по каждой
+привычке»; reactivated — профиль создан или снова включён.
+notification_outbox_attempted отправляется после каждой пачки отправок
+из NotificationOutbox. Аргументы: results — список (payload,
+TelegramSendResult) с итогом строк, которые больше не будут повторяться
+(отправлены или ушли в dead-letter); по нему отправитель записывает итоги у себя.
+"""
+
+from django.dispatch import Signal
+
+telegram_profiles_deactivated = Signal()
+
+telegram_profile_linked = Signal()
+
+notification_outbox_attempted = Signal()
@@ -0,0 +1,268 @@
+"""
+Celery-задачи приложения notifications.
+Повторная доставка сообщений Telegram:
+- временные ошибки (сеть, 429, 5xx) повторяются через очередь
+  NotificationOutbox с экспоненциальной задержкой; для 429 задержка
+  не меньше retry_after из ответа Telegram;
+- постоянные ошибки и исчерпанные повторы сохраняются в TelegramDeadLetter;
+- записи dead-letter можно массово поставить на повторную отправку
+  (через очередь NotificationOutbox);
+- чаты, ставшие недоступными (403 — бот заблокирован, 400 — chat not found),
+  отключаются одним UPDATE в конце прогона рассылки.
+Очередь исходящих уведомлений (NotificationOutbox) разбирают задачи
+drain_notification_outbox: пачка строк забирается через SKIP LOCKED,
+отправляется конкурентно, временные ошибки повторяются той же строкой
+(attempts, not_before), остальные — в dead-letter. Пока размыкатель
+Bot API разомкнут, отправители очередь не разбирают, а отложенные им
+отправки не расходуют попытки.
+Обновления Telegram-бота, полученные через webhook, обрабатывает задача
+process_telegram_update (см. notifications.bot).
+"""
+
+import datetime
+
+from celery import shared_task
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Case, CharField, Value, When
+from django.utils import timezone
+
+from .bot import handle_update
+from .circuitbreaker import get_circuit_breaker
+from .models import (
+    NotificationOutbox,
+    TelegramDeadLetter,
+    TelegramProcessedUpdate,
+    TelegramProfile,
+    TelegramSendStatus,
+)
+from .signals import notification_outbox_attempted, telegram_profiles_deactivated
+from .telegram import TelegramSendResult, send_telegram_messages
+
+
+def retry_delay(result: TelegramSendResult, retries: int) -> int:
+    """
+    Задержка перед повтором (в секундах).
+    Экспоненциальный backoff TELEGRAM_RETRY_BASE_DELAY * 2^retries,
+    но не меньше retry_after из ответа 429 и не больше TELEGRAM_RETRY_MAX_DELAY.
+    :param retries: сколько повторов уже было
+    """
+    backoff = settings.TELEGRAM_RETRY_BASE_DELAY * 2**retries
+    delay = max(backoff, result.retry_after or 0)
+    return min(delay, settings.TELEGRAM_RETRY_MAX_DELAY)
+
+
+def make_dead_letter(
+    chat_id: str, text: str, result: TelegramSendResult, attempts: int
+) -> TelegramDeadLetter:
+    """
+    Несохранённая запись dead-letter по результату отправки.
+    """
+    return TelegramDeadLetter(
+        chat_id=chat_id,
+        text=text,
+        status=result.status,
+        error_code=result.error_code,
+        description=result.description,
+        attempts=attempts,
+    )
+
+
+def deactivate_unreachable_chats(reasons: dict[str, str]) -> int:
+    """
+    Отключает Telegram-профили недоступных чатов одним UPDATE.
+    В deactivation_reason записывается описание ошибки Telegram для каждого чата.
+    После обновления отправляется сигнал telegram_profiles_deactivated,
+    чтобы зависимые данные (индекс напоминаний привычек) тоже обновились.
+    :param reasons: chat_id → причина (description из ответа Telegram)
+    :return: сколько профилей отключено
+    """
+    if not reasons:
+        return 0
+
+    profiles = TelegramProfile.objects.filter(chat_id__in=reasons, is_active=True)
+    user_ids = list(profiles.values_list("user_id", flat=True))
+
+    deactivated = profiles.update(
+        is_active=False,
+        deactivated_at=timezone.now(),
+        deactivation_reason=Case(
+            *[
+                When(chat_id=chat_id, then=Value(reason[:255]))
+                for chat_id, reason in reasons.items()
+            ],
+            default=Value(""),
+            output_field=CharField(),
+        ),
+    )
+
+    if user_ids:
+        telegram_profiles_deactivated.send(sender=TelegramProfile, user_ids=user_ids)
+    return deactivated
+
+
+def unreachable_reason(result: TelegramSendResult) -> str:
+    """
+    Причина отключения профиля для записи в TelegramProfile.deactivation_reason.
+    """
+    return f"{result.error_code}: {result.description}".strip()
+
+
+def kick_outbox_drainers(
+    queued: int, not_before: datetime.datetime | None = None
+) -> int:
+    """
+    Запускает отправителей для только что записанных в очередь сообщений:
+    по одному на NOTIFICATION_OUTBOX_BATCH_SIZE строк, не больше
+    NOTIFICATION_OUTBOX_DRAINERS. Вызывать после коммита записи.
+    :param not_before: not_before записанных строк — отправители стартуют
+                       не раньше него (по умолчанию — сразу)
+    :return: сколько задач поставлено
+    """
+    batches = -(-queued // settings.NOTIFICATION_OUTBOX_BATCH_SIZE)
+    drainers = min(batches, settings.NOTIFICATION_OUTBOX_DRAINERS)
+    countdown = 0.0
+    if not_before is not None:
+        countdown = max(0.0, (not_before - timezone.now()).total_seconds())
+    for _ in range(drainers):
+        drain_notification_outbox.apply_async(countdown=countdown)
+    return drainers
+
+
+def deliver_outbox_batch(rows: list[NotificationOutbox]) -> int:
+    """
+    Отправляет пачку строк очереди и записывает итог:
+    - успех и DISABLED → строка удаляется;
+    - временная ошибка → повтор той же строкой через retry_delay,
+      пока не исчерпан TELEGRAM_RETRY_MAX_RETRIES;
+    - иначе → TelegramDeadLetter (+ отключение недоступных чатов),
+      строка удаляется.
+    Итоговые результаты (всё, кроме повторов) передаются отправителям
+    сигналом notification_outbox_attempted.
+    :return: количество попыток отправки
+    """
+    now = timezone.now()
+    done: list[int] = []
+    retries: list[NotificationOutbox] = []
+    dead_letters: list[TelegramDeadLetter] = []
+    unreachable: dict[str, str] = {}
+    results: list[tuple[dict, TelegramSendResult]] = []
+    attempts = 0
+
+    messages = ((row.recipient, row.payload["text"], row) for row in rows)
+    for (chat_id, text, row), result in send_telegram_messages(messages):
+        attempts += 1
+        if result.status == TelegramSendStatus.CIRCUIT_OPEN:
+            # Запрос не выполнялся — попытка не засчитывается
+            row.attempts -= 1
+        if result.retryable and row.attempts <= settings.TELEGRAM_RETRY_MAX_RETRIES:
+            row.not_before = now + datetime.timedelta(
+                seconds=retry_delay(result, max(row.attempts - 1, 0))
+            )
+            retries.append(row)
+            continue
+        results.append((row.payload, result))
+        done.append(row.pk)
+        if not result.ok and result.status != TelegramSendStatus.DISABLED:
+            dead_letters.append(
+                make_dead_letter(chat_id, text, result, attempts=row.attempts)
+            )
+            if result.chat_unreachable:
+                unreachable[chat_id] = unreachable_reason(result)
+
+    # Итог пачки фиксируется целиком: упавший посередине отправитель не
+    # оставит удалённых строк без dead-letter или отключения чата
+    with transaction.atomic():
+        NotificationOutbox.objects.filter(id__in=done).delete()
+        NotificationOutbox.objects.bulk_update(retries, ["attempts", "not_before"])
+        TelegramDeadLetter.objects.bulk_create(dead_letters)
+        deactivate_unreachable_chats(unreachable)
+    notification_outbox_attempted.send(sender=NotificationOutbox, results=results)
+
+    if retries:
+        drain_notification_outbox.apply_async(
+            countdown=min((row.not_before - now).total_seconds() for row in retries)
+        )
+    return attempts
+
+
+@shared_task(name="notifications.tasks.drain_notification_outbox")
+def drain_notification_outbox() -> int:
+    """
+    Отправитель очереди исходящих уведомлений.
+    Забирает пачки по NOTIFICATION_OUTBOX_BATCH_SIZE (SKIP LOCKED), пока
+    очередь не опустеет; параллельные отправители делят строки между собой.
+    Запускается рассылками после записи в очередь и Celery Beat — подбирать
+    повторы и строки упавших отправителей. Пока размыкатель Bot API
+    разомкнут, строки не забираются: их подберёт следующий запуск.
+    Возвращает:
+        int: количество попыток отправки.
+    """
+    attempts = 0
+    if get_circuit_breaker().snapshot().retry_in > 0:
+        return attempts
+    while rows := NotificationOutbox.claim_batch(
+        settings.NOTIFICATION_OUTBOX_BATCH_SIZE
+    ):
+        attempts += deliver_outbox_batch(rows)
+    return attempts
+
+
+def replay_dead_letters(queryset) -> int:
+    """
+    Массово ставит недоставленные сообщения на повторную отправку:
+    в одной транзакции пишет их в очередь NotificationOutbox и отмечает
+    replayed_at, затем запускает отправителей очереди (размыкатель,
+    ограничитель и повторы — как у любой строки очереди).
+    Уже переотправленные записи (replayed_at задан) пропускаются;
+    строки блокируются, поэтому параллельный replay их не продублирует.
+    :param queryset: QuerySet TelegramDeadLetter
+    :return: сколько сообщений поставлено в очередь
+    """
+    with transaction.atomic():
+        letters = list(
+            queryset.filter(replayed_at__isnull=True)
+            .select_for_update(skip_locked=True)
+            .values_list("id", "chat_id", "text")
+        )
+        now = timezone.now()
+        NotificationOutbox.objects.bulk_create(
+            [
+                NotificationOutbox(
+                    recipient=chat_id, not_before=now, payload={"text": text}
+                )
+                for _letter_id, chat_id, text in letters
+            ]
+        )
+        TelegramDeadLetter.objects.filter(
+            id__in=[letter_id for letter_id, _chat_id, _text in letters]
+        ).update(replayed_at=now)
+
+    kick_outbox_drainers(len(letters))
+    return len(letters)
+
+
+@shared_task(name="notifications.tasks.process_telegram_update")
+def process_telegram_update(update: dict) -> None:
+    """
+    Обрабатывает update Telegram, принятый webhook-ом
+    (TelegramWebhookAPIView отвечает Telegram сразу, не дожидаясь обработки).
+    """
+    handle_update(update)
+
+
+@shared_task(name="notifications.tasks.prune_processed_updates")
+def prune_processed_updates() -> int:
+    """
+    Удаляет записи журнала обработанных обновлений Telegram старше
+    TELEGRAM_PROCESSED_UPDATES_RETENTION_HOURS.
+    Возвращает:
+        int: сколько записей удалено.
+    """
+    cutoff = timezone.now() - datetime.timedelta(
+        hours=settings.TELEGRAM_PROCESSED_UPDATES_RETENTION_HOURS
+    )
+    deleted, _ = TelegramProcessedUpdate.objects.filter(
+        processed_at__lt=cutoff
+    ).delete()
+    return deleted
@@ -5,50 +5,382 @@ Telegram-интеграция.
 Используется:
 - Celery-задачами (напоминания о привычках);
 - может быть использовано и в синхронных сценариях (по желанию).
+Все запросы к Bot API (рассылка, бот привязки) идут через общий для процесса
+TelegramClient: одна keep-alive сессия с пулом соединений
+(TELEGRAM_HTTP_POOL_SIZE) вместо нового TCP+TLS соединения на каждый запрос
+и отдельные таймауты для отправки и long polling.
+Для массовой рассылки есть `send_telegram_messages`: сообщения отправляются
+конкурентно через этот пул, а результаты отдаются потоково по мере готовности.
+Перед каждым запросом отправитель ждёт токен в ограничителе частоты
+(notifications.ratelimit): лимиты Telegram общие для всех воркеров.
+Ошибки отправки классифицируются (TelegramSendResult): временные
+(сеть, 429, 5xx) повторяются Celery-задачей notifications.tasks,
+постоянные (прочие 4xx) попадают в TelegramDeadLetter.
+Запросы идут через общий размыкатель (notifications.circuitbreaker):
+пока Bot API недоступен, отправка сразу получает CIRCUIT_OPEN вместо
+ожидания таймаута.
 """
 
-from typing import Optional
+import math
+from collections.abc import Iterable, Iterator
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from typing import Any, NamedTuple, Optional, TypeVar
 
 import requests
 from django.conf import settings
+from requests.adapters import HTTPAdapter
 
+from config.backends import ProcessSingleton
 
-def send_telegram_message(chat_id: str, text: str) -> bool:
+from .circuitbreaker import get_circuit_breaker
+from .models import TelegramSendStatus
+from .ratelimit import get_rate_limiter
+
+# Максимальная длина текста одного сообщения Telegram Bot API
+TELEGRAM_MAX_MESSAGE_LENGTH = 4096
+
+# Сообщение пакетной рассылки: кортеж (chat_id, text, ...)
+M = TypeVar("M", bound=tuple)
+
+
+class TelegramSendResult(NamedTuple):
     """
-    Отправляет сообщение пользователю в Telegram.
-    Использует Telegram Bot API метод `sendMessage`.
+    Результат одной отправки в Telegram с классификацией ошибки.
+    status — значение TelegramSendStatus; retry_after — задержка из
+    `parameters.retry_after` ответа 429; message_id — id сообщения при успехе.
+    """
+
+    status: str
+    error_code: Optional[int] = None
+    description: str = ""
+    retry_after: Optional[int] = None
+    message_id: Optional[int] = None
+
+    @property
+    def ok(self) -> bool:
+        return self.status == TelegramSendStatus.OK
+
+    @property
+    def retryable(self) -> bool:
+        """
+        Имеет ли смысл повторить отправку позже (сеть, 429, 5xx).
+        """
+        return self.status in RETRYABLE_STATUSES
+
+    @property
+    def chat_unreachable(self) -> bool:
+        """
+        Чат больше недоступен для бота и повторять отправку туда бессмысленно:
+        - 403 (бот заблокирован пользователем, удалён из чата, аккаунт удалён);
+        - 400 "chat not found".
+        """
+        if self.status != TelegramSendStatus.PERMANENT:
+            return False
+        if self.error_code == 403:
+            return True
+        return self.error_code == 400 and "chat not found" in self.description.lower()
+
+
+RETRYABLE_STATUSES = frozenset(
+    {
+        TelegramSendStatus.NETWORK_ERROR,
+        TelegramSendStatus.RATE_LIMITED,
+        TelegramSendStatus.SERVER_ERROR,
+        TelegramSendStatus.CIRCUIT_OPEN,
+    }
+)
+
+# Ошибки, по которым размыкатель считает Bot API недоступным
+BREAKER_FAILURE_STATUSES = frozenset(
+    {TelegramSendStatus.NETWORK_ERROR, TelegramSendStatus.SERVER_ERROR}
+)
+
+
+def parse_telegram_response(response) -> TelegramSendResult:
+    """
+    Классифицирует ответ Telegram Bot API.
+    - ok=true → OK (+ message_id);
+    - 429 → RATE_LIMITED (+ parameters.retry_after);
+    - 5xx или неизвестный код → SERVER_ERROR (временная ошибка);
+    - прочие 4xx → PERMANENT (повтор не поможет).
+    """
+    try:
+        data = response.json()
+    except ValueError:
+        data = {}
+
+    if data.get("ok"):
+        result = data.get("result")
+        message_id = result.get("message_id") if isinstance(result, dict) else None
+        return TelegramSendResult(TelegramSendStatus.OK, message_id=message_id)
+
+    error_code = data.get("error_code")
+    if not isinstance(error_code, int):
+        status_code = getattr(response, "status_code", None)
+        error_code = status_code if isinstance(status_code, int) else None
+
+    description = str(data.get("description") or "")[:255]
+    parameters = data.get("parameters") or {}
+
+    if error_code == 429:
+        return TelegramSendResult(
+            TelegramSendStatus.RATE_LIMITED,
+            error_code=error_code,
+            description=description,
+            retry_after=parameters.get("retry_after"),
+        )
+    if error_code is None or error_code >= 500:
+        return TelegramSendResult(
+            TelegramSendStatus.SERVER_ERROR,
+            error_code=error_code,
+            description=description,
+        )
+    return TelegramSendResult(
+        TelegramSendStatus.PERMANENT, error_code=error_code, description=description
+    )
+
+
+class TelegramAPIError(Exception):
+    """
+    Bot API вернул ошибку или не ответил.
+    result — классифицированный ответ (error_code, retry_after, ...).
+    """
+
+    def __init__(self, result: TelegramSendResult) -> None:
+        super().__init__(f"{result.status} {result.error_code}: {result.description}")
+        self.result = result
+
+
+def build_telegram_session(pool_size: int) -> requests.Session:
+    """
+    Создаёт HTTP-сессию с keep-alive пулом соединений к Telegram Bot API.
+    pool_block=True не даёт открыть больше pool_size соединений одновременно.
+    :param pool_size: максимальное число соединений в пуле
+    """
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size, pool_block=True)
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    return session
+
+
+class TelegramClient:
+    """
+    Клиент Telegram Bot API поверх одной keep-alive сессии.
+    Потокобезопасен: сессию делят потоки рассылки (send_telegram_messages).
+    Таймауты:
+    - connect_timeout — установка соединения (для всех методов);
+    - send_timeout — ожидание ответа на sendMessage;
+    - poll_timeout — long polling getUpdates: столько ждёт сервер Telegram,
+      клиент — на несколько секунд дольше.
+    """
+
+    # Запас к poll_timeout на ответ сервера после окончания long polling
+    POLL_READ_MARGIN = 5
+
+    def __init__(
+        self,
+        token: str,
+        base_url: str,
+        pool_size: int,
+        connect_timeout: float,
+        send_timeout: float,
+        poll_timeout: int,
+    ) -> None:
+        self._base_url = f"{base_url}/bot{token}"
+        self.session = build_telegram_session(pool_size)
+        self.connect_timeout = connect_timeout
+        self.send_timeout = send_timeout
+        self.poll_timeout = poll_timeout
+
+    def call(
+        self, method: str, payload: dict[str, Any], read_timeout: float
+    ) -> tuple[TelegramSendResult, Any]:
+        """
+        Вызывает метод Bot API.
+        :return: (классифицированный результат, поле result ответа при успехе)
+        """
+        try:
+            response = self.session.post(
+                f"{self._base_url}/{method}",
+                json=payload,
+                timeout=(self.connect_timeout, read_timeout),
+            )
+        except Exception as exc:
+            # Любая ошибка транспорта (network / timeout) → временная ошибка
+            return (
+                TelegramSendResult(
+                    TelegramSendStatus.NETWORK_ERROR, description=str(exc)[:255]
+                ),
+                None,
+            )
+
+        result = parse_telegram_response(response)
+        if not result.ok:
+            return result, None
+        return result, response.json().get("result")
+
+    def send_message(
+        self, chat_id: str | int, text: str, parse_mode: Optional[str] = "HTML"
+    ) -> TelegramSendResult:
+        """
+        sendMessage без ограничителя частоты и размыкателя
+        (их добавляет deliver_telegram_message).
+        """
+        payload: dict[str, Any] = {"chat_id": str(chat_id), "text": text}
+        if parse_mode:
+            payload["parse_mode"] = parse_mode
+        result, _ = self.call("sendMessage", payload, self.send_timeout)
+        return result
+
+    def get_updates(
+        self, offset: Optional[int] = None, timeout: Optional[int] = None
+    ) -> list[dict[str, Any]]:
+        """
+        getUpdates (long polling).
+        :param offset: первый update_id, который нужно получить
+        :param timeout: время long polling (по умолчанию poll_timeout)
+        :raises TelegramAPIError: ошибка API или сети
+        """
+        timeout = self.poll_timeout if timeout is None else timeout
+        payload: dict[str, Any] = {"timeout": timeout}
+        if offset is not None:
+            payload["offset"] = offset
+        result, updates = self.call(
+            "getUpdates", payload, timeout + self.POLL_READ_MARGIN
+        )
+        if not result.ok:
+            raise TelegramAPIError(result)
+        return updates or []
+
+    def set_webhook(
+        self, url: str, secret_token: str, allowed_updates: Optional[list[str]] = None
+    ) -> TelegramSendResult:
+        """
+        setWebhook: Telegram начнёт присылать обновления на url с заголовком
+        X-Telegram-Bot-Api-Secret-Token: secret_token.
+        """
+        payload: dict[str, Any] = {"url": url, "secret_token": secret_token}
+        if allowed_updates is not None:
+            payload["allowed_updates"] = allowed_updates
+        result, _ = self.call("setWebhook", payload, self.send_timeout)
+        return result
+
+    def delete_webhook(self) -> TelegramSendResult:
+        """
+        deleteWebhook: вернуться к получению обновлений через getUpdates.
+        """
+        result, _ = self.call("deleteWebhook", {}, self.send_timeout)
+        return result
+
+
+def build_telegram_client() -> TelegramClient:
+    """
+    Создаёт клиент Bot API по настройкам TELEGRAM_*.
+    """
+    return TelegramClient(
+        token=settings.TELEGRAM_BOT_TOKEN,
+        base_url=settings.TELEGRAM_API_URL,
+        pool_size=settings.TELEGRAM_HTTP_POOL_SIZE,
+        connect_timeout=settings.TELEGRAM_CONNECT_TIMEOUT,
+        send_timeout=settings.TELEGRAM_SEND_TIMEOUT,
+        poll_timeout=settings.TELEGRAM_POLL_TIMEOUT,
+    )
+
+
+# Общий для процесса клиент Bot API (создаётся лениво, один раз);
+# при сбросе его пул соединений закрывается
+telegram_client = ProcessSingleton(
+    build_telegram_client, close=lambda client: client.session.close()
+)
+get_telegram_client = telegram_client.get
+reset_telegram_client = telegram_client.reset
+
+
+def deliver_telegram_message(chat_id: str, text: str) -> TelegramSendResult:
+    """
+    Отправляет сообщение в Telegram и возвращает классифицированный результат.
+    Использует Telegram Bot API метод `sendMessage` через общий TelegramClient.
     :param chat_id: Telegram chat_id пользователя
     :param text: Текст сообщения (поддерживается HTML-разметка)
+    Поведение:
+    - если TELEGRAM_BOT_TOKEN не задан → DISABLED (без запроса)
+    - размыкатель разомкнут → CIRCUIT_OPEN с retry_after до следующей пробы
+      (без запроса и без ожидания лимитов)
+    - перед запросом ждёт свободный слот в лимитах Telegram (глобальный + на чат)
+    - сетевая ошибка / таймаут → NETWORK_ERROR
+    - ответ API → см. parse_telegram_response
+    """
+
+    # Если бот не настроен — ничего не отправляем
+    if not settings.TELEGRAM_BOT_TOKEN:
+        return TelegramSendResult(
+            TelegramSendStatus.DISABLED, description="TELEGRAM_BOT_TOKEN не задан"
+        )
+
+    breaker = get_circuit_breaker()
+    decision = breaker.before_request()
+    if not decision.allowed:
+        return TelegramSendResult(
+            TelegramSendStatus.CIRCUIT_OPEN,
+            description="Bot API недоступен, отправка отложена",
+            retry_after=math.ceil(decision.retry_in),
+        )
+
+    get_rate_limiter().acquire(str(chat_id))
+
+    result = get_telegram_client().send_message(chat_id, text)
+
+    breaker.record(decision, success=result.status not in BREAKER_FAILURE_STATUSES)
+    return result
+
+
+def send_telegram_message(chat_id: str, text: str) -> bool:
+    """
+    Отправляет сообщение пользователю в Telegram.
+    Упрощённая обёртка над deliver_telegram_message.
     :return: True — если сообщение успешно отправлено,
              False — если произошла ошибка или бот не настроен
-    Поведение:
-    - если TELEGRAM_BOT_TOKEN не задан → сразу False
-    - при сетевой ошибке / ошибке API → False
     """
+    return deliver_telegram_message(chat_id, text).ok
 
-    token: Optional[str] = settings.TELEGRAM_BOT_TOKEN
-    base_url: str = settings.TELEGRAM_API_URL
 
-    # Если бот не настроен — ничего не отправляем
-    if not token:
-        return False
+def send_telegram_messages(
+    messages: Iterable[M], concurrency: Optional[int] = None
+) -> Iterator[tuple[M, TelegramSendResult]]:
+    """
+    Конкурентно отправляет пачку сообщений и потоково возвращает результаты.
+    Работает как конвейер producer/consumer:
+    - `messages` читается лениво (можно передать генератор по QuerySet),
+      поэтому отправка начинается до того, как перебран весь источник;
+    - одновременно в работе не больше 2 * concurrency сообщений —
+      память не растёт с размером рассылки;
+    - все запросы идут через пул keep-alive соединений общего TelegramClient.
+    :param messages: кортежи (chat_id, text, ...); элементы после text не
+                     используются и возвращаются вызывающему как есть
+                     (например, id записи, к которой относится сообщение)
+    :param concurrency: число параллельных запросов
+                        (по умолчанию TELEGRAM_SEND_CONCURRENCY)
+    :return: итератор (message, result) в порядке завершения отправки
+    """
+    concurrency = concurrency or settings.TELEGRAM_SEND_CONCURRENCY
+    max_in_flight = concurrency * 2
 
-    url = f"{base_url}/bot{token}/sendMessage"
+    def send_one(message: M) -> tuple[M, TelegramSendResult]:
+        chat_id, text = message[0], message[1]
+        return message, deliver_telegram_message(chat_id, text)
 
-    payload = {
-        "chat_id": chat_id,
-        "text": text,
-        "parse_mode": "HTML",
-    }
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        pending: set[Future] = set()
 
-    try:
-        response = requests.post(
-            url,
-            json=payload,
-            timeout=10,
-        )
-        data = response.json()
-        return bool(data.get("ok"))
-    except Exception:
-        # Любая ошибка (network / JSON / timeout) → считаем отправку неуспешной
-        return False
+        for message in messages:
+            if len(pending) >= max_in_flight:
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    yield future.result()
+            pending.add(executor.submit(send_one, message))
+
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                yield future.result()
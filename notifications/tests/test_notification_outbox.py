@@ -0,0 +1,122 @@
+"""
+Тесты очереди исходящих уведомлений (NotificationOutbox).
+Проверяется:
+- claim_batch() не отдаёт забранные строки повторно, пока не истекла
+  видимость, и не отдаёт строки с будущим not_before;
+- временная ошибка оставляет строку в очереди: attempts растёт,
+  not_before сдвигается на задержку повтора;
+- исчерпанные повторы и постоянные ошибки уходят в dead-letter,
+  строка удаляется;
+- шард напоминаний пишет сообщения в очередь, а итог отправки
+  попадает в журнал ReminderDelivery.
+Реальный Telegram API не используется.
+"""
+
+import datetime
+from unittest.mock import patch
+
+import pytest
+from django.utils import timezone
+
+from notifications.models import (
+    NotificationOutbox,
+    TelegramDeadLetter,
+    TelegramSendStatus,
+)
+from notifications.tasks import deliver_outbox_batch
+from notifications.telegram import TelegramSendResult
+
+pytestmark = pytest.mark.django_db
+
+
+def make_row(chat_id: str = "555", **kwargs) -> NotificationOutbox:
+    return NotificationOutbox.objects.create(
+        recipient=chat_id, payload={"text": "Пора!"}, **kwargs
+    )
+
+
+def deliver(result: TelegramSendResult):
+    rows = NotificationOutbox.claim_batch(10)
+    with (
+        patch("notifications.telegram.deliver_telegram_message", return_value=result),
+        patch("notifications.tasks.drain_notification_outbox.apply_async"),
+    ):
+        return deliver_outbox_batch(rows)
+
+
+def test_claimed_rows_are_hidden_until_visibility_expires(settings):
+    settings.NOTIFICATION_OUTBOX_VISIBILITY_SECONDS = 60
+    now = timezone.now()
+    ready = make_row(not_before=now)
+    make_row(not_before=now + datetime.timedelta(minutes=5))
+
+    claimed = NotificationOutbox.claim_batch(10, now)
+
+    assert [row.id for row in claimed] == [ready.id]
+    assert claimed[0].attempts == 1
+    assert claimed[0].payload == {"text": "Пора!"}
+    assert NotificationOutbox.claim_batch(10, now) == []
+    later = NotificationOutbox.claim_batch(10, now + datetime.timedelta(seconds=61))
+    assert [row.id for row in later] == [ready.id]
+
+
+def test_retryable_failure_reschedules_row(settings):
+    settings.TELEGRAM_RETRY_BASE_DELAY = 10
+    row = make_row()
+
+    deliver(TelegramSendResult(TelegramSendStatus.RATE_LIMITED, retry_after=30))
+
+    row.refresh_from_db()
+    assert row.attempts == 1
+    assert row.not_before > timezone.now() + datetime.timedelta(seconds=25)
+    assert not TelegramDeadLetter.objects.exists()
+
+
+def test_exhausted_retries_go_to_dead_letter(settings):
+    settings.TELEGRAM_RETRY_MAX_RETRIES = 1
+    make_row(attempts=1)
+
+    deliver(TelegramSendResult(TelegramSendStatus.SERVER_ERROR, error_code=502))
+
+    assert not NotificationOutbox.objects.exists()
+    dead_letter = TelegramDeadLetter.objects.get()
+    assert dead_letter.attempts == 2
+    assert dead_letter.error_code == 502
+
+
+def test_permanent_failure_goes_to_dead_letter():
+    make_row()
+
+    deliver(TelegramSendResult(TelegramSendStatus.PERMANENT, error_code=400))
+
+    assert not NotificationOutbox.objects.exists()
+    assert TelegramDeadLetter.objects.get().attempts == 1
+
+
+def test_reminder_shard_sends_through_outbox(user):
+    from habits.models import Habit, ReminderDelivery
+    from habits.tasks import send_habit_reminders_shard
+    from notifications.models import TelegramProfile
+
+    TelegramProfile.objects.create(user=user, chat_id="555", is_active=True)
+    habit = Habit.objects.create(
+        user=user,
+        action="Гулять",
+        time=datetime.time(9, 0),
+        periodicity=1,
+        duration=datetime.timedelta(seconds=60),
+    )
+    due = timezone.now() - datetime.timedelta(minutes=1)
+    Habit.objects.filter(pk=habit.pk).update(next_due_at=due)
+
+    with patch(
+        "notifications.telegram.deliver_telegram_message",
+        return_value=TelegramSendResult(TelegramSendStatus.OK, message_id=42),
+    ) as send_mock:
+        assert send_habit_reminders_shard([habit.id]) == 1
+
+    assert send_mock.call_args.args[0] == "555"
+    assert not NotificationOutbox.objects.exists()
+    delivery = ReminderDelivery.objects.get(habit=habit)
+    assert delivery.status == TelegramSendStatus.OK
+    assert delivery.message_id == 42
@@ -0,0 +1,104 @@
+"""
+Тесты конкурентной обработки пачки обновлений бота (process_update_batch).
+Проверяют:
+- обновления разных чатов обрабатываются параллельно, но не больше
+  заданного числа одновременно;
+- обновления одного чата обрабатываются строго по порядку update_id;
+- ошибка обновления останавливает только его чат (следующие обновления
+  чата не обрабатываются), а offset сдвигается только до первого
+  упавшего обновления.
+Обработчик подменяется — БД и Telegram API не используются.
+"""
+
+import asyncio
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from notifications.bot import next_update_offset, process_update_batch
+
+
+def make_update(update_id: int, chat_id: int) -> dict:
+    return {
+        "update_id": update_id,
+        "message": {"chat": {"id": chat_id}, "text": f"msg {update_id}"},
+    }
+
+
+class RecordingHandler:
+    """
+    Блокирующий обработчик: запоминает порядок и пик параллельности.
+    """
+
+    def __init__(self, delay: float = 0.02, fail_on: int | None = None) -> None:
+        self.delay = delay
+        self.fail_on = fail_on
+        self.lock = threading.Lock()
+        self.running = 0
+        self.peak = 0
+        self.done: list[int] = []
+
+    def __call__(self, update: dict) -> None:
+        with self.lock:
+            self.running += 1
+            self.peak = max(self.peak, self.running)
+        time.sleep(self.delay)
+        with self.lock:
+            self.running -= 1
+            self.done.append(update["update_id"])
+        if update["update_id"] == self.fail_on:
+            raise RuntimeError("boom")
+
+
+def run_batch(
+    updates: list[dict], handler: RecordingHandler, concurrency: int
+) -> set[int]:
+    with ThreadPoolExecutor(max_workers=8) as executor:
+        return asyncio.run(
+            process_update_batch(updates, executor, concurrency, handler)
+        )
+
+
+def test_chats_run_concurrently_within_limit():
+    handler = RecordingHandler()
+    updates = [make_update(update_id, chat_id=update_id) for update_id in range(6)]
+
+    run_batch(updates, handler, concurrency=3)
+
+    assert sorted(handler.done) == list(range(6))
+    assert 1 < handler.peak <= 3
+
+
+def test_updates_of_one_chat_keep_order():
+    handler = RecordingHandler()
+    updates = [
+        make_update(4, chat_id=1),
+        make_update(1, chat_id=1),
+        make_update(2, chat_id=2),
+        make_update(3, chat_id=1),
+    ]
+
+    run_batch(updates, handler, concurrency=4)
+
+    assert [u for u in handler.done if u != 2] == [1, 3, 4]
+
+
+def test_failed_update_stops_only_its_chat():
+    handler = RecordingHandler(delay=0, fail_on=1)
+    updates = [
+        make_update(1, chat_id=1),
+        make_update(2, chat_id=1),
+        make_update(3, chat_id=2),
+    ]
+
+    assert run_batch(updates, handler, concurrency=2) == {3}
+
+    assert sorted(handler.done) == [1, 3]
+
+
+def test_offset_stops_at_first_failed_update():
+    updates = [make_update(update_id, chat_id=update_id) for update_id in (5, 6, 7)]
+
+    assert next_update_offset(updates, {5, 6, 7}) == 8
+    assert next_update_offset(updates, {5, 7}) == 6
+    assert next_update_offset(updates, set()) == 5
@@ -0,0 +1,182 @@
+"""
+Тесты размыкателя Bot API (notifications.circuitbreaker).
+Запросы идут в локальный поддельный сервер Telegram (http.server в потоке).
+Проверяется:
+- после порога доли ошибок цепь размыкается и отправка сразу получает
+  CIRCUIT_OPEN с retry_after, не обращаясь к серверу;
+- 4xx (живой API) цепь не размыкают;
+- после паузы проходит одна пробная отправка: успех замыкает цепь,
+  неудача снова размыкает;
+- пока цепь разомкнута, отправители очереди её не разбирают;
+- состояние доступно администраторам через API метрик.
+"""
+
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from unittest.mock import patch
+
+import pytest
+
+from notifications.circuitbreaker import (
+    CLOSED,
+    HALF_OPEN,
+    OPEN,
+    BreakerPolicy,
+    CircuitBreaker,
+    InMemoryBreakerBackend,
+)
+from notifications.models import NotificationOutbox, TelegramSendStatus
+from notifications.telegram import deliver_telegram_message
+
+pytestmark = pytest.mark.django_db
+
+POLICY = BreakerPolicy(
+    failure_rate=0.5, min_requests=4, window=60, open_seconds=30, half_open_probes=1
+)
+
+
+class FakeTelegram(ThreadingHTTPServer):
+    """
+    Поддельный Bot API: отвечает кодом self.error_code (None — успех)
+    и считает запросы sendMessage.
+    """
+
+    error_code = None
+    requests = 0
+
+
+class FakeTelegramHandler(BaseHTTPRequestHandler):
+    def do_POST(self) -> None:
+        self.rfile.read(int(self.headers["Content-Length"]))
+        self.server.requests += 1
+        error_code = self.server.error_code
+        if error_code is None:
+            status, body = 200, {"ok": True, "result": {"message_id": 1}}
+        else:
+            status, body = error_code, {"ok": False, "error_code": error_code}
+        data = json.dumps(body).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, *args) -> None:
+        pass
+
+
+class FakeClock:
+    def __init__(self) -> None:
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+@pytest.fixture
+def fake_telegram(settings):
+    server = FakeTelegram(("127.0.0.1", 0), FakeTelegramHandler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    settings.TELEGRAM_BOT_TOKEN = "test_token"
+    settings.TELEGRAM_API_URL = f"http://127.0.0.1:{server.server_address[1]}"
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+@pytest.fixture
+def clock():
+    return FakeClock()
+
+
+@pytest.fixture
+def breaker(clock):
+    breaker = CircuitBreaker(InMemoryBreakerBackend(clock=clock), "bot_api", POLICY)
+    with patch("notifications.telegram.get_circuit_breaker", return_value=breaker):
+        yield breaker
+
+
+def send_many(count: int) -> list[str]:
+    return [deliver_telegram_message(str(i), "text").status for i in range(count)]
+
+
+def test_breaker_opens_on_failure_rate_and_fails_fast(fake_telegram, breaker):
+    fake_telegram.error_code = 502
+
+    assert send_many(4) == [TelegramSendStatus.SERVER_ERROR] * 4
+    assert breaker.snapshot().state == OPEN
+
+    result = deliver_telegram_message("100", "text")
+
+    assert result.status == TelegramSendStatus.CIRCUIT_OPEN
+    assert result.retryable is True
+    assert result.retry_after == 30
+    assert fake_telegram.requests == 4
+
+
+def test_client_errors_do_not_open_breaker(fake_telegram, breaker):
+    fake_telegram.error_code = 403
+
+    send_many(6)
+
+    assert breaker.snapshot().state == CLOSED
+    assert fake_telegram.requests == 6
+
+
+def test_half_open_probe_closes_or_reopens(fake_telegram, breaker, clock):
+    fake_telegram.error_code = 502
+    send_many(4)
+
+    clock.now = 31
+    assert deliver_telegram_message("1", "text").status == (
+        TelegramSendStatus.SERVER_ERROR
+    )
+    assert breaker.snapshot().state == OPEN
+
+    clock.now = 62
+    fake_telegram.error_code = None
+    probe = breaker.before_request()
+    assert probe.probe is True
+    assert breaker.snapshot().state == HALF_OPEN
+    assert breaker.before_request().allowed is False
+    breaker.record(probe, success=True)
+
+    assert send_many(3) == [TelegramSendStatus.OK] * 3
+    assert breaker.snapshot().state == CLOSED
+
+
+def test_drainer_skips_outbox_while_open(breaker):
+    from notifications.tasks import drain_notification_outbox
+
+    row = NotificationOutbox.objects.create(recipient="1", payload={"text": "Пора!"})
+    for _ in range(4):
+        breaker.record(breaker.before_request(), success=False)
+
+    with patch("notifications.tasks.get_circuit_breaker", return_value=breaker), patch(
+        "notifications.telegram.deliver_telegram_message"
+    ) as send_mock:
+        assert drain_notification_outbox() == 0
+
+    send_mock.assert_not_called()
+    row.refresh_from_db()
+    assert row.attempts == 0
+
+
+def test_breaker_metrics_endpoint_is_admin_only(api_client, user):
+    response = api_client.get("/api/telegram/breaker/")
+    assert response.status_code in (401, 403)
+
+    user.is_staff = True
+    user.save()
+    api_client.force_authenticate(user)
+    response = api_client.get("/api/telegram/breaker/")
+
+    assert response.status_code == 200
+    assert response.json() == {
+        "state": CLOSED,
+        "requests": 0,
+        "failures": 0,
+        "retry_in": 0.0,
+    }
@@ -0,0 +1,83 @@
+"""
+Тесты клиента Telegram Bot API (TelegramClient).
+Проверяют:
+- клиент общий для процесса и держит одну keep-alive сессию;
+- getUpdates использует таймаут long polling, sendMessage — таймаут отправки;
+- ошибка getUpdates поднимается как TelegramAPIError с error_code и retry_after.
+Реальный Telegram API не используется.
+"""
+
+from unittest.mock import Mock, patch
+
+import pytest
+
+from notifications.models import TelegramSendStatus
+from notifications.telegram import TelegramAPIError, get_telegram_client
+
+pytestmark = pytest.mark.django_db
+
+
+@pytest.fixture
+def bot_settings(settings):
+    settings.TELEGRAM_BOT_TOKEN = "test_token"
+    settings.TELEGRAM_API_URL = "https://api.telegram.org"
+    settings.TELEGRAM_CONNECT_TIMEOUT = 3
+    settings.TELEGRAM_SEND_TIMEOUT = 10
+    settings.TELEGRAM_POLL_TIMEOUT = 30
+    return settings
+
+
+def make_response(data: dict, status_code: int = 200) -> Mock:
+    response = Mock()
+    response.json.return_value = data
+    response.status_code = status_code
+    return response
+
+
+def test_client_is_shared_and_reuses_session(bot_settings):
+    client = get_telegram_client()
+
+    assert get_telegram_client() is client
+    with patch.object(
+        client.session, "post", return_value=make_response({"ok": True})
+    ) as post:
+        client.send_message("1", "a")
+        client.send_message("2", "b")
+
+    assert post.call_count == 2
+    assert post.call_args.kwargs["timeout"] == (3, 10)
+
+
+def test_get_updates_uses_long_poll_timeout(bot_settings):
+    client = get_telegram_client()
+    updates = [{"update_id": 7, "message": {"text": "/start"}}]
+
+    with patch.object(
+        client.session,
+        "post",
+        return_value=make_response({"ok": True, "result": updates}),
+    ) as post:
+        assert client.get_updates(offset=7) == updates
+
+    args, kwargs = post.call_args
+    assert args[0] == "https://api.telegram.org/bottest_token/getUpdates"
+    assert kwargs["json"] == {"timeout": 30, "offset": 7}
+    assert kwargs["timeout"] == (3, 35)
+
+
+def test_get_updates_error_carries_retry_after(bot_settings):
+    client = get_telegram_client()
+    response = make_response(
+        {"ok": False, "error_code": 429, "parameters": {"retry_after": 5}},
+        status_code=429,
+    )
+
+    with (
+        patch.object(client.session, "post", return_value=response),
+        pytest.raises(TelegramAPIError) as excinfo,
+    ):
+        client.get_updates()
+
+    assert excinfo.value.result.status == TelegramSendStatus.RATE_LIMITED
+    assert excinfo.value.result.error_code == 429
+    assert excinfo.value.result.retry_after == 5
@@ -0,0 +1,152 @@
+"""
+Тесты привязки Telegram командой /start <token> (handle_update).
+Проверяют:
+- токен захватывается только один раз, повторный /start отклоняется;
+- просроченный токен не захватывается, профиль не создаётся;
+- новый профиль создаётся с настройками по умолчанию;
+- повторная привязка отключённого профиля включает его обратно,
+  сохраняет настройки доставки и снова включает напоминания привычек;
+- чат, уже привязанный к другому пользователю, не перепривязывается:
+  бот отвечает ошибкой, токен остаётся неиспользованным;
+- ответ отправляется после коммита привязки.
+Реальный Telegram API не используется.
+"""
+
+import datetime
+import itertools
+from unittest.mock import patch
+
+import pytest
+from django.db import connection
+from django.utils import timezone
+
+from habits.models import Habit
+from notifications.bot import handle_update
+from notifications.models import (
+    TelegramDeliveryMode,
+    TelegramLinkToken,
+    TelegramProfile,
+)
+
+pytestmark = pytest.mark.django_db
+
+
+update_ids = itertools.count(1)
+
+
+def start(token: str, chat_id: int = 100500, username: str = "alex") -> str:
+    update = {
+        "update_id": next(update_ids),
+        "message": {
+            "chat": {"id": chat_id, "username": username or None},
+            "text": f"/start {token}",
+        },
+    }
+    with patch("notifications.bot.send_message") as send_mock:
+        assert handle_update(update) is True
+    return send_mock.call_args.args[1]
+
+
+def test_token_is_claimed_once(user):
+    link_token = TelegramLinkToken.create_for_user(user=user)
+
+    assert TelegramLinkToken.claim(link_token.token) == (user.id, user.username)
+    assert TelegramLinkToken.claim(link_token.token) is None
+
+    link_token.refresh_from_db()
+    assert link_token.is_used is True
+
+
+def test_expired_token_is_rejected(user):
+    link_token = TelegramLinkToken.create_for_user(user=user)
+    TelegramLinkToken.objects.filter(pk=link_token.pk).update(
+        expires_at=timezone.now() - datetime.timedelta(seconds=1)
+    )
+
+    assert "Сгенерируйте новую ссылку" in start(link_token.token)
+    assert "Сгенерируйте новую ссылку" in start("unknown")
+
+    assert not TelegramProfile.objects.filter(user=user).exists()
+    link_token.refresh_from_db()
+    assert link_token.is_used is False
+
+
+def test_start_creates_profile_with_defaults(user):
+    link_token = TelegramLinkToken.create_for_user(user=user)
+
+    reply = start(link_token.token)
+
+    assert f"привязан к аккаунту {user.username}" in reply
+    profile = TelegramProfile.objects.get(user=user)
+    assert profile.chat_id == "100500"
+    assert profile.username == "alex"
+    assert profile.is_active is True
+    assert profile.time_zone == ""
+    assert profile.delivery_mode == TelegramDeliveryMode.PER_HABIT
+    assert profile.digest_time == datetime.time(8, 0)
+    assert profile.next_digest_at is None
+    assert "уже использованный" in start(link_token.token)
+
+
+def test_relink_reactivates_profile_and_reminders(user):
+    profile = TelegramProfile.objects.create(
+        user=user, chat_id="1", time_zone="Asia/Tokyo"
+    )
+    habit = Habit.objects.create(
+        user=user,
+        action="Читать",
+        time=datetime.time(8, 0),
+        periodicity=1,
+        duration=datetime.timedelta(seconds=60),
+    )
+    TelegramProfile.objects.filter(pk=profile.pk).update(
+        is_active=False,
+        deactivated_at=timezone.now(),
+        deactivation_reason="403: Forbidden",
+    )
+    Habit.objects.filter(pk=habit.pk).update(reminders_enabled=False, next_due_at=None)
+    link_token = TelegramLinkToken.create_for_user(user=user)
+
+    start(link_token.token, chat_id=2, username="")
+
+    profile.refresh_from_db()
+    assert profile.chat_id == "2"
+    assert profile.username == ""
+    assert profile.is_active is True
+    assert profile.deactivated_at is None
+    assert profile.deactivation_reason == ""
+    assert profile.time_zone == "Asia/Tokyo"
+    habit.refresh_from_db()
+    assert habit.reminders_enabled is True
+    assert habit.next_due_at is not None
+
+
+def test_chat_linked_to_another_user_is_rejected(user, user2):
+    TelegramProfile.objects.create(user=user2, chat_id="100500")
+    link_token = TelegramLinkToken.create_for_user(user=user)
+
+    assert "уже привязан к другому аккаунту" in start(link_token.token)
+
+    assert not TelegramProfile.objects.filter(user=user).exists()
+    assert TelegramProfile.objects.get(chat_id="100500").user_id == user2.id
+    link_token.refresh_from_db()
+    assert link_token.is_used is False
+
+
+def test_start_reply_is_sent_after_commit(user):
+    link_token = TelegramLinkToken.create_for_user(user=user)
+    update = {
+        "update_id": 1,
+        "message": {"chat": {"id": 100500}, "text": f"/start {link_token.token}"},
+    }
+    depth = len(connection.atomic_blocks)
+    depths = []
+
+    with patch(
+        "notifications.bot.send_message",
+        side_effect=lambda *args: depths.append(len(connection.atomic_blocks)),
+    ):
+        assert handle_update(update) is True
+
+    assert depths == [depth]
+    assert TelegramProfile.objects.get(user=user).chat_id == "100500"
@@ -0,0 +1,110 @@
+"""
+Тесты автоматического отключения Telegram-профилей недоступных чатов.
+Проверяют:
+- распознавание постоянной недоступности чата (403, 400 chat not found);
+- отключение профилей в конце пачки отправок из очереди с записью причины;
+- синхронизацию индекса напоминаний привычек (reminders_enabled=False);
+- сброс отметки автоотключения, когда пользователь снова включает профиль.
+"""
+
+import datetime
+from unittest.mock import patch
+
+import pytest
+from django.utils import timezone
+
+from habits.models import Habit
+from notifications.models import (
+    NotificationOutbox,
+    TelegramProfile,
+    TelegramSendStatus,
+)
+from notifications.tasks import deliver_outbox_batch
+from notifications.telegram import TelegramSendResult
+
+pytestmark = pytest.mark.django_db
+
+
+def permanent(error_code: int, description: str) -> TelegramSendResult:
+    return TelegramSendResult(
+        TelegramSendStatus.PERMANENT, error_code=error_code, description=description
+    )
+
+
+@pytest.mark.parametrize(
+    ("result", "unreachable"),
+    [
+        (permanent(403, "Forbidden: bot was blocked by the user"), True),
+        (permanent(400, "Bad Request: chat not found"), True),
+        (permanent(400, "Bad Request: message is too long"), False),
+        (TelegramSendResult(TelegramSendStatus.SERVER_ERROR, error_code=502), False),
+    ],
+)
+def test_chat_unreachable_classification(result, unreachable):
+    assert result.chat_unreachable is unreachable
+
+
+def test_failed_sends_deactivate_unreachable_profiles(user, user2):
+    """
+    Профили с 403 / chat not found отключаются, причина сохраняется,
+    привычки владельцев выпадают из индекса напоминаний.
+    Профиль с другой 4xx-ошибкой остаётся активным.
+    """
+    from django.contrib.auth import get_user_model
+
+    user3 = get_user_model().objects.create_user(username="user3", password="pw")
+
+    TelegramProfile.objects.create(user=user, chat_id="1", is_active=True)
+    TelegramProfile.objects.create(user=user2, chat_id="2", is_active=True)
+    TelegramProfile.objects.create(user=user3, chat_id="3", is_active=True)
+    habit = Habit.objects.create(
+        user=user,
+        action="Читать",
+        time=datetime.time(8, 0),
+        periodicity=1,
+        duration=datetime.timedelta(seconds=60),
+    )
+    assert habit.reminders_enabled is True
+
+    results = {
+        "1": permanent(403, "Forbidden: bot was blocked by the user"),
+        "2": permanent(400, "Bad Request: chat not found"),
+        "3": permanent(400, "Bad Request: message is too long"),
+    }
+    for chat_id in results:
+        NotificationOutbox.objects.create(recipient=chat_id, payload={"text": "a"})
+
+    with patch(
+        "notifications.telegram.deliver_telegram_message",
+        side_effect=lambda chat_id, text: results[chat_id],
+    ):
+        assert deliver_outbox_batch(NotificationOutbox.claim_batch(10)) == 3
+
+    blocked = TelegramProfile.objects.get(chat_id="1")
+    assert blocked.is_active is False
+    assert blocked.deactivated_at is not None
+    assert blocked.deactivation_reason == "403: Forbidden: bot was blocked by the user"
+    assert TelegramProfile.objects.get(chat_id="2").is_active is False
+    assert TelegramProfile.objects.get(chat_id="3").is_active is True
+
+    habit.refresh_from_db()
+    assert habit.reminders_enabled is False
+
+
+def test_manual_reactivation_clears_deactivation_mark(auth_client, user):
+    profile = TelegramProfile.objects.create(user=user, chat_id="1")
+    TelegramProfile.objects.filter(pk=profile.pk).update(
+        is_active=False,
+        deactivated_at=timezone.now(),
+        deactivation_reason="403: Forbidden: bot was blocked by the user",
+    )
+
+    resp = auth_client.patch(
+        "/api/telegram/profile/", {"is_active": True}, format="json"
+    )
+
+    assert resp.status_code == 200
+    profile.refresh_from_db()
+    assert profile.is_active is True
+    assert profile.deactivated_at is None
+    assert profile.deactivation_reason == ""
@@ -0,0 +1,120 @@
+"""
+Тесты ограничителя частоты отправки в Telegram (token bucket).
+Используется in-memory бэкенд с управляемыми часами, поэтому тесты
+детерминированы и не требуют Redis.
+Проверяются:
+- глобальный лимит бота и лимит на один чат;
+- атомарность: при нехватке токенов в одном бакете не списывается ни один;
+- блокирующее ожидание acquire() и отказ по timeout;
+- вызов ограничителя из send_telegram_message.
+"""
+
+from unittest.mock import Mock, patch
+
+import pytest
+
+from notifications.ratelimit import InMemoryBucketBackend, TelegramRateLimiter
+
+pytestmark = pytest.mark.django_db
+
+
+class FakeClock:
+    """
+    Управляемые часы: время двигается только через sleep()/advance().
+    """
+
+    def __init__(self) -> None:
+        self.now = 1000.0
+
+    def __call__(self) -> float:
+        return self.now
+
+    def advance(self, seconds: float) -> None:
+        self.now += seconds
+
+
+def make_limiter(clock: FakeClock, global_rate=3, chat_rate=1) -> TelegramRateLimiter:
+    return TelegramRateLimiter(
+        InMemoryBucketBackend(clock=clock),
+        global_rate=global_rate,
+        chat_rate=chat_rate,
+        sleep=clock.advance,
+    )
+
+
+def test_per_chat_limit():
+    """
+    Второе сообщение в тот же чат ждёт пополнения (1/сек), другой чат — нет.
+    """
+    clock = FakeClock()
+    limiter = make_limiter(clock)
+
+    assert limiter.try_acquire("a") == 0
+    assert limiter.try_acquire("a") == pytest.approx(1.0)
+    assert limiter.try_acquire("b") == 0
+
+    clock.advance(1.0)
+    assert limiter.try_acquire("a") == 0
+
+
+def test_global_limit_is_shared_between_chats():
+    """
+    Глобальный бакет (3/сек) исчерпывается сообщениями в разные чаты.
+    """
+    clock = FakeClock()
+    limiter = make_limiter(clock, global_rate=3)
+
+    for chat_id in ("a", "b", "c"):
+        assert limiter.try_acquire(chat_id) == 0
+
+    assert limiter.try_acquire("d") == pytest.approx(1 / 3)
+
+
+def test_denied_take_does_not_consume_tokens():
+    """
+    Если чат упёрся в лимит, глобальный токен не тратится.
+    """
+    clock = FakeClock()
+    limiter = make_limiter(clock, global_rate=2)
+
+    assert limiter.try_acquire("a") == 0
+    assert limiter.try_acquire("a") > 0
+    assert limiter.try_acquire("b") == 0
+
+
+def test_acquire_blocks_until_tokens_and_honours_timeout():
+    """
+    acquire() спит ровно до пополнения; при малом timeout возвращает False.
+    """
+    clock = FakeClock()
+    limiter = make_limiter(clock)
+
+    assert limiter.acquire("a") is True
+    start = clock.now
+    assert limiter.acquire("a") is True
+    assert clock.now - start == pytest.approx(1.0)
+
+    assert limiter.acquire("a", timeout=0.1) is False
+
+
+def test_send_telegram_message_waits_for_rate_limiter(settings):
+    """
+    send_telegram_message берёт токен ограничителя для своего chat_id.
+    """
+    settings.TELEGRAM_BOT_TOKEN = "test_token"
+
+    from notifications.telegram import send_telegram_message
+
+    limiter = Mock()
+    fake_response = Mock()
+    fake_response.json.return_value = {"ok": True}
+
+    with (
+        patch("notifications.telegram.get_rate_limiter", return_value=limiter),
+        patch(
+            "notifications.telegram.requests.Session.post", return_value=fake_response
+        ),
+    ):
+        assert send_telegram_message(chat_id="42", text="hi") is True
+
+    limiter.acquire.assert_called_once_with("42")
@@ -0,0 +1,204 @@
+"""
+Тесты классификации ошибок Telegram, повторов и dead-letter.
+Проверяют:
+- разбор ответа Telegram: ok / 429 + retry_after / 5xx / 4xx;
+- расчёт задержки повтора (экспонента, retry_after, верхняя граница);
+- маршрутизацию неуспешных отправок из очереди: повтор или TelegramDeadLetter
+  (разомкнутый размыкатель не расходует повторы);
+- массовый replay dead-letter через очередь NotificationOutbox.
+Реальный Telegram API не используется.
+"""
+
+from unittest.mock import Mock, patch
+
+import pytest
+from django.utils import timezone
+
+from notifications.models import (
+    NotificationOutbox,
+    TelegramDeadLetter,
+    TelegramSendStatus,
+)
+from notifications.telegram import TelegramSendResult, parse_telegram_response
+
+pytestmark = pytest.mark.django_db
+
+
+def make_response(data: dict, status_code: int = 200) -> Mock:
+    response = Mock()
+    response.json.return_value = data
+    response.status_code = status_code
+    return response
+
+
+def test_parse_ok_response_keeps_message_id():
+    result = parse_telegram_response(
+        make_response({"ok": True, "result": {"message_id": 77}})
+    )
+
+    assert result.ok is True
+    assert result.message_id == 77
+
+
+def test_parse_429_reads_retry_after():
+    result = parse_telegram_response(
+        make_response(
+            {
+                "ok": False,
+                "error_code": 429,
+                "description": "Too Many Requests: retry after 14",
+                "parameters": {"retry_after": 14},
+            },
+            status_code=429,
+        )
+    )
+
+    assert result.status == TelegramSendStatus.RATE_LIMITED
+    assert result.retry_after == 14
+    assert result.retryable is True
+
+
+@pytest.mark.parametrize(
+    ("error_code", "status", "retryable"),
+    [
+        (502, TelegramSendStatus.SERVER_ERROR, True),
+        (403, TelegramSendStatus.PERMANENT, False),
+        (400, TelegramSendStatus.PERMANENT, False),
+    ],
+)
+def test_parse_error_codes(error_code, status, retryable):
+    result = parse_telegram_response(
+        make_response({"ok": False, "error_code": error_code}, status_code=error_code)
+    )
+
+    assert result.status == status
+    assert result.retryable is retryable
+
+
+def test_network_error_is_retryable(settings):
+    settings.TELEGRAM_BOT_TOKEN = "test_token"
+
+    from notifications.telegram import deliver_telegram_message
+
+    with patch(
+        "notifications.telegram.requests.Session.post", side_effect=OSError("timeout")
+    ):
+        result = deliver_telegram_message("1", "text")
+
+    assert result.status == TelegramSendStatus.NETWORK_ERROR
+    assert result.retryable is True
+
+
+def test_retry_delay_backoff_retry_after_and_cap(settings):
+    settings.TELEGRAM_RETRY_BASE_DELAY = 5
+    settings.TELEGRAM_RETRY_MAX_DELAY = 60
+
+    from notifications.tasks import retry_delay
+
+    server_error = TelegramSendResult(TelegramSendStatus.SERVER_ERROR)
+    rate_limited = TelegramSendResult(TelegramSendStatus.RATE_LIMITED, retry_after=30)
+
+    assert retry_delay(server_error, 0) == 5
+    assert retry_delay(server_error, 2) == 20
+    assert retry_delay(rate_limited, 0) == 30
+    assert retry_delay(server_error, 10) == 60
+
+
+def test_outbox_routes_failures_by_status():
+    """
+    Временные ошибки → повтор той же строкой, постоянные → dead-letter,
+    DISABLED → строка просто удаляется.
+    """
+    from notifications.tasks import deliver_outbox_batch
+
+    results = {
+        "1": TelegramSendResult(TelegramSendStatus.RATE_LIMITED, retry_after=9),
+        "2": TelegramSendResult(TelegramSendStatus.PERMANENT, error_code=403),
+        "3": TelegramSendResult(TelegramSendStatus.DISABLED),
+    }
+    for chat_id, text in (("1", "a"), ("2", "b"), ("3", "c")):
+        NotificationOutbox.objects.create(recipient=chat_id, payload={"text": text})
+
+    with (
+        patch(
+            "notifications.telegram.deliver_telegram_message",
+            side_effect=lambda chat_id, text: results[chat_id],
+        ),
+        patch("notifications.tasks.drain_notification_outbox.apply_async"),
+    ):
+        deliver_outbox_batch(NotificationOutbox.claim_batch(10))
+
+    assert list(NotificationOutbox.objects.values_list("recipient", flat=True)) == ["1"]
+    letter = TelegramDeadLetter.objects.get()
+    assert (letter.chat_id, letter.text, letter.error_code) == ("2", "b", 403)
+    assert letter.status == TelegramSendStatus.PERMANENT
+
+
+def test_outbox_batch_result_is_written_atomically():
+    NotificationOutbox.objects.create(recipient="2", payload={"text": "b"})
+
+    from notifications.tasks import deliver_outbox_batch
+
+    with (
+        patch(
+            "notifications.telegram.deliver_telegram_message",
+            return_value=TelegramSendResult(
+                TelegramSendStatus.PERMANENT, error_code=403
+            ),
+        ),
+        patch(
+            "notifications.tasks.deactivate_unreachable_chats",
+            side_effect=RuntimeError("db down"),
+        ),
+    ):
+        with pytest.raises(RuntimeError):
+            deliver_outbox_batch(NotificationOutbox.claim_batch(10))
+
+    assert NotificationOutbox.objects.filter(recipient="2").exists()
+    assert TelegramDeadLetter.objects.count() == 0
+
+
+def test_open_breaker_defers_outbox_row_without_counting(settings):
+    settings.TELEGRAM_RETRY_MAX_RETRIES = 1
+    NotificationOutbox.objects.create(recipient="1", payload={"text": "a"})
+
+    from notifications.tasks import deliver_outbox_batch
+
+    with (
+        patch(
+            "notifications.telegram.deliver_telegram_message",
+            return_value=TelegramSendResult(
+                TelegramSendStatus.CIRCUIT_OPEN, retry_after=15
+            ),
+        ),
+        patch("notifications.tasks.drain_notification_outbox.apply_async"),
+    ):
+        for _ in range(3):
+            NotificationOutbox.objects.update(not_before=timezone.now())
+            deliver_outbox_batch(NotificationOutbox.claim_batch(10))
+
+    row = NotificationOutbox.objects.get()
+    assert row.attempts == 0
+    assert TelegramDeadLetter.objects.count() == 0
+
+
+def test_replay_dead_letters_queues_outbox_and_marks_replayed():
+    from notifications.tasks import replay_dead_letters
+
+    TelegramDeadLetter.objects.create(
+        chat_id="1", text="a", status=TelegramSendStatus.PERMANENT
+    )
+    TelegramDeadLetter.objects.create(
+        chat_id="2", text="b", status=TelegramSendStatus.PERMANENT
+    )
+
+    with patch("notifications.tasks.kick_outbox_drainers") as kick_mock:
+        assert replay_dead_letters(TelegramDeadLetter.objects.all()) == 2
+        assert replay_dead_letters(TelegramDeadLetter.objects.all()) == 0
+
+    assert [call.args for call in kick_mock.call_args_list] == [(2,), (0,)]
+    assert sorted(NotificationOutbox.objects.values_list("recipient", "payload")) == [
+        ("1", {"text": "a"}),
+        ("2", {"text": "b"}),
+    ]
+    assert not TelegramDeadLetter.objects.filter(replayed_at__isnull=True).exists()
@@ -5,6 +5,8 @@
 - обработку ответа Telegram API с ok=false,
 - поведение при отсутствии токена,
 - корректную обработку исключений requests.
+Запросы идут через keep-alive сессию общего TelegramClient
+(requests.Session.post).
 """
 
 import pytest
@@ -18,18 +20,18 @@ def test_send_telegram_message_success(settings):
     Успешная отправка сообщения в Telegram.
     Сценарий:
     - TELEGRAM_BOT_TOKEN и TELEGRAM_API_URL заданы,
-    - requests.post возвращает JSON с {"ok": True}.
+    - Session.post возвращает JSON с {"ok": True}.
     Ожидается:
     - функция возвращает True,
     - запрос выполнен ровно один раз,
-    - URL, payload и timeout сформированы корректно.
+    - URL, payload и таймауты (соединение, отправка) сформированы корректно.
     """
     settings.TELEGRAM_BOT_TOKEN = "test_token"
     settings.TELEGRAM_API_URL = "https://api.telegram.org"
 
     from notifications.telegram import send_telegram_message
 
-    with patch("notifications.telegram.requests.post") as mock_post:
+    with patch("notifications.telegram.requests.Session.post") as mock_post:
         fake_response = Mock()
         fake_response.json.return_value = {"ok": True}
         mock_post.return_value = fake_response
@@ -51,8 +53,8 @@ def test_send_telegram_message_success(settings):
             "parse_mode": "HTML",
         }
 
-        # Проверяем таймаут
-        assert kwargs["timeout"] == 10
+        # Проверяем таймауты: установка соединения и ответ на sendMessage
+        assert kwargs["timeout"] == (3.05, 10)
 
 
 def test_send_telegram_message_api_returns_ok_false(settings):
@@ -69,7 +71,7 @@ def test_send_telegram_message_api_returns_ok_false(settings):
 
     from notifications.telegram import send_telegram_message
 
-    with patch("notifications.telegram.requests.post") as mock_post:
+    with patch("notifications.telegram.requests.Session.post") as mock_post:
         fake_response = Mock()
         fake_response.json.return_value = {"ok": False}
         mock_post.return_value = fake_response
@@ -93,7 +95,7 @@ def test_send_telegram_message_no_token(settings):
 
     from notifications.telegram import send_telegram_message
 
-    with patch("notifications.telegram.requests.post") as mock_post:
+    with patch("notifications.telegram.requests.Session.post") as mock_post:
         result = send_telegram_message(chat_id="123", text="Тест")
 
         assert result is False
@@ -104,7 +106,7 @@ def test_send_telegram_message_request_exception(settings):
     """
     Обработка исключения при выполнении HTTP-запроса.
     Сценарий:
-    - requests.post выбрасывает исключение (например, ошибка сети).
+    - Session.post выбрасывает исключение (например, ошибка сети).
     Ожидается:
     - функция корректно перехватывает исключение,
     - возвращает False,
@@ -116,7 +118,7 @@ def test_send_telegram_message_request_exception(settings):
     from notifications.telegram import send_telegram_message
 
     with patch(
-        "notifications.telegram.requests.post",
+        "notifications.telegram.requests.Session.post",
         side_effect=Exception("Network error"),
     ):
         result = send_telegram_message(chat_id="123", text="Тест")
@@ -0,0 +1,120 @@
+"""
+Тесты пакетной отправки сообщений в Telegram (send_telegram_messages).
+Проверяют:
+- все сообщения отправляются, результаты возвращаются по каждому chat_id;
+- источник сообщений читается лениво (producer/consumer с ограниченным окном);
+- запросы идут через общую keep-alive сессию, а не через requests.post.
+"""
+
+import itertools
+from unittest.mock import Mock, patch
+
+import pytest
+
+from notifications.models import TelegramSendStatus
+from notifications.telegram import TelegramSendResult
+
+pytestmark = pytest.mark.django_db
+
+
+def test_send_telegram_messages_returns_result_per_message():
+    """
+    Для каждого сообщения (chat_id, text) возвращается (message, result).
+    """
+    from notifications.telegram import send_telegram_messages
+
+    messages = [(str(i), f"text {i}") for i in range(10)]
+
+    def fake_deliver(chat_id, text, session=None):
+        status = (
+            TelegramSendStatus.PERMANENT if chat_id == "3" else TelegramSendStatus.OK
+        )
+        return TelegramSendResult(status)
+
+    with patch(
+        "notifications.telegram.deliver_telegram_message", side_effect=fake_deliver
+    ) as send_mock:
+        results = {
+            chat_id: (text, result.ok)
+            for (chat_id, text), result in send_telegram_messages(
+                messages, concurrency=3
+            )
+        }
+
+    assert send_mock.call_count == 10
+    assert results == {str(i): (f"text {i}", i != 3) for i in range(10)}
+
+
+def test_send_telegram_messages_passes_extra_fields_through():
+    """
+    Элементы сообщения после text возвращаются вызывающему без изменений.
+    """
+    from notifications.telegram import send_telegram_messages
+
+    with patch(
+        "notifications.telegram.deliver_telegram_message",
+        return_value=TelegramSendResult(TelegramSendStatus.OK),
+    ) as send_mock:
+        results = list(send_telegram_messages([("1", "a", 101), ("1", "b", 102)]))
+
+    assert sorted(message for message, _result in results) == [
+        ("1", "a", 101),
+        ("1", "b", 102),
+    ]
+    assert {call.args for call in send_mock.call_args_list} == {("1", "a"), ("1", "b")}
+
+
+def test_send_telegram_messages_streams_lazily():
+    """
+    Первый результат приходит до того, как источник прочитан целиком:
+    одновременно в работе не больше 2 * concurrency сообщений.
+    """
+    from notifications.telegram import send_telegram_messages
+
+    pulled = 0
+
+    def source():
+        nonlocal pulled
+        for i in itertools.count():
+            pulled += 1
+            yield str(i), "text"
+
+    with patch(
+        "notifications.telegram.deliver_telegram_message",
+        return_value=TelegramSendResult(TelegramSendStatus.OK),
+    ):
+        stream = send_telegram_messages(source(), concurrency=2)
+        next(stream)
+        stream.close()
+
+    assert pulled <= 2 * 2 + 1
+
+
+def test_send_telegram_messages_uses_pooled_session(settings):
+    """
+    HTTP-запросы идут через requests.Session (keep-alive пул),
+    модульный requests.post не используется.
+    """
+    settings.TELEGRAM_BOT_TOKEN = "test_token"
+    settings.TELEGRAM_API_URL = "https://api.telegram.org"
+
+    from notifications.telegram import send_telegram_messages
+
+    fake_response = Mock()
+    fake_response.json.return_value = {"ok": True}
+
+    with (
+        patch(
+            "notifications.telegram.requests.Session.post",
+            return_value=fake_response,
+        ) as session_post,
+        patch("notifications.telegram.requests.post") as module_post,
+    ):
+        results = list(send_telegram_messages([("1", "a"), ("2", "b")]))
+
+    assert sorted((message[0], result.ok) for message, result in results) == [
+        ("1", True),
+        ("2", True),
+    ]
+    assert session_post.call_count == 2
+    module_post.assert_not_called()
@@ -0,0 +1,81 @@
+"""
+Тесты идемпотентной обработки обновлений бота и хранения offset.
+Проверяют:
+- повторно доставленный update_id не обрабатывается второй раз;
+- если обработка упала, update_id не считается обработанным;
+- ответ бота отправляется после коммита транзакции обработки;
+- offset getUpdates сохраняется в БД и не откатывается назад;
+- старые записи журнала update_id удаляются.
+Реальный Telegram API не используется.
+"""
+
+import datetime
+from unittest.mock import patch
+
+import pytest
+from django.db import connection
+from django.utils import timezone
+
+from notifications.bot import handle_update
+from notifications.models import TelegramBotState, TelegramProcessedUpdate
+from notifications.tasks import prune_processed_updates
+
+pytestmark = pytest.mark.django_db
+
+
+def make_update(update_id: int, text: str = "привет") -> dict:
+    return {"update_id": update_id, "message": {"chat": {"id": 7}, "text": text}}
+
+
+def test_duplicate_update_is_handled_once():
+    with patch("notifications.bot.send_message") as send_mock:
+        assert handle_update(make_update(100)) is True
+        assert handle_update(make_update(100)) is False
+
+    send_mock.assert_called_once()
+
+
+def test_failed_update_is_not_marked_processed():
+    with (
+        patch("notifications.bot.link_chat", side_effect=RuntimeError("boom")),
+        pytest.raises(RuntimeError),
+    ):
+        handle_update(make_update(101, text="/start token"))
+
+    assert not TelegramProcessedUpdate.objects.filter(update_id=101).exists()
+
+
+def test_reply_is_sent_after_commit():
+    depth = len(connection.atomic_blocks)
+    depths = []
+
+    with patch(
+        "notifications.bot.send_message",
+        side_effect=lambda *args: depths.append(len(connection.atomic_blocks)),
+    ):
+        assert handle_update(make_update(102)) is True
+
+    assert depths == [depth]
+    assert TelegramProcessedUpdate.objects.filter(update_id=102).exists()
+
+
+def test_offset_is_persisted_and_never_goes_back():
+    assert TelegramBotState.load_offset("polling") is None
+
+    TelegramBotState.commit_offset("polling", 50)
+    TelegramBotState.commit_offset("polling", 40)
+
+    assert TelegramBotState.load_offset("polling") == 50
+
+
+def test_prune_processed_updates(settings):
+    settings.TELEGRAM_PROCESSED_UPDATES_RETENTION_HOURS = 48
+    TelegramProcessedUpdate.objects.create(
+        update_id=1, processed_at=timezone.now() - datetime.timedelta(hours=49)
+    )
+    TelegramProcessedUpdate.objects.create(update_id=2)
+
+    assert prune_processed_updates() == 1
+    assert list(
+        TelegramProcessedUpdate.objects.values_list("update_id", flat=True)
+    ) == [2]
@@ -0,0 +1,86 @@
+"""
+Тесты webhook Telegram-бота (POST /api/telegram/webhook/).
+Проверяют:
+- без настроенного секрета webhook выключен (404);
+- запрос без верного X-Telegram-Bot-Api-Secret-Token отклоняется
+  и в очередь не попадает;
+- верный запрос сразу получает 200, а update уходит в Celery;
+- /start <token> через webhook привязывает Telegram-профиль.
+Реальный Telegram API не используется.
+"""
+
+from unittest.mock import patch
+
+import pytest
+
+from notifications.models import TelegramLinkToken, TelegramProfile
+
+pytestmark = pytest.mark.django_db
+
+URL = "/api/telegram/webhook/"
+SECRET = "webhook-secret"
+
+
+@pytest.fixture
+def webhook_settings(settings):
+    settings.TELEGRAM_WEBHOOK_SECRET = SECRET
+    return settings
+
+
+def make_update(text: str, update_id: int = 1) -> dict:
+    return {
+        "update_id": update_id,
+        "message": {
+            "message_id": 10,
+            "chat": {"id": 100500, "username": "alex"},
+            "text": text,
+        },
+    }
+
+
+def post_update(api_client, update: dict, secret: str = SECRET):
+    return api_client.post(
+        URL,
+        update,
+        format="json",
+        HTTP_X_TELEGRAM_BOT_API_SECRET_TOKEN=secret,
+    )
+
+
+def test_webhook_disabled_without_secret(api_client, settings):
+    settings.TELEGRAM_WEBHOOK_SECRET = ""
+
+    assert post_update(api_client, make_update("/start"), secret="").status_code == 404
+
+
+def test_webhook_rejects_wrong_secret(api_client, webhook_settings):
+    with patch("notifications.views.process_telegram_update.delay") as delay_mock:
+        response = post_update(api_client, make_update("/start"), secret="wrong")
+
+    assert response.status_code == 403
+    delay_mock.assert_not_called()
+
+
+def test_webhook_acknowledges_and_enqueues(api_client, webhook_settings):
+    update = make_update("/start")
+
+    with patch("notifications.views.process_telegram_update.delay") as delay_mock:
+        response = post_update(api_client, update)
+
+    assert response.status_code == 200
+    delay_mock.assert_called_once_with(update)
+
+
+def test_webhook_start_links_profile(api_client, webhook_settings, user):
+    link_token = TelegramLinkToken.create_for_user(user=user, lifetime_minutes=30)
+
+    with patch("notifications.bot.send_message") as send_mock:
+        response = post_update(api_client, make_update(f"/start {link_token.token}"))
+
+    assert response.status_code == 200
+    profile = TelegramProfile.objects.get(user=user)
+    assert profile.chat_id == "100500"
+    assert profile.username == "alex"
+    link_token.refresh_from_db()
+    assert link_token.is_used is True
+    assert "успешно привязан" in send_mock.call_args.args[1]
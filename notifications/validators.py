@@ -0,0 +1,26 @@
+"""
+Валидаторы полей приложения notifications.
+"""
+
+import zoneinfo
+
+from django.core.exceptions import ValidationError
+from django.utils.translation import gettext_lazy as _
+
+
+def validate_time_zone(value: str) -> None:
+    """
+    Проверяет, что значение — имя часового пояса IANA (например, Europe/Moscow).
+    Пустая строка допустима: означает часовой пояс сервера (TIME_ZONE).
+
+    Используется в поле TelegramProfile.time_zone.
+    """
+    if not value:
+        return
+
+    try:
+        zoneinfo.ZoneInfo(value)
+    except (zoneinfo.ZoneInfoNotFoundError, ValueError):
+        raise ValidationError(
+            _("Неизвестный часовой пояс: %(value)s."), params={"value": value}
+        )
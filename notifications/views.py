@@ -1,17 +1,29 @@
 """
 API views for Telegram integration.
 Этот модуль содержит endpoint(ы), связанные с интеграцией Telegram:
-- выдача одноразовой deep-link ссылки для привязки Telegram-аккаунта к пользователю.
+- выдача одноразовой deep-link ссылки для привязки Telegram-аккаунта к пользователю;
+- просмотр и изменение настроек привязанного Telegram-профиля;
+- метрики размыкателя Bot API (для администраторов и мониторинга);
+- webhook, на который Telegram присылает обновления бота.
 """
 
+import hmac
+
 from django.conf import settings
+from django.shortcuts import get_object_or_404
 from drf_spectacular.utils import OpenApiExample, OpenApiResponse, extend_schema
-from rest_framework import permissions
+from rest_framework import generics, permissions
 from rest_framework.response import Response
 from rest_framework.views import APIView
 
-from .models import TelegramLinkToken
-from .serializers import TelegramLinkSerializer
+from .circuitbreaker import get_circuit_breaker
+from .models import TelegramLinkToken, TelegramProfile
+from .serializers import (
+    TelegramBreakerSerializer,
+    TelegramLinkSerializer,
+    TelegramProfileSerializer,
+)
+from .tasks import process_telegram_update
 
 
 @extend_schema(
@@ -77,3 +89,88 @@ class TelegramLinkAPIView(APIView):
 
         serializer = TelegramLinkSerializer({"link": deep_link})
         return Response(serializer.data)
+
+
+@extend_schema(
+    tags=["Telegram"],
+    summary="Настройки Telegram-профиля",
+    description=(
+        "Просмотр и изменение настроек привязанного Telegram-профиля.\n\n"
+        "`time_zone` — часовой пояс IANA (например, `Europe/Moscow`): "
+        "время привычек считается местным временем в этом поясе, и напоминания "
+        "приходят по нему. Пустая строка — часовой пояс сервера.\n\n"
+        "`delivery_mode`: `per_habit` — напоминание в момент каждой привычки, "
+        "`digest` — одна сводка в день в `digest_time` (местное время) "
+        "со всеми привычками на сегодня."
+    ),
+)
+class TelegramProfileAPIView(generics.RetrieveUpdateAPIView):
+    """
+    Настройки Telegram-профиля текущего пользователя.
+    Endpoint:
+        GET/PATCH/PUT /api/telegram/profile/
+    Если Telegram ещё не привязан — 404.
+    """
+
+    permission_classes = [permissions.IsAuthenticated]
+    serializer_class = TelegramProfileSerializer
+
+    def get_object(self) -> TelegramProfile:
+        return get_object_or_404(TelegramProfile, user=self.request.user)
+
+
+@extend_schema(
+    tags=["Telegram"],
+    summary="Состояние размыкателя Bot API",
+    description=(
+        "Метрики общего размыкателя запросов к Telegram Bot API: состояние "
+        "(`closed`, `open`, `half_open`), число запросов и ошибок в текущем "
+        "окне, секунды до следующей пробы. Доступно только администраторам."
+    ),
+    responses={200: TelegramBreakerSerializer},
+)
+class TelegramBreakerAPIView(APIView):
+    """
+    Состояние размыкателя Bot API.
+    Endpoint:
+        GET /api/telegram/breaker/
+    """
+
+    permission_classes = [permissions.IsAdminUser]
+
+    def get(self, request, *args, **kwargs):
+        snapshot = get_circuit_breaker().snapshot()
+        return Response(TelegramBreakerSerializer(snapshot._asdict()).data)
+
+
+@extend_schema(exclude=True)
+class TelegramWebhookAPIView(APIView):
+    """
+    Webhook Telegram-бота.
+    Endpoint:
+        POST /api/telegram/webhook/
+    Telegram подписывает запрос заголовком X-Telegram-Bot-Api-Secret-Token
+    (TELEGRAM_WEBHOOK_SECRET, задаётся при setWebhook). Update сразу
+    передаётся в очередь Celery (process_telegram_update), а Telegram
+    получает 200 — медленная обработка не задерживает следующие обновления.
+    Если секрет не настроен — 404 (webhook выключен).
+    """
+
+    authentication_classes: list = []
+    permission_classes = [permissions.AllowAny]
+
+    def post(self, request, *args, **kwargs):
+        secret = settings.TELEGRAM_WEBHOOK_SECRET
+        if not secret:
+            return Response(status=404)
+
+        header = request.headers.get("X-Telegram-Bot-Api-Secret-Token", "")
+        if not hmac.compare_digest(header.encode(), secret.encode()):
+            return Response(status=403)
+
+        update = request.data
+        if not isinstance(update, dict) or "update_id" not in update:
+            return Response(status=400)
+
+        process_telegram_update.delay(dict(update))
+        return Response(status=200)
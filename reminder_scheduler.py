@@ -0,0 +1,53 @@
+"""
+Планировщик напоминаний AtomicHabits (иерархическое колесо таймеров).
+Отдельный долгоживущий процесс — альтернатива поминутному опросу
+send_habit_reminders из Celery Beat (см. habits.scheduler):
+- держит в памяти вхождения ближайших суток и ставит шарды
+  send_habit_reminders_shard в очередь Celery точно в срок;
+- изменения привычек получает из ленты HabitScheduleChange;
+- при перезапуске восстанавливается из снимка
+  HABIT_REMINDER_SCHEDULER_SNAPSHOT.
+Важно:
+- требует HABIT_REMINDER_SCHEDULER_ENABLED=True (иначе лента изменений
+  не пишется и планировщик не узнает о правках привычек);
+- запускайте ровно один экземпляр; поминутную рассылку beat стоит оставить
+  страховкой с большим интервалом (HABIT_REMINDERS_DISPATCH_INTERVAL_MINUTES).
+"""
+
+from __future__ import annotations
+
+import os
+
+import django
+
+# Django setup (чтобы импортировать settings и модели)
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "config.settings")
+django.setup()
+
+from django.conf import settings  # noqa: E402
+from django.core.exceptions import ImproperlyConfigured  # noqa: E402
+from habits.scheduler import ReminderScheduler  # noqa: E402
+
+
+def main() -> None:
+    """
+    Запускает цикл планировщика.
+    """
+    if not settings.HABIT_REMINDER_SCHEDULER_ENABLED:
+        raise ImproperlyConfigured(
+            "Установите HABIT_REMINDER_SCHEDULER_ENABLED=True для всех процессов "
+            "(web, Celery), чтобы писалась лента изменений расписания."
+        )
+
+    scheduler = ReminderScheduler()
+    print("Reminder scheduler started...")
+    scheduler.run_forever()
+
+
+if __name__ == "__main__":
+    """
+    Entry point.
+    Запуск:
+        python reminder_scheduler.py
+    """
+    main()
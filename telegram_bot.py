@@ -1,5 +1,5 @@
 """
-Simple Telegram bot (long polling) for AtomicHabits.
+Simple Telegram bot (long polling) for AtomicHabits — режим разработки.
 Этот скрипт нужен, чтобы обработать deep-link привязку Telegram:
 1) Пользователь в приложении вызывает GET /api/telegram/link/
    и получает ссылку вида: https://t.me/<BOT_USERNAME>?start=<token>
@@ -9,182 +9,129 @@ Simple Telegram bot (long polling) for AtomicHabits.
    - проверяет, что токен существует и валиден (не истёк/не использован),
    - создаёт/обновляет TelegramProfile (chat_id, username),
    - помечает токен использованным.
+Обработка обновлений — notifications.bot (общая с webhook).
+Запросы к Bot API идут через общий TelegramClient (notifications.telegram):
+keep-alive соединения и отдельные таймауты для long polling и отправки.
 Важно:
-- Это НЕ Celery и НЕ вебхук. Это отдельный процесс (polling).
-- Для продакшена лучше webhooks, но для dev/stage polling нормально.
+- Это НЕ Celery и НЕ вебхук. Это отдельный процесс (polling), ровно один.
+- В продакшене бот работает через webhook (POST /api/telegram/webhook/,
+  см. `python manage.py telegram_webhook set`) и масштабируется вместе
+  с web-приложением. Пока webhook установлен, getUpdates возвращает 409 —
+  перед запуском polling выполните `python manage.py telegram_webhook delete`.
 """
 
 from __future__ import annotations
 
+import asyncio
 import os
-import time
-from typing import Any, Optional
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any
 
 import django
-import requests
 
 # Django setup (чтобы импортировать settings и модели)
 os.environ.setdefault("DJANGO_SETTINGS_MODULE", "config.settings")
 django.setup()
 
 from django.conf import settings  # noqa: E402
-from django.db import transaction  # noqa: E402
-from notifications.models import TelegramLinkToken, TelegramProfile  # noqa: E402
+from notifications.bot import (  # noqa: E402
+    next_update_offset,
+    process_update_batch,
+)
+from notifications.models import TelegramBotState  # noqa: E402
+from notifications.telegram import TelegramAPIError, get_telegram_client  # noqa: E402
 
+# Пауза после ошибки getUpdates (секунды), если Telegram не прислал retry_after
+ERROR_BACKOFF = 3
 
-def _base_url() -> str:
-    """
-    Построить базовый URL Telegram Bot API.
-    :return: строка вида "https://api.telegram.org/bot<TOKEN>"
-    """
-    return f"{settings.TELEGRAM_API_URL}/bot{settings.TELEGRAM_BOT_TOKEN}"
+# Сколько раз подряд повторять упавшее обновление, прежде чем пропустить его
+MAX_UPDATE_ATTEMPTS = 5
+
+# Ключ строки TelegramBotState с offset этого бота
+POLLING_STATE_KEY = "polling"
 
 
-def get_updates(offset: Optional[int] = None) -> dict[str, Any]:
+def get_updates(offset: int | None = None) -> list[dict[str, Any]]:
     """
     Получить обновления от Telegram через long polling.
     :param offset: update_id, начиная с которого читать события (чтобы не получать старые повторно)
-    :return: dict ответа Telegram API
+    :return: список update из ответа Telegram API
+    :raises TelegramAPIError: ошибка API или сети
     """
-    params: dict[str, Any] = {"timeout": 30}
-    if offset is not None:
-        params["offset"] = offset
+    return get_telegram_client().get_updates(offset=offset)
 
-    resp = requests.get(f"{_base_url()}/getUpdates", params=params, timeout=35)
-    resp.raise_for_status()
-    return resp.json()
 
-
-def send_message(chat_id: str | int, text: str) -> None:
+async def run_polling() -> None:
     """
-    Отправить сообщение в Telegram чат.
-    :param chat_id: идентификатор чата (int или str)
-    :param text: текст сообщения
+    Основной цикл polling (asyncio).
+    - Long polling getUpdates выполняется в потоке и запускается сразу
+      после обработки предыдущей пачки — без фиксированных пауз:
+      пока обновлений нет, Telegram сам держит запрос до TELEGRAM_POLL_TIMEOUT.
+    - Пачка обрабатывается конкурентно (process_update_batch): до
+      TELEGRAM_BOT_CONCURRENCY обработчиков, порядок внутри чата сохраняется.
+    - При ошибке ждём retry_after из ответа Telegram (или ERROR_BACKOFF);
+      любая другая ошибка (БД, неожиданный ответ) цикл тоже не останавливает.
+    - Offset хранится в БД (TelegramBotState) и фиксируется после каждой
+      пачки: перезапуск продолжает с того же места, а обновления пачки,
+      прерванной перезапуском, отсеиваются журналом update_id.
+    - Offset сдвигается только до первого обновления, обработка которого
+      упала: оно придёт снова. Обновление, упавшее MAX_UPDATE_ATTEMPTS раз
+      подряд, пропускается, чтобы не остановить бота навсегда.
     """
-    requests.post(
-        f"{_base_url()}/sendMessage",
-        json={"chat_id": str(chat_id), "text": text},
-        timeout=10,
-    ).raise_for_status()
-
-
-def handle_start(chat_id: str | int, text: str, username: Optional[str] = None) -> None:
-    """
-    Обработать команду /start.
-    Ожидаем формат:
-        /start <token>
-    Если токен валиден:
-    - создаём/обновляем TelegramProfile для пользователя,
-    - помечаем TelegramLinkToken как использованный.
-    :param chat_id: telegram chat id
-    :param text: полный текст сообщения (например "/start abcdef")
-    :param username: telegram username (если есть)
-    """
-    parts = text.strip().split(maxsplit=1)
-
-    # /start без токена
-    if len(parts) == 1:
-        send_message(
-            chat_id,
-            "Привет! Открой ссылку из приложения AtomicHabits, чтобы привязать Telegram.",
-        )
-        return
-
-    token = parts[1].strip()
-
-    try:
-        link_token = TelegramLinkToken.objects.select_related("user").get(token=token)
-    except TelegramLinkToken.DoesNotExist:
-        send_message(
-            chat_id,
-            "❌ Неверный или устаревший токен. Сгенерируйте новую ссылку в приложении.",
-        )
-        return
-
-    if not link_token.is_valid():
-        send_message(
-            chat_id,
-            "❌ Токен устарел или уже использован. Сгенерируйте новую ссылку в приложении.",
-        )
-        return
-
-    user = link_token.user
-
-    # Атомарно: привязали профиль + пометили токен использованным
-    with transaction.atomic():
-        TelegramProfile.objects.update_or_create(
-            user=user,
-            defaults={
-                "chat_id": str(chat_id),
-                "username": username or "",
-                "is_active": True,
-            },
-        )
-        link_token.is_used = True
-        link_token.save(update_fields=["is_used"])
-
-    send_message(
-        chat_id,
-        (
-            f"✅ Телеграм успешно привязан к аккаунту {user.username}.\n"
-            f"Теперь вы будете получать напоминания о привычках."
-        ),
+    last_update_id = await asyncio.to_thread(
+        TelegramBotState.load_offset, POLLING_STATE_KEY
     )
+    concurrency = settings.TELEGRAM_BOT_CONCURRENCY
+    failures: dict[int, int] = {}
+    print("Bot polling started...")
 
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        while True:
+            try:
+                updates = await asyncio.to_thread(get_updates, last_update_id)
+                if not updates:
+                    continue
 
-def _extract_message(
-    update: dict[str, Any],
-) -> tuple[Optional[str], Optional[str], Optional[str]]:
-    """
-    Вытащить chat_id, username и text из update (с защитой от отсутствующих ключей).
-    :param update: элемент из массива result Telegram API
-    :return: (chat_id, username, text) как строки или None
-    """
-    message = update.get("message") or {}
-    chat = message.get("chat") or {}
-    chat_id = chat.get("id")
-    username = chat.get("username")
-    text = message.get("text")
-
-    return (str(chat_id) if chat_id is not None else None, username, text)
+                succeeded = await process_update_batch(updates, executor, concurrency)
+                failed = [
+                    int(update["update_id"])
+                    for update in updates
+                    if int(update["update_id"]) not in succeeded
+                ]
+                failures = {
+                    update_id: failures.get(update_id, 0) + 1 for update_id in failed
+                }
+                for update_id, attempts in failures.items():
+                    if attempts >= MAX_UPDATE_ATTEMPTS:
+                        print(
+                            f"[WARN] update {update_id} skipped after {attempts} attempts"
+                        )
+                        succeeded.add(update_id)
+
+                last_update_id = next_update_offset(updates, succeeded)
+                await asyncio.to_thread(
+                    TelegramBotState.commit_offset, POLLING_STATE_KEY, last_update_id
+                )
+            except TelegramAPIError as e:
+                # Чтобы бот не падал от временной сетевой ошибки
+                print(f"[WARN] getUpdates failed: {e}")
+                await asyncio.sleep(e.result.retry_after or ERROR_BACKOFF)
+                continue
+            except Exception as e:
+                print(f"[WARN] polling iteration failed: {e}")
+                await asyncio.sleep(ERROR_BACKOFF)
+                continue
+
+            if failed:
+                # Упавшие обновления повторяются не чаще раза в ERROR_BACKOFF
+                await asyncio.sleep(ERROR_BACKOFF)
 
 
 def main() -> None:
     """
-    Основной цикл polling.
-    - Запрашивает обновления у Telegram.
-    - Обрабатывает /start <token>.
-    - На остальные сообщения отвечает подсказкой.
+    Запускает asyncio-цикл polling.
     """
-    last_update_id: Optional[int] = None
-    print("Bot polling started...")
-
-    while True:
-        try:
-            data = get_updates(offset=last_update_id)
-        except Exception as e:
-            # Чтобы бот не падал от временной сетевой ошибки
-            print(f"[WARN] getUpdates failed: {e}")
-            time.sleep(3)
-            continue
-
-        if data.get("ok"):
-            for update in data.get("result", []):
-                last_update_id = int(update["update_id"]) + 1
-
-                chat_id, username, text = _extract_message(update)
-                if not chat_id or not text:
-                    continue
-
-                if text.startswith("/start"):
-                    handle_start(chat_id, text, username=username)
-                else:
-                    send_message(
-                        chat_id,
-                        "Напишите /start по ссылке из приложения, чтобы привязать аккаунт.",
-                    )
-
-        time.sleep(1)
+    asyncio.run(run_polling())
 
 
 if __name__ == "__main__":